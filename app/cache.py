@@ -0,0 +1,289 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+class LRUCache:
+    """
+    Cache em memória com limite de entradas (LRU), seguro entre threads.
+    O FastAPI roda handlers sync num threadpool, então o lock é necessário.
+    Com max_bytes, também limita a soma de len(valor) (ex: HTML em bytes).
+    Com ttl_seconds, entradas expiram (get devolve None e descarta).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = int(max_bytes) if max_bytes else None
+        self.ttl_seconds = float(ttl_seconds) if ttl_seconds else None
+        self.total_bytes = 0
+        # chave -> (expira_em ou None, valor)
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, value: Any) -> int:
+        return len(value) if self.max_bytes else 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            try:
+                expires_at, value = self._data.pop(key)
+            except KeyError:
+                return None
+            if expires_at is not None and expires_at <= time.monotonic():
+                self.total_bytes -= self._size(value)
+                return None
+            self._data[key] = (expires_at, value)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._size(value)
+        if self.max_bytes and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_bytes -= self._size(old[1])
+            self._data[key] = (expires_at, value)
+            self.total_bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes and self.total_bytes > self.max_bytes
+            ):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.total_bytes -= self._size(evicted)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_bytes -= self._size(old[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# --------------------------------------------
+# Backends de cache de HTML renderizado
+# --------------------------------------------
+class CacheBackend:
+    """
+    Interface mínima: chave str -> bytes. Backends não precisam ser exatos
+    (podem perder entradas a qualquer momento); quem chama sempre sabe renderizar.
+    """
+
+    name = "base"
+    # faz I/O (disco, rede): nas rotas async, vai para o threadpool
+    blocking = True
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_bytes: int, max_entries: int = 1024):
+        self._lru = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._lru.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self._lru.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._lru), "bytes": self._lru.total_bytes}
+
+
+class FileCacheBackend(CacheBackend):
+    """
+    Um arquivo por chave num diretório local (sobrevive a restart do processo
+    e é compartilhado entre workers da mesma máquina). LRU aproximado via mtime.
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".html")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None)
+            return data
+        except OSError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._evict()
+
+    def _entries(self):
+        out = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".html"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, name))
+        return out
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            for _, size, name in sorted(entries):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Qualquer servidor compatível com Redis. O limite de tamanho fica a cargo
+    do servidor (maxmemory + allkeys-lru); aqui só colocamos TTL.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl_seconds: int = 3600, prefix: str = "tp:html:"):
+        import redis  # opcional: só importa se esse backend for escolhido
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get(self.prefix + key)
+        except Exception:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self._client.set(self.prefix + key, value, ex=self.ttl_seconds)
+        except Exception:
+            pass
+
+
+class HtmlCache:
+    """
+    Fachada sobre um backend, com contadores de hit/miss para o /health.
+    backend=None desliga o cache (get sempre None, set não faz nada).
+    """
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get(self, key: str) -> Optional[bytes]:
+        if self.backend is None:
+            return None
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        """get() para rotas async: backends que fazem I/O não travam o event loop."""
+        if self.backend is not None and self.backend.blocking:
+            return await run_in_threadpool(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, value: bytes) -> None:
+        if self.backend is not None and self.backend.blocking:
+            await run_in_threadpool(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        if self.backend is None:
+            return {"backend": "off"}
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+            **self.backend.stats(),
+        }
+
+
+def html_cache_from_env() -> HtmlCache:
+    """
+    HTML_CACHE_BACKEND: memory (padrão) | file | redis | off
+    HTML_CACHE_MAX_BYTES: limite total (memory/file), padrão 32 MB
+    HTML_CACHE_DIR: diretório do backend file
+    REDIS_URL: URL do backend redis
+    """
+    kind = (os.getenv("HTML_CACHE_BACKEND") or "memory").strip().lower()
+    max_bytes = int(os.getenv("HTML_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    if kind in ("off", "none", "0", ""):
+        return HtmlCache(None)
+    if kind == "file":
+        directory = os.getenv("HTML_CACHE_DIR") or "./.html_cache"
+        return HtmlCache(FileCacheBackend(directory, max_bytes))
+    if kind == "redis":
+        return HtmlCache(RedisCacheBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    return HtmlCache(MemoryCacheBackend(max_bytes))
@@ -1,44 +1,127 @@
+import re
 from datetime import datetime, time, timedelta
-from ics import Calendar, Event
+from typing import Iterable, Iterator
 
 CATEGORY_TITLE = {
     "flight": "Passagem",
     "hotel": "Hotel",
     "itinerary": "Roteiro",
     "activity": "Passeio",
+    "restaurant": "Restaurante",
+    "transport": "Transporte",
     "ticket": "Ticket",
     "reference": "Referência",
 }
 
-def build_trip_ics(trip, items) -> str:
-    cal = Calendar()
+DEFAULT_ITEM_TIME = time(10, 0)
+ITEM_DURATION = timedelta(hours=1)
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2})[:hH](\d{2})")
+
+
+def _escape(value: str) -> str:
+    # RFC 5545 3.3.11 (TEXT)
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _line(name: str, value: str) -> str:
+    """
+    Uma linha de conteúdo, dobrada em 75 octetos (RFC 5545 3.1), com CRLF.
+    """
+    raw = f"{name}:{value}".encode("utf-8")
+    if len(raw) <= 75:
+        return raw.decode("utf-8") + "\r\n"
+
+    parts = []
+    limit = 75
+    while raw:
+        cut = min(limit, len(raw))
+        # não quebra no meio de um caractere UTF-8
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+        limit = 74  # linhas de continuação começam com um espaço
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _dt(value: datetime) -> str:
+    # horário "flutuante" (sem fuso): o calendário usa o fuso local do usuário
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _item_time(meta: dict) -> time:
+    m = _TIME_RE.match(str(meta.get("time") or ""))
+    if m:
+        h, mi = int(m.group(1)), int(m.group(2))
+        if h < 24 and mi < 60:
+            return time(h, mi)
+    return DEFAULT_ITEM_TIME
+
+
+def iter_trip_ics(trip, items: Iterable) -> Iterator[str]:
+    """
+    Gera o .ics em pedaços (um VEVENT por vez), sem montar o calendário
+    inteiro em memória. `items` precisa de id, category, title, item_date,
+    url, notes, created_at e meta (dict), como os ItemView do services.
+    """
+    # DTSTAMP estável: o corpo só muda com a revisão (o ETag é por revisão)
+    created = getattr(trip, "created_at", None) or datetime.combine(trip.start_date, time(0, 0))
+    stamp = _dt(created) + "Z"
+
+    yield "BEGIN:VCALENDAR\r\n"
+    yield _line("VERSION", "2.0")
+    yield _line("PRODID", "-//Trip Planner//PT-BR")
+    yield _line("CALSCALE", "GREGORIAN")
+    yield _line("X-WR-CALNAME", _escape(f"{trip.title} - {trip.destination}"))
 
     # Evento principal: viagem inteira (all-day-like, mas com horário)
-    main = Event()
-    main.name = f"{trip.title} - {trip.destination}"
-    main.begin = datetime.combine(trip.start_date, time(9, 0))
-    main.end = datetime.combine(trip.end_date, time(20, 0))
-    main.description = "Viagem criada no Trip Planner"
-    cal.events.add(main)
+    yield "BEGIN:VEVENT\r\n"
+    yield _line("UID", f"trip-{trip.token}@trip-planner")
+    yield _line("DTSTAMP", stamp)
+    yield _line("DTSTART", _dt(datetime.combine(trip.start_date, time(9, 0))))
+    yield _line("DTEND", _dt(datetime.combine(trip.end_date, time(20, 0))))
+    yield _line("SUMMARY", _escape(f"{trip.title} - {trip.destination}"))
+    yield _line("DESCRIPTION", _escape("Viagem criada no Trip Planner"))
+    yield "END:VEVENT\r\n"
 
     # Itens datados viram eventos
     for it in items:
         if not it.item_date:
             continue
 
-        e = Event()
+        meta = it.meta or {}
         label = CATEGORY_TITLE.get(it.category, it.category.upper())
-        e.name = f"[{label}] {it.title}"
-        e.begin = datetime.combine(it.item_date, time(10, 0))
-        e.duration = timedelta(hours=1)
+        begin = datetime.combine(it.item_date, _item_time(meta))
 
         desc_parts = []
-        if it.url:
-            desc_parts.append(it.url)
-        if it.notes:
-            desc_parts.append(it.notes)
-        e.description = "\n\n".join(desc_parts) if desc_parts else ""
+        url = it.url or meta.get("ticket_url") or meta.get("url")
+        if url:
+            desc_parts.append(url)
+        notes = it.notes or meta.get("notes")
+        if notes:
+            desc_parts.append(notes)
+
+        yield "BEGIN:VEVENT\r\n"
+        yield _line("UID", f"trip-{trip.token}-item-{it.id}@trip-planner")
+        yield _line("DTSTAMP", _dt(it.created_at) + "Z" if it.created_at else stamp)
+        yield _line("DTSTART", _dt(begin))
+        yield _line("DTEND", _dt(begin + ITEM_DURATION))
+        yield _line("SUMMARY", _escape(f"[{label}] {it.title}"))
+        if meta.get("address"):
+            yield _line("LOCATION", _escape(str(meta["address"])))
+        if desc_parts:
+            yield _line("DESCRIPTION", _escape("\n\n".join(desc_parts)))
+        yield "END:VEVENT\r\n"
 
-        cal.events.add(e)
+    yield "END:VCALENDAR\r\n"
 
-    return str(cal)
+
+def build_trip_ics(trip, items) -> str:
+    return "".join(iter_trip_ics(trip, items))
@@ -0,0 +1,171 @@
+"""
+Compressão das respostas (gzip; brotli se o pacote `brotli` estiver instalado).
+
+Middleware ASGI puro (funciona com StreamingResponse/FileResponse): escolhe
+a codificação pelo Accept-Encoding, só comprime tipos de texto e a partir de
+COMPRESS_MIN_BYTES. Respostas em stream (mais de um pedaço) são acumuladas
+até STREAM_BUFFER_BYTES antes de cada flush: um flush por pedaço pequeno
+(ex: uma linha do .ics) piora muito a compressão. text/event-stream (SSE)
+nem é comprimido: cada evento precisa chegar na hora.
+
+COMPRESS_MIN_BYTES: tamanho mínimo para comprimir (padrão 1024; 0 desliga)
+"""
+import gzip
+import io
+import os
+import zlib
+from typing import Optional
+
+try:  # opcional
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/calendar",
+    "text/csv",
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "image/svg+xml",
+)
+# streams: quanto juntar antes de cada flush do compressor
+STREAM_BUFFER_BYTES = 16 * 1024
+
+
+def _accepted(headers) -> set:
+    for name, value in headers:
+        if name == b"accept-encoding":
+            return {p.split(";")[0].strip().lower() for p in value.decode("latin-1").split(",")}
+    return set()
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._buf = io.BytesIO()
+        self._gz = gzip.GzipFile(mode="wb", fileobj=self._buf, compresslevel=level)
+
+    def _drain(self) -> bytes:
+        data = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        return data
+
+    def compress(self, data: bytes) -> bytes:
+        self._gz.write(data)
+        self._gz.flush(zlib.Z_SYNC_FLUSH)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        self._gz.close()
+        return self._drain()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._br = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._br.process(data) + self._br.flush()
+
+    def finish(self) -> bytes:
+        return self._br.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose(self, scope) -> Optional[str]:
+        accepted = _accepted(scope["headers"])
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _stream(self, encoding: str):
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.minimum_size:
+            return await self.app(scope, receive, send)
+        encoding = self._choose(scope)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        stream = None
+        passthrough = False
+        pending = bytearray()
+
+        async def wrapped_send(message):
+            nonlocal start, stream, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if stream is None:
+                headers = {k.lower(): v for k, v in start["headers"]}
+                ctype = headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip()
+                skip = (
+                    b"content-encoding" in headers
+                    or ctype not in COMPRESSIBLE_TYPES
+                    or (not more and len(body) < self.minimum_size)
+                )
+                if skip:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+
+                stream = self._stream(encoding)
+                out_headers = [
+                    (k, v)
+                    for k, v in start["headers"]
+                    if k.lower() not in (b"content-length", b"etag")
+                ]
+                out_headers.append((b"content-encoding", encoding.encode()))
+                out_headers.append((b"vary", b"Accept-Encoding"))
+                etag = headers.get(b"etag")
+                if etag:
+                    # bytes diferentes da versão sem compressão: ETag fraco
+                    out_headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+                if not more:
+                    data = stream.compress(body) + stream.finish()
+                    out_headers.append((b"content-length", str(len(data)).encode()))
+                    await send({**start, "headers": out_headers})
+                    return await send({"type": "http.response.body", "body": data})
+                await send({**start, "headers": out_headers})
+
+            pending.extend(body)
+            if more and len(pending) < STREAM_BUFFER_BYTES:
+                return
+            data = stream.compress(bytes(pending)) if pending else b""
+            pending.clear()
+            if not more:
+                data += stream.finish()
+            if data or not more:
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, wrapped_send)
+
+
+def compression_min_bytes_from_env() -> int:
+    return int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
@@ -1,8 +1,11 @@
 import os
+import threading
 import time
 from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as SATimeoutError
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # =========================
@@ -13,6 +16,9 @@ DATABASE_URL = (os.getenv("DATABASE_URL") or "").strip()
 # Se não tiver DATABASE_URL, cai em SQLite local (NÃO PERSISTE no Render free).
 DEFAULT_SQLITE_URL = "sqlite:///./trip_planner.db"
 
+# DB_ASYNC=1: rotas de leitura usam engine async (asyncpg / aiosqlite)
+DB_ASYNC = (os.getenv("DB_ASYNC") or "").strip().lower() in ("1", "true", "yes", "on")
+
 def _build_db_url() -> str:
     if DATABASE_URL:
         # Render/Supabase costumam exigir SSL. Se já tiver sslmode, não duplica.
@@ -21,7 +27,8 @@ def _build_db_url() -> str:
         else:
             url = DATABASE_URL
 
-        if "sslmode=" not in url:
+        # DATABASE_URL=sqlite:///... também vale (ex: bench/); SSL só no Postgres
+        if url.startswith("postgresql") and "sslmode=" not in url:
             joiner = "&" if "?" in url else "?"
             url = url + f"{joiner}sslmode=require"
         return url
@@ -31,47 +38,328 @@ def _build_db_url() -> str:
 
 SQLALCHEMY_DATABASE_URL = _build_db_url()
 
+
+def _env_int(name: str, default: int) -> int:
+    raw = (os.getenv(name) or "").strip()
+    return int(raw) if raw else default
+
+
+# =========================
+# Pool (por processo/worker)
+# =========================
+# Com vários workers (gunicorn, WEB_CONCURRENCY), cada um tem o seu pool.
+# DB_MAX_CONNECTIONS é o orçamento total do banco. Por worker sobra
+# DB_MAX_CONNECTIONS // WEB_CONCURRENCY, menos a conexão dedicada do LISTEN
+# (eventos no Postgres), dividido entre os engines que existem (sync e, com
+# DB_ASYNC, o async), sem overflow: nunca passa do limite do plano.
+WEB_CONCURRENCY = max(1, _env_int("WEB_CONCURRENCY", 1))
+DB_MAX_CONNECTIONS = _env_int("DB_MAX_CONNECTIONS", 0)
+
+IS_POSTGRES = SQLALCHEMY_DATABASE_URL.startswith("postgresql")
+# lido aqui (e não em events.py) porque o backend postgres consome uma conexão.
+# Padrão: postgres no Postgres (vários workers recebem os eventos uns dos
+# outros), local no SQLite.
+EVENTS_BACKEND = (os.getenv("EVENTS_BACKEND") or ("postgres" if IS_POSTGRES else "local")).strip().lower()
+LISTEN_CONNECTIONS = 1 if EVENTS_BACKEND == "postgres" and IS_POSTGRES else 0
+# aiosqlite usa NullPool: o engine async só tem pool no Postgres
+ASYNC_POOLED = DB_ASYNC and IS_POSTGRES
+
+
+def split_connection_budget(max_connections: int, workers: int, listen: int, async_pooled: bool):
+    """(pool sync, pool async) de um worker dentro de max_connections no total."""
+    per_worker = max(1, max_connections // workers - listen)
+    if not async_pooled:
+        return per_worker, 0
+    # escritas ficam no sync, leituras no async
+    sync_share = max(1, per_worker // 2)
+    return sync_share, max(1, per_worker - sync_share)
+
+
+if DB_MAX_CONNECTIONS:
+    _sync_share, _async_share = split_connection_budget(
+        DB_MAX_CONNECTIONS, WEB_CONCURRENCY, LISTEN_CONNECTIONS, ASYNC_POOLED
+    )
+    DB_POOL_SIZE = _env_int("DB_POOL_SIZE", _sync_share)
+    DB_ASYNC_POOL_SIZE = _env_int("DB_ASYNC_POOL_SIZE", _async_share)
+    DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 0)
+else:
+    DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+    DB_ASYNC_POOL_SIZE = _env_int("DB_ASYNC_POOL_SIZE", DB_POOL_SIZE)
+    DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)        # segundos esperando conexão livre
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)      # recicla antes do proxy/pooler derrubar
+DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)  # só Postgres; 0 = sem limite
+
+
+def pool_kwargs(url: str, pool_size: int = DB_POOL_SIZE) -> dict:
+    kwargs = {"pool_pre_ping": True, "pool_recycle": DB_POOL_RECYCLE}
+    # aiosqlite usa NullPool (sem fila): tamanho/timeout não se aplicam
+    if not url.startswith("sqlite+aiosqlite"):
+        kwargs.update(
+            pool_size=pool_size,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return kwargs
+
+
+def max_connections_per_worker() -> int:
+    """Teto de conexões abertas por um worker: pools (com overflow) + LISTEN."""
+    total = DB_POOL_SIZE + DB_MAX_OVERFLOW + LISTEN_CONNECTIONS
+    if ASYNC_POOLED:
+        total += DB_ASYNC_POOL_SIZE + DB_MAX_OVERFLOW
+    return total
+
 # =========================
 # SQLAlchemy
 # =========================
 connect_args = {}
 if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
+elif DB_STATEMENT_TIMEOUT_MS:
+    connect_args = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,
     connect_args=connect_args,
+    **pool_kwargs(SQLALCHEMY_DATABASE_URL),
 )
 
+
+class PoolWaitStats:
+    """
+    Tempo para conseguir uma conexão utilizável do pool (espera na fila +
+    connect/pre-ping). Fica visível no /health.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg = self.total_seconds / self.acquired if self.acquired else 0.0
+            return {
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(avg * 1000, 2),
+                "wait_max_ms": round(self.max_seconds * 1000, 2),
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+def _pool_status(pool) -> dict:
+    out = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            out[name] = fn()
+    return out
+
+
+def pool_metrics() -> dict:
+    metrics = {
+        "config": {
+            "workers": WEB_CONCURRENCY,
+            "pool_size": DB_POOL_SIZE,
+            "async_pool_size": DB_ASYNC_POOL_SIZE if ASYNC_POOLED else 0,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "listen_connections": LISTEN_CONNECTIONS,
+            "max_connections_per_worker": max_connections_per_worker(),
+            "max_connections_total": max_connections_per_worker() * WEB_CONCURRENCY,
+            "budget": DB_MAX_CONNECTIONS or None,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+        },
+        "sync": {**_pool_status(engine.pool), **pool_wait_stats.snapshot()},
+    }
+    if async_engine is not None:
+        metrics["async"] = _pool_status(async_engine.pool)
+    return metrics
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+# -------------------------
+# Unidade de trabalho: uma transação (um COMMIT) por requisição
+# -------------------------
+# As funções de escrita do services.py só fazem flush; quem commita é o
+# get_db (rotas) ou o unit_of_work (scripts). Requisição sem escrita não
+# manda COMMIT: o close() devolve a conexão com rollback.
+_WRITES_KEY = "has_writes"
+_ON_COMMIT_KEY = "on_commit"
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info[_WRITES_KEY] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _mark_write(orm_execute_state):
+    # insert()/update()/delete() direto no db.execute não passam pelo flush
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[_WRITES_KEY] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _run_on_commit(session):
+    session.info.pop(_WRITES_KEY, None)
+    for fn in session.info.pop(_ON_COMMIT_KEY, ()):
+        fn()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_writes(session):
+    session.info.pop(_WRITES_KEY, None)
+    session.info.pop(_ON_COMMIT_KEY, None)
+
+
+def on_commit(db, fn) -> None:
+    """Roda fn() depois que a transação de `db` for commitada (ex.: invalidar cache)."""
+    db.info.setdefault(_ON_COMMIT_KEY, []).append(fn)
+
+
+def has_pending_writes(db) -> bool:
+    """A transação de `db` já escreveu algo (ou tem objetos sujos para o flush)."""
+    return bool(db.info.get(_WRITES_KEY) or db.new or db.dirty or db.deleted)
+
+
+def commit_if_dirty(db) -> None:
+    if has_pending_writes(db):
+        db.commit()
+
+
+@contextmanager
+def unit_of_work():
+    """Sessão para scripts (manage, bench): commit no fim, rollback se der erro."""
+    db = SessionLocal()
+    try:
+        yield db
+        commit_if_dirty(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def get_db():
     db = SessionLocal()
     try:
+        # pega a conexão já aqui para medir a espera no pool
+        t0 = time.perf_counter()
+        try:
+            db.connection()
+        except SATimeoutError:
+            pool_wait_stats.record_timeout()
+            raise
+        pool_wait_stats.record(time.perf_counter() - t0)
         yield db
+        # o FastAPI roda isto antes de mandar a resposta: se o COMMIT falhar,
+        # o cliente recebe erro, não um 201 de algo que não foi gravado
+        commit_if_dirty(db)
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
-def ensure_db_ready(max_wait_seconds: int = 40, sleep_seconds: float = 1.5):
+# =========================
+# SQLAlchemy async (opcional)
+# =========================
+def _build_async_db_url(url: str):
+    """
+    Mesma base, driver async. asyncpg não entende ?sslmode=..., então vira
+    connect_args={"ssl": ...}.
+    """
+    if url.startswith("sqlite"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1), {}
+
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    sslmode = query.pop("sslmode", None)
+    scheme = "postgresql+asyncpg"
+    async_url = urlunsplit((scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+    args = {}
+    if sslmode and sslmode != "disable":
+        args["ssl"] = "require" if sslmode in ("require", "prefer", "allow") else True
+    return async_url, args
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    # import aqui: sem DB_ASYNC o processo nem carrega o driver async
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_url, _async_connect_args = _build_async_db_url(SQLALCHEMY_DATABASE_URL)
+    if DB_STATEMENT_TIMEOUT_MS and not _async_url.startswith("sqlite"):
+        _async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    async_engine = create_async_engine(_async_url, connect_args=_async_connect_args, **pool_kwargs(_async_url, DB_ASYNC_POOL_SIZE))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# dependência das rotas de leitura: AsyncSession com DB_ASYNC, Session sync sem
+get_read_db = get_async_db if DB_ASYNC else get_db
+
+
+def ping_db() -> None:
+    """Uma tentativa de conexão (SELECT 1). Levanta a exceção do driver se falhar."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def backoff_delays(first: float = 0.25, factor: float = 2.0, max_delay: float = 10.0):
+    """0.25, 0.5, 1, 2, 4, 8, 10, 10, ... (segundos)"""
+    delay = first
+    while True:
+        yield delay
+        delay = min(delay * factor, max_delay)
+
+
+def ensure_db_ready(max_wait_seconds: int = 40):
     """
-    Tenta conectar no banco por até max_wait_seconds.
-    Útil no cold start (Render + Postgres/Supabase).
-    NÃO levanta ImportError nem faz circular import.
+    Versão bloqueante (CLI/scripts): tenta conectar com backoff exponencial
+    por até max_wait_seconds. O servidor web usa o aquecimento em background
+    do main.py e não bloqueia o startup.
     """
-    deadline = time.time() + max_wait_seconds
+    deadline = time.monotonic() + max_wait_seconds
     last_err = None
 
-    while time.time() < deadline:
+    for delay in backoff_delays():
         try:
-            with engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
+            ping_db()
             return True
         except Exception as e:
             last_err = e
-            time.sleep(sleep_seconds)
+        if time.monotonic() + delay > deadline:
+            break
+        time.sleep(delay)
 
     raise RuntimeError(f"Banco não ficou pronto em {max_wait_seconds}s. Erro: {last_err}")
@@ -0,0 +1,237 @@
+"""
+Eventos de alteração das viagens para o SSE (/t/{token}/events).
+
+As funções de escrita do services.py chamam publish_event(db, ...) dentro da
+transação; o evento só sai se o commit acontecer:
+
+- backend "local": o evento fica em db.info e é entregue aos assinantes do
+  próprio processo no after_commit (um worker só / desenvolvimento);
+- backend "postgres": vira pg_notify na mesma transação (o Postgres só
+  entrega no commit) e cada worker escuta o canal com LISTEN numa thread,
+  repassando para os assinantes locais. Serve para vários workers/instâncias.
+
+EVENTS_BACKEND: postgres (padrão com Postgres) | local (padrão no SQLite) | off
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from .db import EVENTS_BACKEND, WEB_CONCURRENCY, backoff_delays, engine
+
+log = logging.getLogger(__name__)
+
+PG_CHANNEL = "trip_events"
+# pg_notify aceita até 8000 bytes; acima disso manda só o tipo + "resync"
+PG_MAX_PAYLOAD = 7500
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+# -------------------------
+# Assinantes (por processo)
+# -------------------------
+class Subscription:
+    """
+    Uma conexão SSE. A fila pertence ao event loop de quem assinou; quem
+    publica pode estar em outra thread (threadpool, listener), por isso
+    a entrega passa por call_soon_threadsafe.
+    """
+
+    def __init__(self, token: str):
+        self.token = token
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _offer(self, evt: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(evt)
+        except asyncio.QueueFull:
+            # cliente lento: descarta o acumulado e manda recarregar tudo
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    def deliver(self, evt: Dict[str, Any]) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._offer, evt)
+        except RuntimeError:
+            pass  # loop já fechado (shutdown)
+
+
+class EventBroker:
+    def __init__(self):
+        self._subs: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, token: str) -> Subscription:
+        sub = Subscription(token)
+        with self._lock:
+            self._subs.setdefault(token, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.token)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.token]
+
+    def dispatch(self, token: str, evt: Dict[str, Any]) -> None:
+        with self._lock:
+            subs = list(self._subs.get(token, ()))
+        for sub in subs:
+            sub.deliver(evt)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"trips": len(self._subs), "subscribers": sum(len(s) for s in self._subs.values())}
+
+
+broker = EventBroker()
+
+
+# -------------------------
+# Backends
+# -------------------------
+_PENDING_KEY = "pending_trip_events"
+
+
+class EventBackend:
+    name = "base"
+
+    def publish(self, db: Session, token: str, evt: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        pass
+
+
+class LocalEventBackend(EventBackend):
+    """Entrega no after_commit, só para o próprio processo."""
+
+    name = "local"
+
+    def publish(self, db: Session, token: str, evt: Dict[str, Any]) -> None:
+        db.info.setdefault(_PENDING_KEY, []).append((token, evt))
+
+
+class PostgresEventBackend(EventBackend):
+    """
+    NOTIFY transacional + uma thread por processo em LISTEN, com uma conexão
+    dedicada (fora do pool). Reconecta com backoff se a conexão cair.
+    """
+
+    name = "postgres"
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def publish(self, db: Session, token: str, evt: Dict[str, Any]) -> None:
+        payload = json.dumps({"token": token, "event": evt}, default=str, ensure_ascii=False)
+        if len(payload.encode("utf-8")) > PG_MAX_PAYLOAD:
+            payload = json.dumps({"token": token, "event": {"type": evt["type"], "resync": True}})
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": PG_CHANNEL, "payload": payload})
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen_forever, name="trip-events-listen", daemon=True)
+                self._thread.start()
+
+    def _listen_forever(self) -> None:
+        delays = backoff_delays()
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                log.warning("LISTEN %s caiu: %s", PG_CHANNEL, e)
+            threading.Event().wait(next(delays))
+
+    def _listen(self) -> None:
+        raw = engine.raw_connection()
+        raw.detach()  # conexão dedicada: não volta para o pool
+        conn = raw.driver_connection
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {PG_CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 30)[0] == []:
+                    # timeout: confere se a conexão ainda está de pé
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    try:
+                        msg = json.loads(note.payload)
+                        broker.dispatch(msg["token"], msg["event"])
+                    except (ValueError, KeyError):
+                        log.warning("payload inválido em %s", PG_CHANNEL)
+        finally:
+            conn.close()
+
+
+def event_backend_from_env() -> Optional[EventBackend]:
+    kind = EVENTS_BACKEND
+    if kind in ("off", "none", "0", ""):
+        return None
+    if kind == "postgres" and engine.dialect.name == "postgresql":
+        return PostgresEventBackend()
+    if kind == "postgres":
+        log.warning("EVENTS_BACKEND=postgres sem Postgres configurado; usando local")
+    if WEB_CONCURRENCY > 1:
+        # cada worker só entrega o que ele mesmo gravou: o SSE perde eventos
+        log.warning(
+            "EVENTS_BACKEND=local com WEB_CONCURRENCY=%s: clientes SSE só veem as "
+            "alterações feitas no próprio worker; use EVENTS_BACKEND=postgres",
+            WEB_CONCURRENCY,
+        )
+    return LocalEventBackend()
+
+
+backend = event_backend_from_env()
+
+
+def publish_event(db: Session, token: str, kind: str, **data: Any) -> None:
+    """
+    Registra um evento na transação atual de `db`. Só é entregue se o commit
+    acontecer (rollback descarta).
+    """
+    if backend is None:
+        return
+    backend.publish(db, token, {"type": kind, **data})
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    for token, evt in pending or ():
+        broker.dispatch(token, evt)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def subscribe(token: str) -> Subscription:
+    if backend is not None:
+        backend.start()
+    return broker.subscribe(token)
+
+
+def unsubscribe(sub: Subscription) -> None:
+    broker.unsubscribe(sub)
+
+
+def events_status() -> Dict[str, Any]:
+    return {"backend": backend.name if backend else "off", **broker.stats()}
@@ -0,0 +1,105 @@
+"""
+Câmbio local, sem rede: as taxas vêm de um arquivo JSON
+(EXCHANGE_RATES_FILE, padrão app/data/exchange_rates.json):
+
+    {"base": "USD", "date": "2026-10-01", "rates": {"USD": 1, "BRL": 5.40, ...}}
+
+`rates` = quantas unidades da moeda valem 1 `base`. O arquivo é lido uma vez
+por processo e fica em memória, com os fatores por par de moedas em cache.
+Trocou o arquivo: reinicie (a versão entra no salt dos ETags/cache de HTML).
+
+Valores em centavos (1/100 da moeda, como o resto do app). Os totais são
+somados por moeda no banco e cada subtotal é convertido uma vez só.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Hashable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RATES_FILE = os.path.join(os.path.dirname(__file__), "data", "exchange_rates.json")
+
+
+class RateTable:
+    def __init__(self, base: str, date: str, rates: Dict[str, float], version: str):
+        self.base = base
+        self.date = date
+        self.rates = rates
+        self.version = version
+        self._factors: Dict[Tuple[str, str], Optional[float]] = {}
+
+    @property
+    def currencies(self):
+        return sorted(self.rates)
+
+    def factor(self, src: str, dst: str) -> Optional[float]:
+        """Multiplicador src -> dst, ou None se alguma moeda não estiver na tabela."""
+        if src == dst:
+            return 1.0
+        key = (src, dst)
+        if key not in self._factors:
+            r_src, r_dst = self.rates.get(src), self.rates.get(dst)
+            self._factors[key] = r_dst / r_src if r_src and r_dst else None
+        return self._factors[key]
+
+    def convert(self, cents: int, src: str, dst: str) -> Optional[int]:
+        f = self.factor(src, dst)
+        return None if f is None else int(round(cents * f))
+
+
+def load_rate_table(path: str) -> RateTable:
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        rates = {str(k).upper(): float(v) for k, v in data["rates"].items() if float(v) > 0}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        # sem tabela só converte moeda igual para igual
+        log.warning("Tabela de câmbio %s indisponível: %s", path, e)
+        return RateTable("", "", {}, "none")
+    version = hashlib.sha1(raw).hexdigest()[:12]
+    return RateTable(str(data.get("base", "")).upper(), str(data.get("date", "")), rates, version)
+
+
+_table: Optional[RateTable] = None
+_lock = threading.Lock()
+
+
+def rate_table() -> RateTable:
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = load_rate_table(os.getenv("EXCHANGE_RATES_FILE") or DEFAULT_RATES_FILE)
+    return _table
+
+
+def normalize_currency(code: Optional[str]) -> Optional[str]:
+    code = (code or "").strip().upper()
+    return code or None
+
+
+def convert_grouped(
+    amounts: Dict[Hashable, Dict[str, int]], dst: str
+) -> Tuple[Dict[Hashable, int], Dict[str, int]]:
+    """
+    {chave: {moeda: centavos}} -> ({chave: centavos em dst}, {moeda: centavos
+    sem taxa}). Uma conversão por (chave, moeda), não por item.
+    """
+    table = rate_table()
+    converted: Dict[Hashable, int] = {}
+    unconverted: Dict[str, int] = defaultdict(int)
+    for key, per_currency in amounts.items():
+        total = 0
+        for cur, cents in per_currency.items():
+            value = table.convert(cents, cur, dst)
+            if value is None:
+                unconverted[cur] += cents
+            else:
+                total += value
+        converted[key] = total
+    return converted, dict(unconverted)
@@ -1,29 +1,67 @@
-from collections import defaultdict
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import time
 from datetime import datetime, timedelta
+from typing import Any, List
 from urllib.parse import urlencode, quote
 
-from fastapi import FastAPI, Request, Depends, Form, HTTPException
-from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, Request, Depends, Form, HTTPException, File, UploadFile, Body
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
-from .db import Base, engine, get_db, ensure_db_ready
+from .cache import html_cache_from_env
+from . import events
+from .db import DB_ASYNC, async_engine, backoff_delays, engine, get_db, get_read_db, ping_db, pool_metrics
+from .fx import normalize_currency, rate_table
+from .metrics import MetricsMiddleware, instrument_engine, phase, registry as metrics_registry
+from .migrations import run_migrations
 from .schemas import TripCreate, ItemCreate, ParticipantCreate
 from .services import (
     create_trip,
     get_trip_by_token,
+    get_trip_ref,
+    get_trip_revision,
+    get_trip_view,
+    get_trip_page_view,
+    get_section_page,
+    SECTION_CATEGORIES,
+    get_trip_totals,
+    get_trip_settlement,
+    search_trip_items,
+    totals_summary,
+    item_view,
+    participant_view,
+    update_trip,
     create_item,
+    create_items_bulk,
     delete_item,
     add_participant,
     remove_participant,
     cents_to_money,
-    meta_from_json,
 )
+from .compression import CompressionMiddleware, compression_min_bytes_from_env
+from .templating import VersionedStaticFiles, minify_html, static_fingerprint, templates, templates_fingerprint
+
+if DB_ASYNC:
+    # só com DB_ASYNC: sem ele o processo nem carrega sqlalchemy.ext.asyncio
+    from . import services_async
 
 app = FastAPI(title="Trip Planner")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+app.mount("/static", VersionedStaticFiles(directory="app/static"), name="static")
+app.add_middleware(CompressionMiddleware, minimum_size=compression_min_bytes_from_env())
+# por fora da compressão: a latência inclui comprimir
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+html_cache = html_cache_from_env()
 
 CATEGORY_LABEL = {
     "activity": "Passeios",
@@ -37,20 +75,68 @@ CATEGORY_LABEL = {
 }
 
 # --------------------------------------------
-# STARTUP: tenta DB, mas NÃO derruba o server
+# STARTUP: não bloqueia; o DB aquece em background
 # --------------------------------------------
+# O startup retorna na hora. Uma task tenta conectar com backoff exponencial,
+# aplica migrações pendentes (ou só confere a versão) e liga DB_OK; até lá
+# as rotas respondem o 503 amigável com auto-retry.
 DB_OK = False
+DB_WARMUP = {
+    "started_at": None,
+    "ready_at": None,
+    "attempts": 0,
+    "last_error": None,
+    "schema_version": None,
+}
+_warmup_task = None
 
-@app.on_event("startup")
-def _startup():
+
+def _prepare_db() -> int:
+    ping_db()
+    return run_migrations()
+
+
+async def _warm_up_db():
     global DB_OK
-    try:
-        ensure_db_ready(max_wait_seconds=40)
-        Base.metadata.create_all(bind=engine)
+    for delay in backoff_delays():
+        DB_WARMUP["attempts"] += 1
+        try:
+            DB_WARMUP["schema_version"] = await run_in_threadpool(_prepare_db)
+        except Exception as e:
+            DB_WARMUP["last_error"] = f"{type(e).__name__}: {e}"[:300]
+            await asyncio.sleep(delay)
+            continue
+        DB_WARMUP["ready_at"] = time.monotonic()
+        DB_WARMUP["last_error"] = None
         DB_OK = True
-    except Exception:
-        # não derruba a app; a UI vai mostrar 503 amigável
-        DB_OK = False
+        return
+
+
+@app.on_event("startup")
+async def _startup():
+    global _warmup_task
+    DB_WARMUP["started_at"] = time.monotonic()
+    # guarda a referência: o event loop só mantém referência fraca às tasks
+    _warmup_task = asyncio.create_task(_warm_up_db())
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+
+
+def db_warmup_status() -> dict:
+    started, ready = DB_WARMUP["started_at"], DB_WARMUP["ready_at"]
+    status = {
+        "attempts": DB_WARMUP["attempts"],
+        "schema_version": DB_WARMUP["schema_version"],
+        "time_to_ready_ms": round((ready - started) * 1000, 1) if ready and started else None,
+    }
+    if not DB_OK:
+        status["waiting_ms"] = round((time.monotonic() - started) * 1000, 1) if started else None
+        status["last_error"] = DB_WARMUP["last_error"]
+    return status
 
 
 def parse_yyyy_mm_dd(value: str, field: str):
@@ -95,6 +181,11 @@ def build_google_calendar_link(title: str, destination: str, start_date, end_dat
     return "https://calendar.google.com/calendar/render?" + urlencode(params)
 
 
+def wants_json(request: Request) -> bool:
+    # formulários enviados pelo app.js (fetch) pedem JSON no lugar do 303
+    return "application/json" in request.headers.get("accept", "")
+
+
 def redirect_with_error(token: str, msg: str):
     return RedirectResponse(url=f"/t/{token}?error={quote(msg)}", status_code=303)
 
@@ -109,6 +200,143 @@ def enforce_date_in_trip(trip, dt, label: str):
         )
 
 
+def _etag_salt() -> str:
+    # muda a cada deploy (commit no Render) ou quando templates/estáticos/câmbio mudam
+    commit = os.getenv("RENDER_GIT_COMMIT", "")
+    if commit:
+        # a tabela de câmbio pode vir de fora do repo (EXCHANGE_RATES_FILE)
+        return commit + "-" + rate_table().version
+    return "-".join((templates_fingerprint(), static_fingerprint(), rate_table().version))
+
+
+ETAG_SALT = _etag_salt()
+
+# página compartilhada por link: o navegador guarda, mas sempre revalida
+TRIP_CACHE_CONTROL = "private, no-cache"
+
+
+def trip_etag(token: str, revision: int, *parts) -> str:
+    raw = ":".join([ETAG_SALT, token, str(revision), *[str(p or "") for p in parts]])
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca: ignora o prefixo W/
+    candidates = [c.strip() for c in header.split(",")]
+    return any((c[2:] if c.startswith("W/") else c) == etag for c in candidates)
+
+
+def trip_html_cache_key(token: str, revision: int, base: str) -> str:
+    return f"trip:{token}:{revision}:{ETAG_SALT}:{base}"
+
+
+def not_modified(etag: str):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": TRIP_CACHE_CONTROL})
+
+
+# -------------------------
+# Importação em lote (JSON / CSV)
+# -------------------------
+MAX_IMPORT_ROWS = 1000
+
+# colunas extras que viram meta (mesmos nomes que o add_item grava)
+IMPORT_META_FIELDS = (
+    "address", "notes", "period", "ticket_url", "time", "company", "origin",
+    "destination", "duration", "connection_place", "connection_duration",
+    "hotel_type", "nights", "daily_value", "meal_type", "transport_type",
+)
+IMPORT_META_FLAGS = ("is_free", "has_connection", "is_car_rental")
+
+
+def _import_flag(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "sim", "s", "yes", "y", "x")
+
+
+def import_row_to_item(trip, row: dict) -> ItemCreate:
+    """
+    Valida uma linha de importação com as mesmas regras do formulário
+    (data no período da viagem, valor via parse_money_to_float).
+    Levanta ValueError com mensagem amigável.
+    """
+    def text_of(key):
+        v = row.get(key)
+        return "" if v is None else str(v).strip()
+
+    item_date = None
+    if text_of("item_date"):
+        try:
+            item_date = parse_yyyy_mm_dd(text_of("item_date"), "Data")
+            enforce_date_in_trip(trip, item_date, "Data")
+        except HTTPException as e:
+            raise ValueError(str(e.detail))
+
+    cost = None
+    raw_cost = row.get("cost")
+    if isinstance(raw_cost, (int, float)) and not isinstance(raw_cost, bool):
+        cost = float(raw_cost)
+    elif text_of("cost"):
+        cost = parse_money_to_float(text_of("cost"))
+
+    meta = {k: text_of(k) for k in IMPORT_META_FIELDS if text_of(k)}
+    for k in IMPORT_META_FLAGS:
+        if k in row:
+            meta[k] = _import_flag(row.get(k))
+    url = text_of("url")
+    if url:
+        meta["url"] = url
+    if meta.get("is_free"):
+        cost = None
+
+    currency = normalize_currency(text_of("currency"))
+    if currency and currency != trip.currency and currency not in rate_table().rates:
+        raise ValueError(f"Moeda sem taxa de câmbio: {currency}.")
+
+    try:
+        return ItemCreate(
+            category=text_of("category"),
+            title=text_of("title"),
+            item_date=item_date,
+            url=url or None,
+            cost=cost,
+            currency=currency,
+            notes=None,
+            meta=meta or None,
+        )
+    except ValidationError as ve:
+        first = ve.errors()[0]
+        field = ".".join(str(x) for x in first.get("loc", ()))
+        raise ValueError(f"{field}: {first.get('msg')}")
+
+
+def import_items(db: Session, trip, rows: list) -> dict:
+    """
+    Valida todas as linhas e grava as válidas numa transação só.
+    Linhas com erro são reportadas (número começa em 1) e não abortam o lote.
+    """
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {MAX_IMPORT_ROWS} linhas por importação.")
+
+    payloads, errors = [], []
+    for n, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": n, "error": "Linha inválida (esperado objeto)."})
+            continue
+        try:
+            payloads.append(import_row_to_item(trip, row))
+        except ValueError as ve:
+            errors.append({"row": n, "error": str(ve)})
+
+    created = create_items_bulk(db, trip, payloads)
+    return {"created": created, "errors": errors}
+
+
 def db_gate_or_503(request: Request):
     """
     Se DB ainda não estiver OK (cold start), devolve 503 amigável com auto-retry.
@@ -152,6 +380,117 @@ def db_gate_or_503(request: Request):
     return HTMLResponse(content=html, status_code=503)
 
 
+# -------------------------
+# Leituras: sync (threadpool) ou async (DB_ASYNC=1)
+# -------------------------
+async def read_trip_revision(db, token: str):
+    if DB_ASYNC:
+        return await services_async.get_trip_revision(db, token)
+    return await run_in_threadpool(get_trip_revision, db, token)
+
+
+async def read_trip_view(db, token: str, revision: int):
+    if DB_ASYNC:
+        return await services_async.get_trip_view(db, token, revision)
+    return await run_in_threadpool(get_trip_view, db, token, revision)
+
+
+async def read_trip_page_view(db, token: str, revision: int):
+    if DB_ASYNC:
+        return await services_async.get_trip_page_view(db, token, revision)
+    return await run_in_threadpool(get_trip_page_view, db, token, revision)
+
+
+async def read_section_page(db, token: str, category: str, cursor):
+    """
+    (trip, dias, próximo cursor) de uma seção, ou (None, None, None) se a
+    viagem não existir. Cursor inválido: ValueError.
+    """
+    if DB_ASYNC:
+        trip = await services_async.get_trip_by_token(db, token)
+        if not trip:
+            return None, None, None
+        return (trip, *await services_async.get_section_page(db, trip.id, category, cursor))
+
+    def _read():
+        trip = get_trip_ref(db, token)
+        if not trip:
+            return None, None, None
+        return (trip, *get_section_page(db, trip.id, category, cursor))
+
+    return await run_in_threadpool(_read)
+
+
+async def read_trip_settlement(db, token: str, revision: int, trip=None):
+    """
+    Acerto de contas da viagem na revisão lida pelo chamador, ou None se a
+    viagem não existir. A página passa a própria view.trip (sem query extra).
+    """
+    if DB_ASYNC:
+        trip = trip or await services_async.get_trip_by_token(db, token)
+        return await services_async.get_trip_settlement(db, trip, revision) if trip else None
+
+    def _read():
+        ref = trip or get_trip_ref(db, token)
+        return get_trip_settlement(db, ref, revision) if ref else None
+
+    return await run_in_threadpool(_read)
+
+
+async def read_search(db, token: str, q: str, page: int):
+    """
+    (trip, resultados) ou (None, None) se a viagem não existir. A busca é
+    sempre dentro de uma viagem: o token é o que dá acesso aos itens.
+    """
+    if DB_ASYNC:
+        trip = await services_async.get_trip_by_token(db, token)
+        return (trip, await services_async.search_trip_items(db, trip, q, page)) if trip else (None, None)
+
+    def _read():
+        trip = get_trip_ref(db, token)
+        return (trip, search_trip_items(db, trip, q, page)) if trip else (None, None)
+
+    return await run_in_threadpool(_read)
+
+
+async def read_trip_totals(db, token: str):
+    """
+    (trip, totais) ou (None, None) se a viagem não existir.
+    """
+    if DB_ASYNC:
+        trip = await services_async.get_trip_by_token(db, token)
+        return (trip, await services_async.get_trip_totals(db, trip)) if trip else (None, None)
+
+    def _read():
+        trip = get_trip_ref(db, token)
+        return (trip, get_trip_totals(db, trip)) if trip else (None, None)
+
+    return await run_in_threadpool(_read)
+
+
+def api_gate_or_503():
+    if DB_OK:
+        return None
+    return JSONResponse({"detail": "Banco ainda conectando, tente novamente."}, status_code=503)
+
+
+def totals_payload(trip, totals: dict) -> dict:
+    """
+    Totais em centavos + já formatados (o front só troca o texto).
+    """
+    return {
+        **totals,
+        "currency": trip.currency,
+        "rates_date": rate_table().date,
+        "display": {
+            "by_cat": {cat: cents_to_money(v) for cat, v in totals["total_by_cat"].items()},
+            "by_currency": {cur: cents_to_money(v) for cur, v in totals["by_currency"].items()},
+            "total_all": cents_to_money(totals["total_all"]),
+            "per_person": cents_to_money(totals["per_person"]),
+        },
+    }
+
+
 # -------------------------
 # Routes básicas
 # -------------------------
@@ -166,7 +505,39 @@ def head_root():
 @app.get("/health")
 def health():
     # Se DB_OK false, ainda retorna 200 mas avisa
-    return JSONResponse({"status": "ok", "db_ready": bool(DB_OK)})
+    return JSONResponse(
+        {
+            "status": "ok",
+            "db_ready": bool(DB_OK),
+            "db_warmup": db_warmup_status(),
+            "html_cache": html_cache.stats(),
+            "db_pool": pool_metrics(),
+            "events": events.events_status(),
+        }
+    )
+
+@app.get("/metrics")
+def metrics(request: Request):
+    """
+    Formato texto do Prometheus. Com METRICS_TOKEN definido, exige
+    Authorization: Bearer <token>.
+    """
+    expected = os.getenv("METRICS_TOKEN", "")
+    if expected and request.headers.get("authorization") != f"Bearer {expected}":
+        raise HTTPException(status_code=401, detail="Não autorizado")
+
+    cache = html_cache.stats()
+    pool = pool_metrics()["sync"]
+    gauges = {
+        "db_ready": int(bool(DB_OK)),
+        "db_pool_checked_out": pool.get("checkedout", 0),
+        "db_pool_wait_max_seconds": round(pool["wait_max_ms"] / 1000, 6),
+        "html_cache_hits": cache.get("hits", 0),
+        "html_cache_misses": cache.get("misses", 0),
+        "sse_subscribers": events.events_status()["subscribers"],
+    }
+    return Response(metrics_registry.render(gauges), media_type="text/plain; version=0.0.4")
+
 
 @app.head("/health")
 def head_health():
@@ -188,8 +559,7 @@ def trip_new_page(request: Request):
             "share_url": None,
             "gcal_url": None,
             "groups": {},
-            "by_day": {},
-            "days_sorted": [],
+            "days_by_cat": {},
             "participants": [],
             "category_label": CATEGORY_LABEL,
             "cents_to_money": cents_to_money,
@@ -241,7 +611,10 @@ def trip_create_submit(
             end_date=end_dt,
             currency=currency,
         )
-        trip = create_trip(db, payload)
+        try:
+            trip = create_trip(db, payload)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
         return RedirectResponse(url=f"/t/{trip.token}", status_code=303)
 
     except HTTPException as e:
@@ -254,8 +627,7 @@ def trip_create_submit(
                 "share_url": None,
                 "gcal_url": None,
                 "groups": {},
-                "by_day": {},
-                "days_sorted": [],
+                "days_by_cat": {},
                 "participants": [],
                 "category_label": CATEGORY_LABEL,
                 "cents_to_money": cents_to_money,
@@ -268,71 +640,269 @@ def trip_create_submit(
         )
 
 
+def render_trip_page(request: Request, view, settlement, base: str, error) -> bytes:
+    trip = view.trip
+    share_url = f"{base}/t/{trip.token}"
+    gcal_url = build_google_calendar_link(trip.title, trip.destination, trip.start_date, trip.end_date, share_url)
+
+    with phase("render"):
+        html = templates.get_template("trip_onepage.html").render(
+            {
+                "request": request,
+                "mode": "view",
+                "trip": trip,
+                "share_url": share_url,
+                "gcal_url": gcal_url,
+                "days_by_cat": view.days_by_cat,
+                "next_cursor_by_cat": view.next_cursor_by_cat,
+                "count_by_cat": view.count_by_cat,
+                "participants": view.participants,
+                "category_label": CATEGORY_LABEL,
+                "cents_to_money": cents_to_money,
+                "total_by_cat": view.total_by_cat,
+                "total_all": view.total_all,
+                "per_person": view.per_person,
+                "by_currency": view.by_currency,
+                "unconverted": view.unconverted,
+                "rates": rate_table(),
+                "settlement": settlement,
+                "error": error,
+            }
+        )
+        html = minify_html(html)
+    return html.encode("utf-8")
+
+
 @app.get("/t/{token}", response_class=HTMLResponse)
-def trip_page(token: str, request: Request, db: Session = Depends(get_db)):
+async def trip_page(token: str, request: Request, db=Depends(get_read_db)):
     gate = db_gate_or_503(request)
     if gate:
         return gate
 
-    trip = get_trip_by_token(db, token)
-    if not trip:
+    revision = await read_trip_revision(db, token)
+    if revision is None:
         raise HTTPException(status_code=404, detail="Viagem não encontrada")
 
     base = str(request.base_url).rstrip("/")
-    share_url = f"{base}/t/{trip.token}"
-    gcal_url = build_google_calendar_link(trip.title, trip.destination, trip.start_date, trip.end_date, share_url)
     error = request.query_params.get("error")
 
-    groups = defaultdict(list)
-    total_by_cat = defaultdict(int)
-    total_all = 0
+    etag = trip_etag(token, revision, base, error)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    for item in trip.items:
-        meta = meta_from_json(getattr(item, "meta_json", None))
-        item._meta = meta
-        groups[item.category].append(item)
+    headers = {"ETag": etag, "Cache-Control": TRIP_CACHE_CONTROL}
 
-        if item.cost is not None:
-            total_by_cat[item.category] += item.cost
-            total_all += item.cost
+    # HTML pronto só para a página "limpa" (sem ?error=...)
+    cache_key = None if error else trip_html_cache_key(token, revision, base)
+    if cache_key:
+        cached = await html_cache.aget(cache_key)
+        if cached is not None:
+            return HTMLResponse(content=cached, headers=headers)
 
-    for cat in list(groups.keys()):
-        groups[cat].sort(key=lambda x: (x.item_date is None, x.item_date, x.created_at))
+    with phase("view"):
+        view = await read_trip_page_view(db, token, revision)
+        if view:
+            settlement = await read_trip_settlement(db, token, view.trip.revision, trip=view.trip)
+    if not view:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    if view.trip.revision != revision:
+        # mudou entre a checagem da revisão e a carga: não cacheia essa versão
+        cache_key = None
+        headers["ETag"] = trip_etag(token, view.trip.revision, base, error)
+
+    # render é CPU: fora do event loop
+    html = await run_in_threadpool(render_trip_page, request, view, settlement, base, error)
+    if cache_key:
+        await html_cache.aset(cache_key, html)
+    return HTMLResponse(content=html, headers=headers)
+
+
+def render_section(trip, category: str, days) -> str:
+    with phase("render"):
+        html = templates.get_template(f"partials/days_{category}.html").render(
+            {"days": days, "trip": trip, "cents_to_money": cents_to_money}
+        )
+        return minify_html(html)
 
-    by_day = defaultdict(list)
-    for it in groups.get("activity", []):
-        if it.item_date:
-            by_day[it.item_date].append(it)
-    for d in list(by_day.keys()):
-        by_day[d].sort(key=lambda x: (x._meta.get("time", ""), x.created_at))
-    days_sorted = sorted(by_day.keys())
 
-    participants = sorted(trip.participants, key=lambda p: p.created_at)
-    people = max(1, len(participants))
-    per_person = int(round(total_all / people)) if total_all else 0
+def item_created_payload(db: Session, trip, item) -> dict:
+    """Item novo + linha de dia com o card (mesmo partial das seções) + totais."""
+    view = item_view(item)
+    html = ""
+    if view.category in SECTION_CATEGORIES:
+        html = render_section(trip, view.category, [(str(view.item_date), [view])])
+    return {"item": view, "html": html, "totals": totals_payload(trip, get_trip_totals(db, trip))}
 
-    return templates.TemplateResponse(
-        "trip_onepage.html",
-        {
-            "request": request,
-            "mode": "view",
-            "trip": trip,
-            "share_url": share_url,
-            "gcal_url": gcal_url,
-            "groups": groups,
-            "by_day": by_day,
-            "days_sorted": days_sorted,
-            "participants": participants,
-            "category_label": CATEGORY_LABEL,
-            "cents_to_money": cents_to_money,
-            "total_by_cat": total_by_cat,
-            "total_all": total_all,
-            "per_person": per_person,
-            "error": error,
-        },
+
+@app.get("/t/{token}/sections/{category}", response_class=HTMLResponse)
+async def trip_section(token: str, category: str, request: Request, cursor: str = "", db=Depends(get_read_db)):
+    """
+    Próxima página de uma seção (linhas de dia em HTML, para o "Carregar
+    mais"). O cursor seguinte vai no header X-Next-Cursor (vazio no fim).
+    """
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+    if category not in SECTION_CATEGORIES:
+        raise HTTPException(status_code=404, detail="Seção não encontrada")
+
+    revision = await read_trip_revision(db, token)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    etag = trip_etag(token, revision, "section", category, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    try:
+        trip, days, next_cursor = await read_section_page(db, token, category, cursor or None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if trip is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+
+    # render é CPU: fora do event loop
+    html = await run_in_threadpool(render_section, trip, category, days)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": TRIP_CACHE_CONTROL,
+        "X-Next-Cursor": next_cursor or "",
+    }
+    return HTMLResponse(content=html, headers=headers)
+
+
+SEARCH_MAX_QUERY = 200
+
+
+def search_params(q: str, page: int):
+    return q.strip()[:SEARCH_MAX_QUERY], max(page, 1)
+
+
+def render_search_page(request: Request, trip, results) -> str:
+    def page_url(n: int) -> str:
+        return f"/t/{trip.token}/search?" + urlencode({"q": results.query, "page": n})
+
+    with phase("render"):
+        html = templates.get_template("search.html").render(
+            {
+                "request": request,
+                "trip": trip,
+                "results": results,
+                "category_label": CATEGORY_LABEL,
+                "cents_to_money": cents_to_money,
+                "prev_url": page_url(results.page - 1) if results.page > 1 else None,
+                "next_url": page_url(results.page + 1) if results.has_more else None,
+            }
+        )
+        return minify_html(html)
+
+
+@app.get("/t/{token}/search", response_class=HTMLResponse)
+async def trip_search(token: str, request: Request, q: str = "", page: int = 1, db=Depends(get_read_db)):
+    """
+    Busca nos itens da viagem (título, endereço, companhia, notas), por
+    relevância, SEARCH_PAGE_SIZE por página.
+    """
+    gate = db_gate_or_503(request)
+    if gate:
+        return gate
+    q, page = search_params(q, page)
+
+    revision = await read_trip_revision(db, token)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    etag = trip_etag(token, revision, "search", q, page)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    with phase("view"):
+        trip, results = await read_search(db, token, q, page)
+    if trip is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+
+    # render é CPU: fora do event loop
+    html = await run_in_threadpool(render_search_page, request, trip, results)
+    headers = {"ETag": etag, "Cache-Control": TRIP_CACHE_CONTROL}
+    return HTMLResponse(content=html, headers=headers)
+
+
+@app.get("/t/{token}/calendar.ics")
+async def trip_calendar(token: str, request: Request, db=Depends(get_read_db)):
+    """
+    Feed de assinatura (.ics). Apps de calendário consultam a cada poucos
+    minutos: com ETag pela revisão, quase sempre respondem 304.
+    """
+    gate = db_gate_or_503(request)
+    if gate:
+        return gate
+
+    revision = await read_trip_revision(db, token)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    etag = trip_etag(token, revision, "ics")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    view = await read_trip_view(db, token, revision)
+    if not view:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    # import tardio: o feed .ics é raro perto das páginas e da API
+    from .calendar_export import iter_trip_ics
+
+    items = [it for its in view.groups.values() for it in its]
+    headers = {
+        "ETag": trip_etag(token, view.trip.revision, "ics"),
+        "Cache-Control": TRIP_CACHE_CONTROL,
+        "Content-Disposition": 'inline; filename="viagem.ics"',
+    }
+    return StreamingResponse(
+        iter_trip_ics(view.trip, items),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
     )
 
 
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def sse_message(evt: dict) -> str:
+    return f"event: {evt['type']}\ndata: {json.dumps(evt, default=str, ensure_ascii=False)}\n\n"
+
+
+@app.get("/t/{token}/events")
+async def trip_events(token: str, request: Request, db=Depends(get_read_db)):
+    """
+    Server-Sent Events com as alterações da viagem (item_created,
+    item_deleted, participant_added, ...). O front aplica a diferença na
+    página em vez de recarregar. Comentário de heartbeat a cada 15 s para
+    proxies não derrubarem a conexão.
+    """
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    if await read_trip_revision(db, token) is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+
+    async def stream():
+        sub = events.subscribe(token)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    evt = await asyncio.wait_for(sub.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield sse_message(evt)
+        finally:
+            events.unsubscribe(sub)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+
 @app.post("/t/{token}/edit")
 def edit_trip(
     token: str,
@@ -352,20 +922,17 @@ def edit_trip(
         ed = parse_yyyy_mm_dd(end_date, "Fim")
         if ed < sd:
             return redirect_with_error(token, "Fim não pode ser antes do início.")
-        trip.title = title.strip()
-        trip.destination = destination.strip()
-        trip.start_date = sd
-        trip.end_date = ed
-        trip.currency = (currency or "BRL").strip().upper()
-        db.commit()
+        update_trip(db, trip, title, destination, sd, ed, currency)
         return RedirectResponse(url=f"/t/{token}", status_code=303)
     except HTTPException as e:
         return redirect_with_error(token, str(e.detail))
+    except ValueError as ve:
+        return redirect_with_error(token, str(ve))
 
 
 @app.post("/t/{token}/join")
 def join_trip(token: str, name: str = Form(...), email: str = Form(""), db: Session = Depends(get_db)):
-    trip = get_trip_by_token(db, token)
+    trip = get_trip_ref(db, token)
     if not trip:
         raise HTTPException(status_code=404, detail="Viagem não encontrada")
     payload = ParticipantCreate(name=name, email=email or None)
@@ -375,7 +942,7 @@ def join_trip(token: str, name: str = Form(...), email: str = Form(""), db: Sess
 
 @app.post("/t/{token}/participants/{participant_id}/delete")
 def delete_participant(token: str, participant_id: int, db: Session = Depends(get_db)):
-    trip = get_trip_by_token(db, token)
+    trip = get_trip_ref(db, token)
     if not trip:
         raise HTTPException(status_code=404, detail="Viagem não encontrada")
     remove_participant(db, trip, participant_id)
@@ -384,6 +951,7 @@ def delete_participant(token: str, participant_id: int, db: Session = Depends(ge
 
 @app.post("/t/{token}/items")
 def add_item(
+    request: Request,
     token: str,
     category: str = Form(...),
 
@@ -424,11 +992,26 @@ def add_item(
     car_days: str = Form(""),
     transport_link: str = Form(""),
 
+    paid_by: str = Form(""),
+    shared_with: List[str] = Form([]),
+    item_currency: str = Form("", alias="currency"),
+
     db: Session = Depends(get_db),
 ):
-    trip = get_trip_by_token(db, token)
+    """
+    Formulário de item. Com Accept: application/json (o app.js) responde 201
+    com o item, o card já renderizado e os totais, ou 400 com a mensagem;
+    sem JS, redireciona de volta para a página.
+    """
+    trip = get_trip_ref(db, token)
     if not trip:
         raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    as_json = wants_json(request)
+
+    def fail(msg: str):
+        if as_json:
+            return JSONResponse({"detail": msg}, status_code=400)
+        return redirect_with_error(token, msg)
 
     date_raw = (item_date or "").strip()
     if category == "hotel" and checkin_date.strip():
@@ -444,14 +1027,14 @@ def add_item(
             parsed_item_date = parse_yyyy_mm_dd(date_raw, "Data")
             enforce_date_in_trip(trip, parsed_item_date, "Data")
         except HTTPException as e:
-            return redirect_with_error(token, str(e.detail))
+            return fail(str(e.detail))
 
     parsed_cost = None
     if cost.strip():
         try:
             parsed_cost = parse_money_to_float(cost)
         except ValueError as ve:
-            return redirect_with_error(token, str(ve))
+            return fail(str(ve))
 
     meta = {}
     if address.strip():
@@ -544,17 +1127,257 @@ def add_item(
             cost=parsed_cost,
             notes=None,
             meta=meta or None,
+            currency=item_currency or None,
+            paid_by=int(paid_by) if paid_by.strip() else None,
+            shared_with=[int(pid) for pid in shared_with if pid.strip()],
         )
-        create_item(db, trip, payload)
+    except ValueError:  # ValidationError do pydantic ou int() de pagador/quem divide
+        return fail("Erro ao salvar item. Verifique os campos e tente novamente.")
+
+    try:
+        item = create_item(db, trip, payload)
+        if as_json:
+            return JSONResponse(jsonable_encoder(item_created_payload(db, trip, item)), status_code=201)
         return RedirectResponse(url=f"/t/{token}", status_code=303)
+    except ValueError as ve:
+        # moeda sem taxa / participante de outra viagem: a mensagem é para o usuário
+        db.rollback()
+        return fail(str(ve))
     except Exception:
-        return redirect_with_error(token, "Erro ao salvar item. Verifique os campos e tente novamente.")
+        db.rollback()  # nada do que foi enviado ao banco pode ir no commit do get_db
+        return fail("Erro ao salvar item. Verifique os campos e tente novamente.")
 
 
 @app.post("/t/{token}/items/{item_id}/delete")
 def remove_item(token: str, item_id: int, db: Session = Depends(get_db)):
-    trip = get_trip_by_token(db, token)
+    trip = get_trip_ref(db, token)
     if not trip:
         raise HTTPException(status_code=404, detail="Viagem não encontrada")
     delete_item(db, trip, item_id)
     return RedirectResponse(url=f"/t/{token}", status_code=303)
+
+
+# -------------------------
+# API JSON (edições sem recarregar a página)
+# -------------------------
+@app.get("/api/t/{token}")
+async def api_trip(token: str, request: Request, db=Depends(get_read_db)):
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    revision = await read_trip_revision(db, token)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    etag = trip_etag(token, revision, "api")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    view = await read_trip_view(db, token, revision)
+    if not view:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    totals = totals_summary(
+        view.total_by_cat,
+        {cat: len(items) for cat, items in view.groups.items()},
+        len(view.participants),
+        view.by_currency,
+        view.unconverted,
+    )
+    payload = {
+        "trip": view.trip,
+        "items": [it for items in view.groups.values() for it in items],
+        "participants": view.participants,
+        "totals": totals_payload(view.trip, totals),
+    }
+    headers = {"ETag": trip_etag(token, view.trip.revision, "api"), "Cache-Control": TRIP_CACHE_CONTROL}
+    return JSONResponse(jsonable_encoder(payload), headers=headers)
+
+
+@app.get("/api/t/{token}/totals")
+async def api_trip_totals(token: str, db=Depends(get_read_db)):
+    """
+    Só os totais (materializados em trip_totals): não carrega itens.
+    """
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    trip, totals = await read_trip_totals(db, token)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    return totals_payload(trip, totals)
+
+
+def settlement_payload(view) -> dict:
+    def person(p):
+        return {"id": p.id, "name": p.name}
+
+    return {
+        "currency": view.currency,
+        "revision": view.revision,
+        "balances": [
+            {**person(b.participant), "paid": b.paid, "owed": b.owed, "balance": b.balance}
+            for b in view.balances
+        ],
+        "transfers": [
+            {"from": person(t.debtor), "to": person(t.creditor), "amount": t.amount,
+             "display": cents_to_money(t.amount)}
+            for t in view.transfers
+        ],
+        "unassigned": view.unassigned,
+    }
+
+
+@app.get("/api/t/{token}/settlement")
+async def api_trip_settlement(token: str, request: Request, db=Depends(get_read_db)):
+    """
+    Saldos (pago - devido, em centavos) e as transferências para zerar.
+    """
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    revision = await read_trip_revision(db, token)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    etag = trip_etag(token, revision, "settlement")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    view = await read_trip_settlement(db, token, revision)
+    if view is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    headers = {"ETag": etag, "Cache-Control": TRIP_CACHE_CONTROL}
+    return JSONResponse(settlement_payload(view), headers=headers)
+
+
+@app.get("/api/t/{token}/search")
+async def api_trip_search(token: str, request: Request, q: str = "", page: int = 1, db=Depends(get_read_db)):
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+    q, page = search_params(q, page)
+
+    revision = await read_trip_revision(db, token)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    etag = trip_etag(token, revision, "api-search", q, page)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    trip, results = await read_search(db, token, q, page)
+    if trip is None:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    payload = {
+        "query": results.query,
+        "page": results.page,
+        "has_more": results.has_more,
+        "items": [{**jsonable_encoder(hit.item), "rank": hit.rank} for hit in results.hits],
+    }
+    headers = {"ETag": etag, "Cache-Control": TRIP_CACHE_CONTROL}
+    return JSONResponse(payload, headers=headers)
+
+
+@app.post("/api/t/{token}/items", status_code=201)
+def api_add_item(token: str, payload: ItemCreate, db: Session = Depends(get_db)):
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    trip = get_trip_ref(db, token)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    enforce_date_in_trip(trip, payload.item_date, "Data")
+
+    try:
+        item = create_item(db, trip, payload)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    body = {"item": item_view(item), "totals": totals_payload(trip, get_trip_totals(db, trip))}
+    return JSONResponse(jsonable_encoder(body), status_code=201)
+
+
+@app.delete("/api/t/{token}/items/{item_id}")
+def api_delete_item(token: str, item_id: int, db: Session = Depends(get_db)):
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    trip = get_trip_ref(db, token)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    if not delete_item(db, trip, item_id):
+        raise HTTPException(status_code=404, detail="Item não encontrado")
+    return {"deleted": item_id, "totals": totals_payload(trip, get_trip_totals(db, trip))}
+
+
+@app.post("/api/t/{token}/participants", status_code=201)
+def api_join_trip(token: str, payload: ParticipantCreate, db: Session = Depends(get_db)):
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    trip = get_trip_ref(db, token)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+
+    p = add_participant(db, trip, payload)
+    body = {"participant": participant_view(p), "totals": totals_payload(trip, get_trip_totals(db, trip))}
+    return JSONResponse(jsonable_encoder(body), status_code=201)
+
+
+@app.delete("/api/t/{token}/participants/{participant_id}")
+def api_delete_participant(token: str, participant_id: int, db: Session = Depends(get_db)):
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    trip = get_trip_ref(db, token)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+    if not remove_participant(db, trip, participant_id):
+        raise HTTPException(status_code=404, detail="Participante não encontrado")
+    return {"deleted": participant_id, "totals": totals_payload(trip, get_trip_totals(db, trip))}
+
+
+@app.post("/api/t/{token}/items/bulk")
+def api_bulk_items(token: str, rows: List[Any] = Body(...), db: Session = Depends(get_db)):
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    trip = get_trip_ref(db, token)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+
+    report = import_items(db, trip, rows)
+    report["totals"] = totals_payload(trip, get_trip_totals(db, trip))
+    return report
+
+
+@app.post("/api/t/{token}/items/import")
+def api_import_items_csv(token: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    CSV com cabeçalho (category,title,item_date,cost,...). Aceita , ; ou tab.
+    """
+    gate = api_gate_or_503()
+    if gate:
+        return gate
+
+    trip = get_trip_ref(db, token)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Viagem não encontrada")
+
+    try:
+        content = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV precisa estar em UTF-8.")
+    try:
+        dialect = csv.Sniffer().sniff(content.split("\n", 1)[0], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    rows = list(csv.DictReader(io.StringIO(content), dialect=dialect))
+
+    report = import_items(db, trip, rows)
+    report["totals"] = totals_payload(trip, get_trip_totals(db, trip))
+    return report
@@ -0,0 +1,78 @@
+"""
+Comandos de manutenção:
+
+    python -m app.manage migrate          # aplica migrações pendentes
+    python -m app.manage totals-check     # compara trip_totals com os itens
+    python -m app.manage totals-rebuild   # recalcula trip_totals (todas ou --trip-id)
+    python -m app.manage search-rebuild   # reindexa a busca dos itens (todas ou --trip-id)
+    python -m app.manage compile-templates  # pré-compila os templates (cache de bytecode)
+"""
+import argparse
+import json
+import sys
+
+from .db import engine
+from .migrations import run_migrations
+from .services import check_trip_totals, rebuild_trip_totals
+
+
+def cmd_migrate(args) -> int:
+    print(f"schema_version={run_migrations()}")
+    return 0
+
+
+def cmd_totals_check(args) -> int:
+    with engine.connect() as conn:
+        problems = check_trip_totals(conn)
+    for p in problems:
+        print(json.dumps(p, ensure_ascii=False))
+    print(f"{len(problems)} divergência(s)")
+    return 1 if problems else 0
+
+
+def cmd_totals_rebuild(args) -> int:
+    with engine.begin() as conn:
+        rebuild_trip_totals(conn, trip_id=args.trip_id)
+    print("trip_totals recalculado")
+    return 0
+
+
+def cmd_search_rebuild(args) -> int:
+    from .search import rebuild_search_index
+
+    with engine.begin() as conn:
+        count = rebuild_search_index(conn, trip_id=args.trip_id)
+    print(f"{count} item(ns) indexado(s)")
+    return 0
+
+
+def cmd_compile_templates(args) -> int:
+    from .templating import compile_templates, templates
+
+    count = compile_templates()
+    cache = templates.env.bytecode_cache
+    where = getattr(cache, "directory", None) if cache else "desligado"
+    print(f"{count} template(s) compilado(s); cache: {where}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("migrate").set_defaults(func=cmd_migrate)
+    sub.add_parser("totals-check").set_defaults(func=cmd_totals_check)
+    rebuild = sub.add_parser("totals-rebuild")
+    rebuild.add_argument("--trip-id", type=int, default=None)
+    rebuild.set_defaults(func=cmd_totals_rebuild)
+    search = sub.add_parser("search-rebuild")
+    search.add_argument("--trip-id", type=int, default=None)
+    search.set_defaults(func=cmd_search_rebuild)
+    sub.add_parser("compile-templates").set_defaults(func=cmd_compile_templates)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
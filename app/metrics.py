@@ -0,0 +1,261 @@
+"""
+Instrumentação por requisição.
+
+- MetricsMiddleware mede cada requisição (latência por rota, em histograma)
+  e devolve o header Server-Timing com as fases (db, render, ...).
+- SQL: eventos do SQLAlchemy no engine contam queries e tempo de banco da
+  requisição corrente (ContextVar; o threadpool do FastAPI copia o contexto,
+  então handlers sync também contam).
+- /metrics (main.py) expõe tudo no formato texto do Prometheus. Os números
+  são por processo: com vários workers, cada um tem os seus.
+- Profiler opcional por requisição: com PROFILE_TOKEN definido, mande o
+  header X-Profile: <token> (ou ?_profile=<token>) e a resposta vira o
+  relatório (pyinstrument, amostragem, se instalado; senão cProfile).
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_TOKEN = (os.getenv("PROFILE_TOKEN") or "").strip()
+
+
+# -------------------------
+# Fases da requisição corrente
+# -------------------------
+class RequestTimings:
+    def __init__(self):
+        self.phases: Dict[str, List[float]] = {}  # nome -> [vezes, segundos]
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.phases.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for name, (count, seconds) in self.phases.items():
+            desc = f';desc="{count} queries"' if name == "db" else ""
+            parts.append(f"{name};dur={seconds * 1000:.1f}{desc}")
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def phase(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - t0)
+
+
+def instrument_engine(engine) -> None:
+    """Conta queries/tempo de banco (engine sync ou o sync_engine do async)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if starts:
+            record_phase("db", time.perf_counter() - starts.pop())
+
+
+# -------------------------
+# Registro (por processo)
+# -------------------------
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.phase_seconds: Dict[Tuple[str, str, str], float] = {}
+        self.phase_count: Dict[Tuple[str, str, str], int] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, timings: RequestTimings) -> None:
+        with self._lock:
+            hist = self.latency.get((method, route))
+            if hist is None:
+                hist = self.latency[(method, route)] = Histogram()
+            hist.observe(seconds)
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for name, (count, secs) in timings.phases.items():
+                pkey = (method, route, name)
+                self.phase_seconds[pkey] = self.phase_seconds.get(pkey, 0.0) + secs
+                self.phase_count[pkey] = self.phase_count.get(pkey, 0) + count
+
+    def render(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        def labels(**kv):
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in kv.items()) + "}"
+
+        lines = [
+            "# HELP http_request_duration_seconds Latência das requisições por rota.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (method, route), hist in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets_of(hist), hist.counts):
+                    cumulative += count
+                    lines.append(
+                        f"http_request_duration_seconds_bucket{labels(method=method, route=route, le=bound)} {cumulative}"
+                    )
+                lines.append(f"http_request_duration_seconds_sum{labels(method=method, route=route)} {hist.sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{labels(method=method, route=route)} {hist.count}")
+
+            lines += ["# HELP http_requests_total Requisições por rota e status.", "# TYPE http_requests_total counter"]
+            for (method, route, status), n in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{labels(method=method, route=route, status=status)} {n}")
+
+            lines += [
+                "# HELP request_phase_seconds_total Tempo gasto por fase (db, render, ...) por rota.",
+                "# TYPE request_phase_seconds_total counter",
+            ]
+            for (method, route, name), secs in sorted(self.phase_seconds.items()):
+                lines.append(f"request_phase_seconds_total{labels(method=method, route=route, phase=name)} {secs:.6f}")
+            lines += [
+                "# HELP request_phase_calls_total Vezes que cada fase rodou (db = queries) por rota.",
+                "# TYPE request_phase_calls_total counter",
+            ]
+            for (method, route, name), n in sorted(self.phase_count.items()):
+                lines.append(f"request_phase_calls_total{labels(method=method, route=route, phase=name)} {n}")
+
+        for name, value in (extra_gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def buckets_of(hist: Histogram):
+        return [str(b) for b in hist.buckets] + ["+Inf"]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+# -------------------------
+# Middleware
+# -------------------------
+def _route_of(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    # não casou com nenhuma rota (404) ou é um mount (static)
+    return "/static" if scope.get("path", "").startswith("/static/") else "unmatched"
+
+
+def _profile_requested(scope) -> bool:
+    if not PROFILE_TOKEN:
+        return False
+    for name, value in scope["headers"]:
+        if name == b"x-profile" and value.decode("latin-1") == PROFILE_TOKEN:
+            return True
+    return f"_profile={PROFILE_TOKEN}".encode() in scope.get("query_string", b"")
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if _profile_requested(scope):
+            return await self._profiled(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(time.perf_counter() - t0).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _current.reset(token)
+            registry.observe(scope["method"], _route_of(scope), status, time.perf_counter() - t0, timings)
+
+    async def _profiled(self, scope, receive, send):
+        """Roda a requisição sob o profiler e devolve o relatório no lugar da resposta."""
+        async def discard(message):
+            pass
+
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.stop()
+            body, ctype = profiler.output_html().encode("utf-8"), b"text/html; charset=utf-8"
+        else:
+            # cProfile só vê a thread do event loop (handlers sync rodam no threadpool)
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            body, ctype = out.getvalue().encode("utf-8"), b"text/plain; charset=utf-8"
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", ctype), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,215 @@
+"""
+Migrações leves, sem Alembic.
+
+Cada migração é uma função (conn) -> None, numerada em ordem e idempotente
+(confere se a coluna/índice já existe antes de criar). A versão aplicada fica
+na tabela schema_version. Banco novo: create_all cria tudo e a versão vai
+direto para a última.
+
+Para mudar o schema: altere os models e acrescente uma migração no fim de
+MIGRATIONS (nunca reordene nem apague as antigas).
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from .db import Base, engine
+from . import models  # noqa: F401  (registra as tabelas no Base.metadata)
+
+log = logging.getLogger(__name__)
+
+
+# -------------------------
+# Helpers (usam as definições dos models)
+# -------------------------
+def _column_names(conn, table_name: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table_name)}
+
+
+def _index_names(conn, table_name: str) -> set:
+    # direto do catálogo: a reflexão do SQLAlchemy pula índices de expressão
+    if conn.dialect.name == "postgresql":
+        sql = "SELECT indexname FROM pg_indexes WHERE tablename = :t"
+    else:
+        sql = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"
+    return {row[0] for row in conn.execute(text(sql), {"t": table_name})}
+
+
+def add_column(conn, table_name: str, column_name: str):
+    if column_name in _column_names(conn, table_name):
+        return
+    col = Base.metadata.tables[table_name].c[column_name]
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {col.type.compile(dialect=conn.dialect)}"
+    if col.server_default is not None:
+        ddl += f" DEFAULT {col.server_default.arg}"
+        if not col.nullable:
+            ddl += " NOT NULL"
+    conn.execute(text(ddl))
+
+
+def create_index(conn, table_name: str, index_name: str):
+    if index_name in _index_names(conn, table_name):
+        return
+    table = Base.metadata.tables[table_name]
+    index = next(ix for ix in table.indexes if ix.name == index_name)
+    index.create(bind=conn)
+
+
+# -------------------------
+# Migrações
+# -------------------------
+def m001_base_tables(conn):
+    Base.metadata.create_all(bind=conn)
+
+
+def m002_trip_revision(conn):
+    add_column(conn, "trips", "revision")
+
+
+def m003_item_meta_json(conn):
+    add_column(conn, "trip_items", "meta")
+    # copia o meta_json (texto) das linhas antigas para a coluna JSON
+    if conn.dialect.name == "postgresql":
+        sql = "UPDATE trip_items SET meta = meta_json::jsonb WHERE meta IS NULL AND meta_json IS NOT NULL"
+    else:
+        sql = "UPDATE trip_items SET meta = json(meta_json) WHERE meta IS NULL AND meta_json IS NOT NULL"
+    conn.execute(text(sql))
+
+
+def m004_item_meta_time_index(conn):
+    # o índice (trip_id, meta->>'time') saiu dos models: nenhuma query o usava
+    # e ele custava em toda escrita. A m010 apaga onde ele chegou a ser criado.
+    pass
+
+
+def m005_item_listing_index(conn):
+    create_index(conn, "trip_items", "ix_trip_items_trip_cat_date_created")
+
+
+def m006_trip_totals(conn):
+    Base.metadata.tables["trip_totals"].create(bind=conn, checkfirst=True)
+    add_column(conn, "trips", "participant_count")
+    # o recálculo (rebuild_trip_totals) usa os models atuais, que já têm
+    # trip_items.currency: fica para a m008, que sempre roda depois desta
+
+
+def m007_item_payer_and_shares(conn):
+    add_column(conn, "trip_items", "paid_by_id")
+    Base.metadata.tables["trip_item_shares"].create(bind=conn, checkfirst=True)
+
+
+def m008_item_currency(conn):
+    from .services import rebuild_trip_totals
+
+    add_column(conn, "trip_items", "currency")
+    conn.execute(
+        text(
+            "UPDATE trip_items SET currency = (SELECT currency FROM trips WHERE trips.id = trip_items.trip_id) "
+            "WHERE currency IS NULL"
+        )
+    )
+    # a chave de trip_totals ganhou a moeda: é derivada, recria e recalcula
+    table = Base.metadata.tables["trip_totals"]
+    table.drop(bind=conn, checkfirst=True)
+    table.create(bind=conn)
+    rebuild_trip_totals(conn)
+
+
+def m009_item_search_index(conn):
+    from .search import create_search_index, rebuild_search_index
+
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+
+def m010_drop_item_meta_time_index(conn):
+    conn.execute(text("DROP INDEX IF EXISTS ix_trip_items_trip_id_meta_time"))
+
+
+def m011_fts_rowid_is_item_id(conn):
+    # FTS5 sem item_id UNINDEXED: o rowid passa a ser o id do item
+    if conn.dialect.name == "postgresql":
+        return
+    from .search import create_search_index, rebuild_search_index
+
+    conn.execute(text("DROP TABLE IF EXISTS trip_item_fts"))
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+
+MIGRATIONS = [
+    (1, m001_base_tables),
+    (2, m002_trip_revision),
+    (3, m003_item_meta_json),
+    (4, m004_item_meta_time_index),
+    (5, m005_item_listing_index),
+    (6, m006_trip_totals),
+    (7, m007_item_payer_and_shares),
+    (8, m008_item_currency),
+    (9, m009_item_search_index),
+    (10, m010_drop_item_meta_time_index),
+    (11, m011_fts_rowid_is_item_id),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+
+
+def get_schema_version(conn) -> int:
+    _ensure_version_table(conn)
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return int(version or 0)
+
+
+def _set_schema_version(conn, version: int):
+    conn.execute(text("DELETE FROM schema_version"))
+    conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+
+
+def stored_schema_version() -> int:
+    """Só leitura, sem lock: 0 se a tabela schema_version ainda não existe."""
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    except DBAPIError:
+        return 0
+    return int(version or 0)
+
+
+def run_migrations() -> int:
+    """
+    Aplica as migrações pendentes numa transação só (DDL é transacional no
+    Postgres e no SQLite): ou sobe tudo, ou nada. Retorna a versão final.
+    Se a versão gravada já é a última, sai com uma query só (boot comum).
+    """
+    current = stored_schema_version()
+    if current == LATEST_VERSION:
+        return current
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # vários workers subindo juntos: só um migra por vez
+            conn.execute(text("SELECT pg_advisory_xact_lock(724101)"))
+
+        fresh = not inspect(conn).has_table("trips")
+        current = get_schema_version(conn)
+
+        if fresh:
+            m001_base_tables(conn)
+            # índice de busca é DDL específico do banco (fora do Base.metadata)
+            m009_item_search_index(conn)
+            _set_schema_version(conn, LATEST_VERSION)
+            return LATEST_VERSION
+
+        for version, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            log.info("Aplicando migração %s (%s)", version, migrate.__name__)
+            migrate(conn)
+            _set_schema_version(conn, version)
+            current = version
+    return current
@@ -1,5 +1,6 @@
 from datetime import datetime, date
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Index
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -16,10 +17,33 @@ class Trip(Base):
     end_date = Column(Date, nullable=False)
     currency = Column(String(8), nullable=False, default="BRL")
 
+    # sobe a cada escrita na viagem (ETag / caches)
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # mantido pelas escritas em services (ver trip_totals)
+    participant_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
-    items = relationship("TripItem", back_populates="trip", cascade="all, delete-orphan")
-    participants = relationship("TripParticipant", back_populates="trip", cascade="all, delete-orphan")
+    # ordem feita no banco, casando com ix_trip_items_trip_cat_date_created
+    # (categoria, data com "sem data" por último, criação)
+    items = relationship(
+        "TripItem",
+        back_populates="trip",
+        cascade="all, delete-orphan",
+        order_by=lambda: (
+            TripItem.category,
+            TripItem.item_date.asc().nulls_last(),
+            TripItem.created_at,
+            TripItem.id,
+        ),
+    )
+    participants = relationship(
+        "TripParticipant",
+        back_populates="trip",
+        cascade="all, delete-orphan",
+        order_by=lambda: (TripParticipant.created_at, TripParticipant.id),
+    )
 
 
 class TripItem(Base):
@@ -35,10 +59,19 @@ class TripItem(Base):
     url = Column(Text, nullable=True)
     notes = Column(Text, nullable=True)
 
-    # custo em centavos
+    # custo em centavos, na moeda do item (gravada na criação; NULL = moeda da viagem)
     cost = Column(Integer, nullable=True)
+    currency = Column(String(3), nullable=True)
+    # quem pagou (acerto de contas); quem divide fica em trip_item_shares
+    paid_by_id = Column(Integer, ForeignKey("trip_participants.id", ondelete="SET NULL"), nullable=True)
 
-    # JSON como string (pra meta: endereço, hora, companhia, etc.)
+    # meta: endereço, hora, companhia, etc. JSONB no Postgres, JSON no SQLite.
+    meta = Column(
+        JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"),
+        nullable=True,
+    )
+
+    # legado: JSON como string. Só leitura (fallback) até o backfill copiar para `meta`.
     meta_json = Column(Text, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -60,4 +93,44 @@ class TripParticipant(Base):
     trip = relationship("Trip", back_populates="participants")
 
 
+class TripItemShare(Base):
+    """
+    Quem divide um item. Item sem linhas aqui é dividido entre todos os
+    participantes. trip_id repetido para carregar tudo da viagem num SELECT.
+    """
+
+    __tablename__ = "trip_item_shares"
+
+    item_id = Column(Integer, ForeignKey("trip_items.id", ondelete="CASCADE"), primary_key=True)
+    participant_id = Column(Integer, ForeignKey("trip_participants.id", ondelete="CASCADE"), primary_key=True)
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), index=True, nullable=False)
+
+
+class TripTotal(Base):
+    """
+    Totais materializados por (viagem, categoria, moeda), atualizados na mesma
+    transação de create_item/delete_item. Reconstruível a partir dos itens.
+    """
+
+    __tablename__ = "trip_totals"
+
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String(50), primary_key=True)
+    # moeda dos itens somados ("" = moeda da viagem); a conversão é na leitura
+    currency = Column(String(3), primary_key=True, default="", server_default="")
+
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # soma dos custos em centavos
+    cost_cents = Column(Integer, nullable=False, default=0, server_default="0")
+
+
 Index("ix_trip_participants_trip_id_email", TripParticipant.trip_id, TripParticipant.email)
+
+# listagem da página: WHERE trip_id = ? ORDER BY category, item_date, created_at
+Index(
+    "ix_trip_items_trip_cat_date_created",
+    TripItem.trip_id,
+    TripItem.category,
+    TripItem.item_date,
+    TripItem.created_at,
+)
@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Literal, Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 
 
@@ -9,6 +9,7 @@ Category = Literal[
     "restaurant",
     "hotel",
     "flight",
+    "transport",
     "ticket",
     "reference",
     "notes",
@@ -30,7 +31,10 @@ class ItemCreate(BaseModel):
     url: Optional[str] = None
     notes: Optional[str] = None
     cost: Optional[float] = None  # em reais, vamos converter pra centavos no service
+    currency: Optional[str] = Field(default=None, max_length=3)  # vazio = moeda da viagem
     meta: Optional[Dict[str, Any]] = None
+    paid_by: Optional[int] = None  # id do participante que pagou
+    shared_with: Optional[List[int]] = None  # quem divide (vazio = todos)
 
 
 class ParticipantCreate(BaseModel):
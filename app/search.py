@@ -0,0 +1,178 @@
+"""
+Busca textual nos itens de uma viagem (título, endereço, companhia, notas).
+
+O índice fica numa tabela à parte, mantida pelo create_item/delete_item
+(mesma transação):
+
+- Postgres: trip_item_search (item_id, trip_id, document tsvector) com
+  índice GIN; título pesa A, endereço/companhia B, notas C; ranking por
+  ts_rank_cd. SEARCH_TS_CONFIG escolhe o dicionário (padrão portuguese).
+- SQLite: tabela virtual FTS5 trip_item_fts (unicode61 sem acentos), ranking
+  por bm25 com os mesmos pesos. O rowid é o id do item: apagar um item é um
+  DELETE ... WHERE rowid (colunas UNINDEXED, como trip_id, varrem a tabela).
+
+Os termos digitados viram prefixos ligados por E ("hot rom" acha "Hotel
+Roma"); nada do texto do usuário entra cru na sintaxe de busca.
+"""
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import column, text
+
+SEARCH_TS_CONFIG = (os.getenv("SEARCH_TS_CONFIG") or "portuguese").strip()
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+MAX_QUERY_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect(conn) -> str:
+    bind = conn.bind if hasattr(conn, "bind") and conn.bind is not None else conn
+    return bind.dialect.name
+
+
+def query_terms(q: str) -> List[str]:
+    return [t.lower() for t in _TERM_RE.findall(q or "")][:MAX_QUERY_TERMS]
+
+
+def search_document(title: str, notes: Optional[str], meta: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    meta = meta or {}
+    return {
+        "title": title or "",
+        "place": " ".join(str(meta[k]) for k in ("address", "company") if meta.get(k)),
+        # o formulário grava as notas no meta; a coluna notes é da API
+        "notes": " ".join(str(n) for n in (notes, meta.get("notes")) if n),
+    }
+
+
+# -------------------------
+# DDL (migração 9 e banco novo)
+# -------------------------
+def create_search_index(conn) -> None:
+    if _dialect(conn) == "postgresql":
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS trip_item_search ("
+            " item_id INTEGER PRIMARY KEY REFERENCES trip_items(id) ON DELETE CASCADE,"
+            " trip_id INTEGER NOT NULL,"
+            " document tsvector NOT NULL)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_trip_item_search_document ON trip_item_search USING GIN (document)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_trip_item_search_trip_id ON trip_item_search (trip_id)"
+        ))
+    else:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS trip_item_fts USING fts5("
+            " title, place, notes, trip_id UNINDEXED,"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+
+
+def rebuild_search_index(conn, trip_id: Optional[int] = None) -> int:
+    """Reindexa os itens (todos ou de uma viagem). Quem chama faz o commit."""
+    where = "" if trip_id is None else " WHERE trip_id = :trip_id"
+    params = {} if trip_id is None else {"trip_id": trip_id}
+    table = "trip_item_search" if _dialect(conn) == "postgresql" else "trip_item_fts"
+    conn.execute(text(f"DELETE FROM {table}{where}"), params)
+
+    from .services import meta_from_json  # meta legado (texto) das linhas antigas
+
+    rows = conn.execute(
+        text(f"SELECT id, trip_id, title, notes, meta, meta_json FROM trip_items{where}"), params
+    ).all()
+    docs = []
+    for item_id, tid, title, notes, meta, meta_json in rows:
+        if isinstance(meta, str):
+            meta = meta_from_json(meta)
+        docs.append((item_id, tid, search_document(title, notes, meta or meta_from_json(meta_json))))
+    _insert_documents(conn, docs)
+    return len(docs)
+
+
+# -------------------------
+# Manutenção (create_item / delete_item)
+# -------------------------
+def _insert_documents(conn, docs: Iterable[Tuple[int, int, Dict[str, str]]]) -> None:
+    params = [{"item_id": item_id, "trip_id": trip_id, **doc} for item_id, trip_id, doc in docs]
+    if not params:
+        return
+    if _dialect(conn) == "postgresql":
+        cfg = "CAST(:cfg AS regconfig)"
+        conn.execute(
+            text(
+                "INSERT INTO trip_item_search (item_id, trip_id, document) VALUES (:item_id, :trip_id,"
+                f" setweight(to_tsvector({cfg}, :title), 'A')"
+                f" || setweight(to_tsvector({cfg}, :place), 'B')"
+                f" || setweight(to_tsvector({cfg}, :notes), 'C'))"
+            ),
+            [{**p, "cfg": SEARCH_TS_CONFIG} for p in params],
+        )
+    else:
+        conn.execute(
+            text(
+                "INSERT INTO trip_item_fts (rowid, title, place, notes, trip_id)"
+                " VALUES (:item_id, :title, :place, :notes, :trip_id)"
+            ),
+            params,
+        )
+
+
+def index_items(db, trip_id: int, items: Iterable[Tuple[int, Dict[str, Any]]]) -> None:
+    """items: (id, linha como em services._item_row)."""
+    _insert_documents(
+        db,
+        [
+            (item_id, trip_id, search_document(row["title"], row.get("notes"), row.get("meta")))
+            for item_id, row in items
+        ],
+    )
+
+
+def unindex_item(db, trip_id: int, item_id: int) -> None:
+    # pela chave: item_id (PK) no Postgres, rowid no FTS5
+    if _dialect(db) == "postgresql":
+        sql = "DELETE FROM trip_item_search WHERE item_id = :item_id AND trip_id = :trip_id"
+    else:
+        sql = "DELETE FROM trip_item_fts WHERE rowid = :item_id"
+    db.execute(text(sql), {"item_id": item_id, "trip_id": trip_id})
+
+
+# -------------------------
+# Consulta
+# -------------------------
+def search_query(dialect: str, trip_id: int, q: str, page: int = 1, page_size: int = SEARCH_PAGE_SIZE):
+    """
+    (statement, params) que devolve (item_id, rank) da página pedida (1 =
+    primeira), melhores primeiro, com uma linha a mais para saber se há
+    próxima página. None se a busca não tem termos válidos. Mesma query para
+    Session e AsyncSession (só muda o execute).
+    """
+    terms = query_terms(q)
+    if not terms:
+        return None
+    params = {"trip_id": trip_id, "limit": page_size + 1, "offset": (max(page, 1) - 1) * page_size}
+
+    if dialect == "postgresql":
+        params["cfg"] = SEARCH_TS_CONFIG
+        params["query"] = " & ".join(f"{t}:*" for t in terms)
+        sql = (
+            "SELECT s.item_id, ts_rank_cd(s.document, q) AS rank"
+            " FROM trip_item_search s, to_tsquery(CAST(:cfg AS regconfig), :query) q"
+            " WHERE s.trip_id = :trip_id AND s.document @@ q"
+            " ORDER BY rank DESC, s.item_id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["query"] = " ".join(f'"{t}"*' for t in terms)
+        # bm25 é "menor é melhor"; invertido para o mesmo sentido do Postgres
+        sql = (
+            "SELECT rowid AS item_id, -bm25(trip_item_fts, 10.0, 4.0, 1.0) AS rank"
+            " FROM trip_item_fts"
+            " WHERE trip_item_fts MATCH :query AND trip_id = :trip_id"
+            " ORDER BY rank DESC, item_id LIMIT :limit OFFSET :offset"
+        )
+    # TextualSelect (não um text() solto): a sessão trata como leitura e o
+    # get_db não manda COMMIT
+    return text(sql).columns(column("item_id"), column("rank")), params
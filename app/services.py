@@ -1,11 +1,24 @@
 import json
+import os
 import secrets
-from typing import Optional, Dict, Any, Union
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Optional, Dict, Any, Iterable, List, Tuple, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from .models import Trip, TripItem, TripParticipant
+from .cache import LRUCache
+from .db import has_pending_writes, on_commit
+from .events import publish_event
+from .fx import convert_grouped, normalize_currency, rate_table
+from .models import Trip, TripItem, TripItemShare, TripParticipant, TripTotal
 from .schemas import TripCreate, ItemCreate, ParticipantCreate
+from .search import SEARCH_PAGE_SIZE, index_items, search_query, unindex_item
+from .settlement import settle_expenses
 
 
 def cents_to_money(cents: int) -> str:
@@ -22,7 +35,49 @@ def meta_from_json(meta_json: Optional[str]) -> Dict[str, Any]:
         return {}
 
 
+def item_meta(item: TripItem) -> Dict[str, Any]:
+    """
+    Meta já como dict (coluna JSON). Linhas antigas ainda não migradas caem
+    no meta_json em texto.
+    """
+    if item.meta is not None:
+        return item.meta
+    return meta_from_json(item.meta_json)
+
+
+def group_items_by_day(items: Iterable[Any]) -> List[Tuple[str, List[Any]]]:
+    """
+    Agrupa itens por data (string YYYY-MM-DD), datas em ordem e sem data por
+    último ("None"). Mantém a ordem dos itens dentro de cada dia.
+    """
+    by_date: Dict[Optional[date], List[Any]] = {}
+    for it in items:
+        by_date.setdefault(it.item_date, []).append(it)
+    days = sorted(by_date.keys(), key=lambda d: (d is None, d or date.min))
+    return [(str(d), by_date[d]) for d in days]
+
+
+def trip_currency(code: Optional[str], current: Optional[str] = None) -> str:
+    """
+    Moeda da viagem normalizada (vazio = BRL). ValueError se não for um código
+    de 3 letras com taxa na tabela de câmbio: os itens herdam essa moeda e
+    trip_items.currency/trip_totals.currency são String(3). `current` (a moeda
+    que a viagem já tem) passa sempre, para editar viagens antigas.
+    """
+    code = normalize_currency(code) or "BRL"
+    if code == current:
+        return code
+    if len(code) != 3 or not code.isalpha():
+        raise ValueError(f"Moeda inválida: {code}. Use o código de 3 letras (ex: EUR).")
+    rates = rate_table().rates
+    if rates and code not in rates:
+        raise ValueError(f"Moeda sem taxa de câmbio: {code}.")
+    return code
+
+
 def create_trip(db: Session, payload: TripCreate) -> Trip:
+    """Levanta ValueError se a moeda não for válida (ver trip_currency)."""
+    currency = trip_currency(payload.currency)
     token = secrets.token_hex(16)
     trip = Trip(
         token=token,
@@ -30,11 +85,33 @@ def create_trip(db: Session, payload: TripCreate) -> Trip:
         destination=payload.destination.strip(),
         start_date=payload.start_date,
         end_date=payload.end_date,
-        currency=(payload.currency or "BRL").strip().upper(),
+        currency=currency,
     )
     db.add(trip)
-    db.commit()
-    db.refresh(trip)
+    db.flush()  # id e defaults (revision, created_at) já ficam no objeto
+    return trip
+
+
+def update_trip(
+    db: Session,
+    trip: Trip,
+    title: str,
+    destination: str,
+    start_date: date,
+    end_date: date,
+    currency: Optional[str],
+) -> Trip:
+    """Levanta ValueError se a moeda não for válida (ver trip_currency)."""
+    currency = trip_currency(currency, current=trip.currency)
+    trip.title = title.strip()
+    trip.destination = destination.strip()
+    trip.start_date = start_date
+    trip.end_date = end_date
+    trip.currency = currency
+    touch_trip(db, trip)
+    publish_event(db, trip.token, "trip_updated")
+    token = trip.token
+    on_commit(db, lambda: forget_trip_ref(token))
     return trip
 
 
@@ -42,6 +119,110 @@ def get_trip_by_token(db: Session, token: str) -> Optional[Trip]:
     return db.query(Trip).filter(Trip.token == token).first()
 
 
+# --------------------------------------------
+# token -> dados mínimos da viagem (cache com TTL)
+# --------------------------------------------
+@dataclass(frozen=True)
+class TripRef:
+    """
+    O que as rotas de escrita precisam da viagem: id para as FKs, datas para
+    enforce_date_in_trip e moeda para os totais. Serve no lugar do Trip ORM
+    nas funções de escrita (elas só usam trip.id).
+    `revision` é a do momento em que entrou no cache: não use para ETag.
+    """
+
+    id: int
+    token: str
+    start_date: date
+    end_date: date
+    currency: str
+    revision: int
+
+
+# Por processo. Edição da viagem invalida a entrada local; outros workers
+# enxergam datas/moeda novas em até TRIP_REF_CACHE_TTL segundos.
+TRIP_REF_CACHE_SIZE = int(os.getenv("TRIP_REF_CACHE_SIZE", "1024"))
+TRIP_REF_CACHE_TTL = float(os.getenv("TRIP_REF_CACHE_TTL", "60"))
+
+_trip_ref_cache = LRUCache(max_entries=TRIP_REF_CACHE_SIZE, ttl_seconds=TRIP_REF_CACHE_TTL)
+
+
+def get_trip_ref(db: Session, token: str) -> Optional[TripRef]:
+    ref = _trip_ref_cache.get(token)
+    if ref is not None:
+        return ref
+    row = db.execute(
+        select(Trip.id, Trip.token, Trip.start_date, Trip.end_date, Trip.currency, Trip.revision)
+        .where(Trip.token == token)
+    ).first()
+    if row is None:
+        return None
+    ref = TripRef(*row)
+    # lido no meio de uma escrita (ex.: depois de update_trip) pode não ser
+    # commitado: só entra no cache o que outras transações também enxergam
+    if not has_pending_writes(db):
+        _trip_ref_cache.set(token, ref)
+    return ref
+
+
+def forget_trip_ref(token: str) -> None:
+    _trip_ref_cache.delete(token)
+
+
+def get_trip_revision(db: Session, token: str) -> Optional[int]:
+    """
+    Só a revisão da viagem (sem itens/participantes). None se não existir.
+    """
+    return db.query(Trip.revision).filter(Trip.token == token).scalar()
+
+
+def touch_trip(db: Session, trip: Union[Trip, "TripRef"], participants_delta: int = 0) -> None:
+    """
+    Sobe a revisão da viagem na mesma transação da escrita.
+    Toda escrita em itens/participantes/viagem passa por aqui (ETag + caches).
+    """
+    values = {Trip.revision: Trip.revision + 1}
+    if participants_delta:
+        values[Trip.participant_count] = Trip.participant_count + participants_delta
+    db.query(Trip).filter(Trip.id == trip.id).update(values, synchronize_session=False)
+
+
+def _bump_item_totals(
+    db: Session, trip_id: int, category: str, currency: Optional[str], count: int, cost_cents: int
+) -> None:
+    """
+    trip_totals += (count, cost) num upsert atômico (ON CONFLICT DO UPDATE),
+    sem ler antes: duas escritas simultâneas não se perdem.
+    """
+    dialect_insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(TripTotal).values(
+        trip_id=trip_id, category=category, currency=currency or "", item_count=count, cost_cents=cost_cents
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TripTotal.trip_id, TripTotal.category, TripTotal.currency],
+        set_={
+            "item_count": TripTotal.item_count + stmt.excluded.item_count,
+            "cost_cents": TripTotal.cost_cents + stmt.excluded.cost_cents,
+        },
+    )
+    db.execute(stmt)
+
+
+def get_trip_aggregate(db: Session, token: str) -> Optional[Trip]:
+    """
+    Carrega viagem + participantes + itens de uma vez (sem lazy load no template).
+    Participantes vêm no mesmo SELECT (joined, são poucos); itens num único
+    SELECT ... IN (selectin) para não multiplicar linhas itens x participantes.
+    A ordem vem das relationships em models.py.
+    """
+    return (
+        db.query(Trip)
+        .options(joinedload(Trip.participants), selectinload(Trip.items))
+        .filter(Trip.token == token)
+        .first()
+    )
+
+
 def _normalize_cost_to_cents(cost: Union[int, float, str, None]) -> Optional[int]:
     """
     Aceita:
@@ -63,39 +244,131 @@ def _normalize_cost_to_cents(cost: Union[int, float, str, None]) -> Optional[int
         return None
 
 
-def create_item(db: Session, trip: Trip, payload: ItemCreate) -> TripItem:
-    cost_cents = _normalize_cost_to_cents(payload.cost)
-
-    meta_json = None
-    if payload.meta:
-        meta_json = json.dumps(payload.meta, ensure_ascii=False)
-
-    item = TripItem(
+def _item_row(trip: Union[Trip, "TripRef"], payload: ItemCreate) -> Dict[str, Any]:
+    return dict(
         trip_id=trip.id,
         category=payload.category,
         title=payload.title.strip(),
         item_date=payload.item_date,
         url=payload.url.strip() if payload.url else None,
         notes=payload.notes if payload.notes else None,
-        cost=cost_cents,
-        meta_json=meta_json,
+        cost=_normalize_cost_to_cents(payload.cost),
+        currency=normalize_currency(payload.currency) or trip.currency,
+        meta=payload.meta or None,
+        paid_by_id=payload.paid_by,
     )
+
+
+def _check_currencies(trip: Union[Trip, "TripRef"], payloads: Iterable[ItemCreate]) -> None:
+    """ValueError se a moeda de algum item não tiver taxa (e não for a da viagem)."""
+    rates = rate_table().rates
+    for p in payloads:
+        code = normalize_currency(p.currency)
+        if code and code != trip.currency and code not in rates:
+            raise ValueError(f"Moeda sem taxa de câmbio: {code}.")
+
+
+def _check_participants(db: Session, trip: Union[Trip, "TripRef"], ids: Iterable[Optional[int]]) -> None:
+    """ValueError se algum id (pagador/quem divide) não for participante da viagem."""
+    wanted = {pid for pid in ids if pid is not None}
+    if not wanted:
+        return
+    found = set(
+        db.execute(
+            select(TripParticipant.id).where(TripParticipant.trip_id == trip.id, TripParticipant.id.in_(wanted))
+        ).scalars()
+    )
+    if wanted - found:
+        raise ValueError("Participante não encontrado nesta viagem.")
+
+
+def create_item(db: Session, trip: Union[Trip, "TripRef"], payload: ItemCreate) -> TripItem:
+    """Levanta ValueError se pagador/quem divide não forem da viagem."""
+    shared_with = sorted(set(payload.shared_with or ()))
+    _check_currencies(trip, [payload])
+    _check_participants(db, trip, [payload.paid_by, *shared_with])
+    row = _item_row(trip, payload)
+    item = TripItem(**row)
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    _bump_item_totals(db, trip.id, row["category"], row["currency"], 1, row["cost"] or 0)
+    touch_trip(db, trip)
+    db.flush()
+    if shared_with:
+        db.execute(
+            insert(TripItemShare),
+            [{"item_id": item.id, "participant_id": pid, "trip_id": trip.id} for pid in shared_with],
+        )
+    index_items(db, trip.id, [(item.id, row)])
+    publish_event(db, trip.token, "item_created", item=asdict(item_view(item)))
     return item
 
 
-def delete_item(db: Session, trip: Trip, item_id: int) -> bool:
-    item = db.query(TripItem).filter(TripItem.trip_id == trip.id, TripItem.id == item_id).first()
-    if not item:
+def create_items_bulk(db: Session, trip: Union[Trip, "TripRef"], payloads: List[ItemCreate]) -> int:
+    """
+    Insere vários itens numa transação só (INSERT multi-linha via executemany).
+    Validação é responsabilidade de quem chama: aqui tudo entra ou nada entra.
+    """
+    if not payloads:
+        return 0
+    _check_currencies(trip, payloads)
+    _check_participants(db, trip, [pid for p in payloads for pid in (p.paid_by, *(p.shared_with or ()))])
+    rows = [_item_row(trip, p) for p in payloads]
+    # ids na ordem das linhas: índice de busca e quem divide, sem reler os itens
+    if db.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+        ids = db.execute(insert(TripItem).returning(TripItem.id, sort_by_parameter_order=True), rows).scalars().all()
+    else:
+        ids = [db.execute(insert(TripItem).values(**row)).inserted_primary_key[0] for row in rows]
+    index_items(db, trip.id, zip(ids, rows))
+    shares = [
+        {"item_id": item_id, "participant_id": pid, "trip_id": trip.id}
+        for item_id, p in zip(ids, payloads)
+        for pid in sorted(set(p.shared_with or ()))
+    ]
+    if shares:
+        db.execute(insert(TripItemShare), shares)
+
+    per_cat: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+    for row in rows:
+        key = (row["category"], row["currency"])
+        per_cat[key][0] += 1
+        per_cat[key][1] += row["cost"] or 0
+    for (cat, currency), (count, cost_cents) in per_cat.items():
+        _bump_item_totals(db, trip.id, cat, currency, count, cost_cents)
+
+    touch_trip(db, trip)
+    publish_event(db, trip.token, "items_imported", count=len(rows))
+    return len(payloads)
+
+
+def delete_item(db: Session, trip: Union[Trip, "TripRef"], item_id: int) -> bool:
+    """
+    Um DELETE ... WHERE trip_id AND id só (sem carregar o item antes).
+    category/cost/currency para os totais vêm do RETURNING (Postgres, SQLite >= 3.35).
+    """
+    where = (TripItem.trip_id == trip.id, TripItem.id == item_id)
+    # o SQLite não aplica ON DELETE CASCADE sem PRAGMA foreign_keys
+    db.execute(
+        delete(TripItemShare).where(TripItemShare.trip_id == trip.id, TripItemShare.item_id == item_id),
+        execution_options={"synchronize_session": False},
+    )
+    if db.bind.dialect.delete_returning:
+        stmt = delete(TripItem).where(*where).returning(TripItem.category, TripItem.cost, TripItem.currency)
+        row = db.execute(stmt, execution_options={"synchronize_session": False}).first()
+    else:
+        row = db.execute(select(TripItem.category, TripItem.cost, TripItem.currency).where(*where)).first()
+        if row is not None:
+            db.execute(delete(TripItem).where(*where), execution_options={"synchronize_session": False})
+    if row is None:
         return False
-    db.delete(item)
-    db.commit()
+    category, cost, currency = row
+    unindex_item(db, trip.id, item_id)
+    _bump_item_totals(db, trip.id, category, currency, -1, -(cost or 0))
+    touch_trip(db, trip)
+    publish_event(db, trip.token, "item_deleted", id=item_id, category=category)
     return True
 
 
-def add_participant(db: Session, trip: Trip, payload: ParticipantCreate) -> TripParticipant:
+def add_participant(db: Session, trip: Union[Trip, "TripRef"], payload: ParticipantCreate) -> TripParticipant:
     name = payload.name.strip()
     email = payload.email.strip().lower() if payload.email else None
 
@@ -108,25 +381,631 @@ def add_participant(db: Session, trip: Trip, payload: ParticipantCreate) -> Trip
         if existing:
             if existing.name != name:
                 existing.name = name
-                db.commit()
-                db.refresh(existing)
+                touch_trip(db, trip)
+                publish_event(db, trip.token, "participant_updated", participant=asdict(participant_view(existing)))
             return existing
 
     p = TripParticipant(trip_id=trip.id, name=name, email=email)
     db.add(p)
-    db.commit()
-    db.refresh(p)
+    touch_trip(db, trip, participants_delta=1)
+    db.flush()
+    publish_event(db, trip.token, "participant_added", participant=asdict(participant_view(p)))
     return p
 
 
-def remove_participant(db: Session, trip: Trip, participant_id: int) -> bool:
-    p = (
-        db.query(TripParticipant)
-        .filter(TripParticipant.trip_id == trip.id, TripParticipant.id == participant_id)
-        .first()
+def remove_participant(db: Session, trip: Union[Trip, "TripRef"], participant_id: int) -> bool:
+    stmt = delete(TripParticipant).where(
+        TripParticipant.trip_id == trip.id, TripParticipant.id == participant_id
     )
-    if not p:
+    if db.execute(stmt, execution_options={"synchronize_session": False}).rowcount == 0:
         return False
-    db.delete(p)
-    db.commit()
+    # despesas dele ficam sem pagador; as divisões deixam de contar com ele
+    db.execute(
+        update(TripItem)
+        .where(TripItem.trip_id == trip.id, TripItem.paid_by_id == participant_id)
+        .values(paid_by_id=None),
+        execution_options={"synchronize_session": False},
+    )
+    db.execute(
+        delete(TripItemShare).where(
+            TripItemShare.trip_id == trip.id, TripItemShare.participant_id == participant_id
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    touch_trip(db, trip, participants_delta=-1)
+    publish_event(db, trip.token, "participant_removed", id=participant_id)
     return True
+
+
+# --------------------------------------------
+# View model da página da viagem (cacheado)
+# --------------------------------------------
+@dataclass(frozen=True)
+class TripSnapshot:
+    id: int
+    token: str
+    title: str
+    destination: str
+    start_date: date
+    end_date: date
+    currency: str
+    revision: int
+    created_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class ItemView:
+    id: int
+    category: str
+    title: str
+    item_date: Optional[date]
+    url: Optional[str]
+    notes: Optional[str]
+    cost: Optional[int]
+    created_at: datetime
+    meta: Dict[str, Any] = field(default_factory=dict)
+    paid_by: Optional[int] = None
+    currency: Optional[str] = None  # None = moeda da viagem
+
+
+@dataclass(frozen=True)
+class ParticipantView:
+    id: int
+    name: str
+    email: Optional[str]
+
+
+@dataclass(frozen=True)
+class TripView:
+    trip: TripSnapshot
+    groups: Dict[str, List[ItemView]]
+    participants: List[ParticipantView]
+    total_by_cat: Dict[str, int]
+    total_all: int
+    per_person: int
+    by_currency: Dict[str, int] = field(default_factory=dict)  # centavos na moeda original
+    unconverted: Dict[str, int] = field(default_factory=dict)  # moedas sem taxa (fora do total)
+
+
+TRIP_VIEW_CACHE_SIZE = int(os.getenv("TRIP_VIEW_CACHE_SIZE", "256"))
+
+_trip_view_cache = LRUCache(max_entries=TRIP_VIEW_CACHE_SIZE)
+
+
+def item_view(item: TripItem) -> ItemView:
+    return ItemView(
+        id=item.id,
+        category=item.category,
+        title=item.title,
+        item_date=item.item_date,
+        url=item.url,
+        notes=item.notes,
+        cost=item.cost,
+        created_at=item.created_at,
+        meta=item_meta(item),
+        paid_by=item.paid_by_id,
+        currency=item.currency,
+    )
+
+
+def participant_view(p: TripParticipant) -> ParticipantView:
+    return ParticipantView(id=p.id, name=p.name, email=p.email)
+
+
+def trip_snapshot(trip: Trip) -> TripSnapshot:
+    return TripSnapshot(
+        id=trip.id,
+        token=trip.token,
+        title=trip.title,
+        destination=trip.destination,
+        start_date=trip.start_date,
+        end_date=trip.end_date,
+        currency=trip.currency,
+        revision=trip.revision,
+        created_at=trip.created_at,
+    )
+
+
+def _sum_by_currency(cost_by_cat: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    out: Dict[str, int] = defaultdict(int)
+    for per_currency in cost_by_cat.values():
+        for cur, cents in per_currency.items():
+            out[cur] += cents
+    return {cur: cents for cur, cents in sorted(out.items()) if cents}
+
+
+def split_per_person(total_all: int, participants_count: int) -> int:
+    people = max(1, participants_count)
+    return int(round(total_all / people)) if total_all else 0
+
+
+def build_trip_view(trip: Trip) -> TripView:
+    groups = defaultdict(list)
+    cost_by_cat = defaultdict(lambda: defaultdict(int))  # categoria -> moeda -> centavos
+
+    for item in trip.items:
+        it = item_view(item)
+        groups[it.category].append(it)
+
+        if it.cost is not None:
+            cost_by_cat[it.category][it.currency or trip.currency] += it.cost
+
+    # uma conversão por (categoria, moeda), não por item
+    total_by_cat, unconverted = convert_grouped(cost_by_cat, trip.currency)
+    total_all = sum(total_by_cat.values())
+
+    # trip.items já vem ordenado pelo banco (ver Trip.items em models.py)
+    participants = [participant_view(p) for p in trip.participants]
+    per_person = split_per_person(total_all, len(participants))
+
+    return TripView(
+        trip=trip_snapshot(trip),
+        groups=dict(groups),
+        participants=participants,
+        total_by_cat=total_by_cat,
+        total_all=total_all,
+        per_person=per_person,
+        by_currency=_sum_by_currency(cost_by_cat),
+        unconverted=unconverted,
+    )
+
+
+def cached_trip_view(token: str, revision: int) -> Optional[TripView]:
+    return _trip_view_cache.get((token, revision))
+
+
+def store_trip_view(view: TripView) -> None:
+    # guarda pela revisão realmente carregada (pode ter mudado no meio)
+    _trip_view_cache.set((view.trip.token, view.trip.revision), view)
+
+
+def get_trip_view(db: Session, token: str, revision: int) -> Optional[TripView]:
+    """
+    View model pronto para o template, em cache por (token, revisão).
+    A revisão vem de get_trip_revision(); em cache hit não carrega itens.
+    """
+    view = cached_trip_view(token, revision)
+    if view is not None:
+        return view
+
+    trip = get_trip_aggregate(db, token)
+    if not trip:
+        return None
+    view = build_trip_view(trip)
+    store_trip_view(view)
+    return view
+
+
+# --------------------------------------------
+# Página paginada: resumo + primeiros itens de cada seção
+# --------------------------------------------
+# A página inicial traz só os PAGE_ITEMS primeiros itens de cada categoria;
+# o resto vem por /t/{token}/sections/{categoria}?cursor=... (keyset em
+# (item_date, created_at, id), mesma ordem de Trip.items e do índice
+# ix_trip_items_trip_cat_date_created). Totais e contagens vêm de trip_totals.
+SECTION_CATEGORIES = ("activity", "flight", "hotel", "restaurant", "transport")
+PAGE_ITEMS = int(os.getenv("TRIP_PAGE_ITEMS", "40"))
+
+
+@dataclass(frozen=True)
+class TripPageView:
+    trip: TripSnapshot
+    participants: List[ParticipantView]
+    total_by_cat: Dict[str, int]
+    count_by_cat: Dict[str, int]
+    total_all: int
+    per_person: int
+    days_by_cat: Dict[str, List[Tuple[str, List[ItemView]]]]
+    next_cursor_by_cat: Dict[str, str]
+    by_currency: Dict[str, int] = field(default_factory=dict)
+    unconverted: Dict[str, int] = field(default_factory=dict)
+
+
+def _item_sort_key():
+    return (TripItem.item_date.asc().nulls_last(), TripItem.created_at, TripItem.id)
+
+
+def encode_item_cursor(item: ItemView) -> str:
+    day = item.item_date.isoformat() if item.item_date else "-"
+    return f"{day}_{item.created_at.isoformat()}_{item.id}"
+
+
+def decode_item_cursor(cursor: str) -> Tuple[Optional[date], datetime, int]:
+    """Levanta ValueError se o cursor não for válido."""
+    day, created, item_id = cursor.split("_")
+    return (
+        None if day == "-" else date.fromisoformat(day),
+        datetime.fromisoformat(created),
+        int(item_id),
+    )
+
+
+def _after_cursor(cursor: str):
+    """WHERE (item_date, created_at, id) > cursor, com datas nulas por último."""
+    day, created, item_id = decode_item_cursor(cursor)
+    same_day_after = or_(
+        TripItem.created_at > created,
+        and_(TripItem.created_at == created, TripItem.id > item_id),
+    )
+    if day is None:
+        return and_(TripItem.item_date.is_(None), same_day_after)
+    return or_(
+        TripItem.item_date > day,
+        and_(TripItem.item_date == day, same_day_after),
+        TripItem.item_date.is_(None),
+    )
+
+
+def first_pages_query(trip_id: int, limit: int = PAGE_ITEMS):
+    """
+    Os limit+1 primeiros itens de cada categoria numa query só
+    (ROW_NUMBER por categoria). O +1 diz se há próxima página.
+    """
+    rn = func.row_number().over(partition_by=TripItem.category, order_by=_item_sort_key()).label("rn")
+    ranked = (
+        select(TripItem.id, rn)
+        .where(TripItem.trip_id == trip_id, TripItem.category.in_(SECTION_CATEGORIES))
+        .subquery()
+    )
+    return (
+        select(TripItem)
+        .join(ranked, ranked.c.id == TripItem.id)
+        .where(ranked.c.rn <= limit + 1)
+        .order_by(TripItem.category, *_item_sort_key())
+    )
+
+
+def section_page_query(trip_id: int, category: str, cursor: Optional[str], limit: int = PAGE_ITEMS):
+    q = select(TripItem).where(TripItem.trip_id == trip_id, TripItem.category == category)
+    if cursor:
+        q = q.where(_after_cursor(cursor))
+    return q.order_by(*_item_sort_key()).limit(limit + 1)
+
+
+def paginate_items(items: Iterable[TripItem], limit: int = PAGE_ITEMS):
+    """
+    (dias, próximo cursor) a partir de até limit+1 itens já ordenados.
+    Um dia pode ficar dividido entre páginas; o front junta as linhas.
+    """
+    views = [item_view(it) for it in items]
+    next_cursor = encode_item_cursor(views[limit - 1]) if len(views) > limit else None
+    return group_items_by_day(views[:limit]), next_cursor
+
+
+def build_trip_page_view(trip: Trip, total_rows, items: Iterable[TripItem]) -> TripPageView:
+    by_cat: Dict[str, List[TripItem]] = defaultdict(list)
+    for it in items:
+        by_cat[it.category].append(it)
+
+    days_by_cat, next_cursor_by_cat = {}, {}
+    for cat, cat_items in by_cat.items():
+        days_by_cat[cat], cursor = paginate_items(cat_items)
+        if cursor:
+            next_cursor_by_cat[cat] = cursor
+
+    participants = [participant_view(p) for p in trip.participants]
+    totals = trip_totals_from_rows(total_rows, len(participants), trip.currency)
+    return TripPageView(
+        trip=trip_snapshot(trip),
+        participants=participants,
+        total_by_cat=totals["total_by_cat"],
+        count_by_cat=totals["count_by_cat"],
+        total_all=totals["total_all"],
+        per_person=totals["per_person"],
+        days_by_cat=days_by_cat,
+        next_cursor_by_cat=next_cursor_by_cat,
+        by_currency=totals["by_currency"],
+        unconverted=totals["unconverted"],
+    )
+
+
+def cached_trip_page_view(token: str, revision: int) -> Optional[TripPageView]:
+    return _trip_view_cache.get(("page", token, revision))
+
+
+def store_trip_page_view(view: TripPageView) -> None:
+    _trip_view_cache.set(("page", view.trip.token, view.trip.revision), view)
+
+
+def get_trip_page_view(db: Session, token: str, revision: int) -> Optional[TripPageView]:
+    """
+    Três queries, independentes do tamanho da viagem: viagem + participantes,
+    trip_totals e a primeira página de cada seção.
+    """
+    view = cached_trip_page_view(token, revision)
+    if view is not None:
+        return view
+
+    trip = db.query(Trip).options(joinedload(Trip.participants)).filter(Trip.token == token).first()
+    if not trip:
+        return None
+    total_rows = db.query(TripTotal).filter(TripTotal.trip_id == trip.id).all()
+    items = db.execute(first_pages_query(trip.id)).scalars().all()
+    view = build_trip_page_view(trip, total_rows, items)
+    store_trip_page_view(view)
+    return view
+
+
+def get_section_page(db: Session, trip_id: int, category: str, cursor: Optional[str]):
+    items = db.execute(section_page_query(trip_id, category, cursor)).scalars().all()
+    return paginate_items(items)
+
+
+def totals_summary(
+    total_by_cat: Dict[str, int],
+    count_by_cat: Dict[str, int],
+    participants_count: int,
+    by_currency: Optional[Dict[str, int]] = None,
+    unconverted: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """total_by_cat já convertido para a moeda da viagem."""
+    total_all = sum(total_by_cat.values())
+    return {
+        "total_by_cat": total_by_cat,
+        "count_by_cat": count_by_cat,
+        "total_all": total_all,
+        "item_count": sum(count_by_cat.values()),
+        "participants_count": participants_count,
+        "per_person": split_per_person(total_all, participants_count),
+        "by_currency": by_currency or {},
+        "unconverted": unconverted or {},
+    }
+
+
+def trip_totals_from_rows(rows, participants_count: int, currency: str) -> Dict[str, Any]:
+    """
+    Linhas de trip_totals (uma por categoria e moeda) -> totais na moeda da
+    viagem: cada subtotal por moeda é convertido uma vez.
+    """
+    cost_by_cat: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    count_by_cat: Dict[str, int] = defaultdict(int)
+    for r in rows:
+        if not r.item_count:
+            continue
+        count_by_cat[r.category] += r.item_count
+        cost_by_cat[r.category][r.currency or currency] += r.cost_cents
+    total_by_cat, unconverted = convert_grouped(cost_by_cat, currency)
+    return totals_summary(
+        total_by_cat, dict(count_by_cat), participants_count, _sum_by_currency(cost_by_cat), unconverted
+    )
+
+
+def get_trip_totals(db: Session, trip: Trip) -> Dict[str, Any]:
+    """
+    Totais lidos de trip_totals + trips.participant_count: O(categorias),
+    sem tocar em trip_items.
+    """
+    rows = db.query(TripTotal).filter(TripTotal.trip_id == trip.id).all()
+    participants_count = db.query(Trip.participant_count).filter(Trip.id == trip.id).scalar() or 0
+    return trip_totals_from_rows(rows, participants_count, trip.currency)
+
+
+# --------------------------------------------
+# Acerto de contas (quem pagou x quem divide), em cache por revisão
+# --------------------------------------------
+@dataclass(frozen=True)
+class BalanceView:
+    participant: ParticipantView
+    paid: int
+    owed: int
+    balance: int  # > 0: tem a receber; < 0: deve
+
+
+@dataclass(frozen=True)
+class TransferView:
+    debtor: ParticipantView
+    creditor: ParticipantView
+    amount: int
+
+
+@dataclass(frozen=True)
+class SettlementView:
+    token: str
+    revision: int
+    currency: str
+    balances: List[BalanceView]
+    transfers: List[TransferView]
+    unassigned: int  # custo de itens sem pagador (fora do acerto)
+
+
+def settlement_queries(trip_id: int):
+    """
+    (participantes, despesas, divisões): três SELECTs por trip_id, sem
+    carregar os itens inteiros (só id, pagador, custo e moeda).
+    """
+    participants = (
+        select(TripParticipant)
+        .where(TripParticipant.trip_id == trip_id)
+        .order_by(TripParticipant.created_at, TripParticipant.id)
+    )
+    expenses = select(TripItem.id, TripItem.paid_by_id, TripItem.cost, TripItem.currency).where(
+        TripItem.trip_id == trip_id, TripItem.cost > 0
+    )
+    shares = select(TripItemShare.item_id, TripItemShare.participant_id).where(TripItemShare.trip_id == trip_id)
+    return participants, expenses, shares
+
+
+def build_settlement(trip, revision: int, participants, expense_rows, share_rows) -> SettlementView:
+    people = [participant_view(p) for p in participants]
+    by_id = {p.id: p for p in people}
+
+    shares: Dict[int, List[int]] = defaultdict(list)
+    for item_id, participant_id in share_rows:
+        shares[item_id].append(participant_id)
+
+    # tudo na moeda da viagem; item em moeda sem taxa fica fora do acerto
+    table = rate_table()
+    expenses, unassigned = [], 0
+    for item_id, payer, cost, currency in expense_rows:
+        cost = table.convert(cost, currency or trip.currency, trip.currency)
+        if cost is None:
+            continue
+        if payer in by_id:
+            expenses.append((item_id, payer, cost))
+        else:
+            unassigned += cost
+
+    paid, owed, balances, transfers = settle_expenses(list(by_id), expenses, shares)
+    return SettlementView(
+        token=trip.token,
+        revision=revision,
+        currency=trip.currency,
+        balances=[BalanceView(p, paid[p.id], owed[p.id], balances[p.id]) for p in people],
+        transfers=[TransferView(by_id[t.from_id], by_id[t.to_id], t.amount) for t in transfers],
+        unassigned=unassigned,
+    )
+
+
+def cached_settlement(token: str, revision: int) -> Optional[SettlementView]:
+    return _trip_view_cache.get(("settlement", token, revision))
+
+
+def store_settlement(view: SettlementView) -> None:
+    _trip_view_cache.set(("settlement", view.token, view.revision), view)
+
+
+def get_trip_settlement(db: Session, trip: Union[Trip, "TripRef", TripSnapshot], revision: int) -> SettlementView:
+    """
+    Saldos e transferências da viagem. `revision` é a que o chamador leu
+    (get_trip_revision / view da página): qualquer escrita sobe a revisão,
+    então a entrada antiga simplesmente deixa de ser usada.
+    """
+    view = cached_settlement(trip.token, revision)
+    if view is not None:
+        return view
+    q_participants, q_expenses, q_shares = settlement_queries(trip.id)
+    view = build_settlement(
+        trip,
+        revision,
+        db.execute(q_participants).scalars().all(),
+        db.execute(q_expenses).all(),
+        db.execute(q_shares).all(),
+    )
+    store_settlement(view)
+    return view
+
+
+# --------------------------------------------
+# Busca nos itens (/t/{token}/search)
+# --------------------------------------------
+@dataclass(frozen=True)
+class SearchHitView:
+    item: ItemView
+    rank: float
+
+
+@dataclass(frozen=True)
+class SearchResultsView:
+    query: str
+    page: int
+    hits: List[SearchHitView]
+    has_more: bool
+
+
+def search_items_query(trip_id: int, item_ids: List[int]):
+    return select(TripItem).where(TripItem.trip_id == trip_id, TripItem.id.in_(item_ids))
+
+
+def build_search_results(q: str, page: int, ranked, items: Iterable[TripItem]) -> SearchResultsView:
+    """ranked: (item_id, rank) como vem do índice (com a linha extra da próxima página)."""
+    by_id = {item.id: item for item in items}
+    hits = [
+        SearchHitView(item=item_view(by_id[item_id]), rank=rank)
+        for item_id, rank in ranked[:SEARCH_PAGE_SIZE]
+        if item_id in by_id
+    ]
+    return SearchResultsView(query=q, page=page, hits=hits, has_more=len(ranked) > SEARCH_PAGE_SIZE)
+
+
+def search_trip_items(db: Session, trip: Union[Trip, "TripRef"], q: str, page: int = 1) -> SearchResultsView:
+    """Duas queries: o índice (ranking + página) e os itens da página por id."""
+    query = search_query(db.bind.dialect.name, trip.id, q, page)
+    ranked = db.execute(*query).all() if query else []
+    ids = [item_id for item_id, _ in ranked[:SEARCH_PAGE_SIZE]]
+    items = db.execute(search_items_query(trip.id, ids)).scalars().all() if ids else []
+    return build_search_results(q, page, ranked, items)
+
+
+# --------------------------------------------
+# Consistência de trip_totals (manage.py totals-check / totals-rebuild)
+# --------------------------------------------
+def _computed_totals_query(trip_id: Optional[int] = None):
+    currency = func.coalesce(TripItem.currency, "")
+    q = select(
+        TripItem.trip_id,
+        TripItem.category,
+        currency,
+        func.count(TripItem.id),
+        func.coalesce(func.sum(TripItem.cost), 0),
+    ).group_by(TripItem.trip_id, TripItem.category, currency)
+    if trip_id is not None:
+        q = q.where(TripItem.trip_id == trip_id)
+    return q
+
+
+def rebuild_trip_totals(conn, trip_id: Optional[int] = None) -> None:
+    """
+    Recalcula trip_totals e trips.participant_count a partir das tabelas de
+    origem. Aceita Session ou Connection; quem chama faz o commit.
+    """
+    wipe = delete(TripTotal)
+    if trip_id is not None:
+        wipe = wipe.where(TripTotal.trip_id == trip_id)
+    conn.execute(wipe)
+    conn.execute(
+        insert(TripTotal).from_select(
+            ["trip_id", "category", "currency", "item_count", "cost_cents"], _computed_totals_query(trip_id)
+        )
+    )
+
+    count_q = (
+        select(func.count(TripParticipant.id))
+        .where(TripParticipant.trip_id == Trip.id)
+        .scalar_subquery()
+    )
+    upd = update(Trip).values(participant_count=count_q)
+    if trip_id is not None:
+        upd = upd.where(Trip.id == trip_id)
+    conn.execute(upd)
+
+
+def check_trip_totals(conn) -> List[Dict[str, Any]]:
+    """
+    Lista divergências entre trip_totals e o que os itens/participantes dizem.
+    """
+    stored = {
+        (r.trip_id, r.category, r.currency): (r.item_count, r.cost_cents)
+        for r in conn.execute(
+            select(TripTotal.trip_id, TripTotal.category, TripTotal.currency, TripTotal.item_count, TripTotal.cost_cents)
+        )
+        if r.item_count or r.cost_cents
+    }
+    computed = {
+        (trip_id, cat, cur): (int(count), int(total))
+        for trip_id, cat, cur, count, total in conn.execute(_computed_totals_query())
+    }
+
+    problems = []
+    for key in sorted(set(stored) | set(computed), key=str):
+        if stored.get(key) != computed.get(key):
+            problems.append(
+                {
+                    "trip_id": key[0],
+                    "category": key[1],
+                    "currency": key[2],
+                    "stored": stored.get(key),
+                    "expected": computed.get(key),
+                }
+            )
+
+    participant_rows = conn.execute(
+        select(Trip.id, Trip.participant_count, func.count(TripParticipant.id))
+        .outerjoin(TripParticipant, TripParticipant.trip_id == Trip.id)
+        .group_by(Trip.id, Trip.participant_count)
+    )
+    for trip_id, stored_count, real_count in participant_rows:
+        if stored_count != real_count:
+            problems.append(
+                {"trip_id": trip_id, "category": "participants", "stored": stored_count, "expected": real_count}
+            )
+    return problems
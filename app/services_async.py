@@ -0,0 +1,118 @@
+"""
+Versões async (AsyncSession) das leituras quentes de services.py, usadas
+quando DB_ASYNC=1. A montagem do view model e o cache são os mesmos.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models import Trip, TripTotal
+from .services import (
+    SearchResultsView,
+    SettlementView,
+    TripPageView,
+    TripView,
+    build_search_results,
+    build_settlement,
+    build_trip_page_view,
+    build_trip_view,
+    cached_settlement,
+    cached_trip_page_view,
+    cached_trip_view,
+    first_pages_query,
+    paginate_items,
+    search_items_query,
+    section_page_query,
+    settlement_queries,
+    store_settlement,
+    store_trip_page_view,
+    store_trip_view,
+    trip_totals_from_rows,
+)
+from .search import SEARCH_PAGE_SIZE, search_query
+
+
+async def get_trip_by_token(db: AsyncSession, token: str) -> Optional[Trip]:
+    return (await db.execute(select(Trip).where(Trip.token == token))).scalars().first()
+
+
+async def get_trip_revision(db: AsyncSession, token: str) -> Optional[int]:
+    return (await db.execute(select(Trip.revision).where(Trip.token == token))).scalar()
+
+
+async def get_trip_aggregate(db: AsyncSession, token: str) -> Optional[Trip]:
+    # mesmo plano do sync: participantes no JOIN, itens num SELECT ... IN
+    stmt = (
+        select(Trip)
+        .options(joinedload(Trip.participants), selectinload(Trip.items))
+        .where(Trip.token == token)
+    )
+    return (await db.execute(stmt)).unique().scalars().first()
+
+
+async def get_trip_view(db: AsyncSession, token: str, revision: int) -> Optional[TripView]:
+    view = cached_trip_view(token, revision)
+    if view is not None:
+        return view
+
+    trip = await get_trip_aggregate(db, token)
+    if not trip:
+        return None
+    view = build_trip_view(trip)
+    store_trip_view(view)
+    return view
+
+
+async def get_trip_totals(db: AsyncSession, trip: Trip) -> Dict[str, Any]:
+    rows = (await db.execute(select(TripTotal).where(TripTotal.trip_id == trip.id))).scalars().all()
+    participants_count = (
+        await db.execute(select(Trip.participant_count).where(Trip.id == trip.id))
+    ).scalar() or 0
+    return trip_totals_from_rows(rows, participants_count, trip.currency)
+
+
+async def get_trip_page_view(db: AsyncSession, token: str, revision: int) -> Optional[TripPageView]:
+    view = cached_trip_page_view(token, revision)
+    if view is not None:
+        return view
+
+    stmt = select(Trip).options(joinedload(Trip.participants)).where(Trip.token == token)
+    trip = (await db.execute(stmt)).unique().scalars().first()
+    if not trip:
+        return None
+    total_rows = (await db.execute(select(TripTotal).where(TripTotal.trip_id == trip.id))).scalars().all()
+    items = (await db.execute(first_pages_query(trip.id))).scalars().all()
+    view = build_trip_page_view(trip, total_rows, items)
+    store_trip_page_view(view)
+    return view
+
+
+async def get_section_page(db: AsyncSession, trip_id: int, category: str, cursor: Optional[str]):
+    items = (await db.execute(section_page_query(trip_id, category, cursor))).scalars().all()
+    return paginate_items(items)
+
+
+async def get_trip_settlement(db: AsyncSession, trip, revision: int) -> SettlementView:
+    view = cached_settlement(trip.token, revision)
+    if view is not None:
+        return view
+    q_participants, q_expenses, q_shares = settlement_queries(trip.id)
+    view = build_settlement(
+        trip,
+        revision,
+        (await db.execute(q_participants)).scalars().all(),
+        (await db.execute(q_expenses)).all(),
+        (await db.execute(q_shares)).all(),
+    )
+    store_settlement(view)
+    return view
+
+
+async def search_trip_items(db: AsyncSession, trip, q: str, page: int = 1) -> SearchResultsView:
+    query = search_query(db.bind.dialect.name, trip.id, q, page)
+    ranked = (await db.execute(*query)).all() if query else []
+    ids = [item_id for item_id, _ in ranked[:SEARCH_PAGE_SIZE]]
+    items = (await db.execute(search_items_query(trip.id, ids))).scalars().all() if ids else []
+    return build_search_results(q, page, ranked, items)
@@ -0,0 +1,127 @@
+"""
+Divisão de despesas e acerto de contas, tudo em centavos (int).
+
+- Cada despesa tem um pagador e é dividida em partes iguais entre quem
+  compartilha (sem lista = todos os participantes). A sobra da divisão
+  (1 centavo para alguns) roda pela lista a partir do id do item, para não
+  cair sempre na mesma pessoa.
+- saldo = pago - devido; a soma dos saldos é sempre zero.
+- settle_up casa devedores e credores (maiores primeiro, valores iguais
+  antes), o que dá no máximo n-1 transferências.
+"""
+import heapq
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Transfer:
+    from_id: int
+    to_id: int
+    amount: int  # centavos
+
+
+def split_cents(amount: int, sharers: Sequence[int], offset: int = 0) -> Dict[int, int]:
+    """Divide `amount` entre `sharers`; os centavos que sobram vão para os
+    primeiros a partir de `offset` (circular)."""
+    n = len(sharers)
+    base, rest = divmod(amount, n)
+    parts = {pid: base for pid in sharers}
+    for k in range(rest):
+        parts[sharers[(offset + k) % n]] += 1
+    return parts
+
+
+def compute_balances(
+    participant_ids: Sequence[int],
+    expenses: Iterable[Tuple[int, int, int]],
+    shares: Dict[int, List[int]],
+) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """
+    expenses: (item_id, pagador, custo em centavos). shares: item_id -> ids
+    de quem divide (ausente = todos). Retorna (pago, devido) por participante.
+
+    Mesmo resultado de somar split_cents item a item, mas O(itens + grupos x
+    pessoas): por grupo de quem divide soma-se a parte inteira e os centavos
+    de sobra entram num vetor de diferenças (faixa circular por item).
+    """
+    everyone = tuple(sorted(participant_ids))
+    known = set(everyone)
+    paid = {pid: 0 for pid in everyone}
+    owed = {pid: 0 for pid in everyone}
+    groups: Dict[Tuple[int, ...], List] = {}  # quem divide -> [soma das partes, diferenças]
+
+    for item_id, payer, cost in expenses:
+        if payer not in known or not cost:
+            continue
+        sharers = tuple(sorted(pid for pid in shares.get(item_id, ()) if pid in known)) or everyone
+        paid[payer] += cost
+        n = len(sharers)
+        group = groups.get(sharers)
+        if group is None:
+            group = groups[sharers] = [0, [0] * (n + 1)]
+        base, rest = divmod(cost, n)
+        group[0] += base
+        if rest:
+            diff = group[1]
+            start = item_id % n
+            end = start + rest
+            diff[start] += 1
+            if end <= n:
+                diff[end] -= 1
+            else:  # dá a volta
+                diff[n] -= 1
+                diff[0] += 1
+                diff[end - n] -= 1
+
+    for sharers, (base_total, diff) in groups.items():
+        extra = 0
+        for k, pid in enumerate(sharers):
+            extra += diff[k]
+            owed[pid] += base_total + extra
+    return paid, owed
+
+
+def settle_up(balances: Dict[int, int]) -> List[Transfer]:
+    """Transferências (devedor -> credor) que zeram os saldos."""
+    transfers: List[Transfer] = []
+
+    # primeiro quem tem exatamente o valor oposto: uma transferência resolve os dois
+    debtors_by_amount: Dict[int, List[int]] = {}
+    for pid, bal in sorted(balances.items()):
+        if bal < 0:
+            debtors_by_amount.setdefault(-bal, []).append(pid)
+    remaining = dict(balances)
+    for pid, bal in sorted(balances.items()):
+        match = debtors_by_amount.get(bal) if bal > 0 else None
+        if match:
+            debtor = match.pop(0)
+            transfers.append(Transfer(debtor, pid, bal))
+            remaining[debtor] = remaining[pid] = 0
+
+    # o resto: maior devedor paga o maior credor
+    creditors = [(-bal, pid) for pid, bal in remaining.items() if bal > 0]
+    debtors = [(bal, pid) for pid, bal in remaining.items() if bal < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append(Transfer(debtor, creditor, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
+
+def settle_expenses(
+    participant_ids: Sequence[int],
+    expenses: Iterable[Tuple[int, Optional[int], int]],
+    shares: Dict[int, List[int]],
+):
+    """(pago, devido, saldo, transferências) de uma viagem."""
+    paid, owed = compute_balances(participant_ids, expenses, shares)
+    balances = {pid: paid[pid] - owed[pid] for pid in paid}
+    return paid, owed, balances, settle_up(balances)
@@ -17,3 +17,270 @@
     });
   }
 })();
+
+// Edições via API JSON: remove/adiciona só o pedaço que mudou, sem recarregar a página.
+// Novos itens vão pelo POST do próprio formulário pedindo JSON (card já renderizado).
+// Sem JS (ou se a API falhar) os formulários continuam com o POST normal.
+(function () {
+  const root = document.getElementById("pageRoot");
+  if (!root || !window.fetch) return;
+
+  function apiUrlFromAction(action) {
+    // /t/<token>/items/<id>/delete -> /api/t/<token>/items/<id>
+    const path = new URL(action, location.href).pathname;
+    return "/api" + path.replace(/\/delete$/, "");
+  }
+
+  function bumpCount(el, delta) {
+    el.textContent = el.textContent.replace(/^\s*(\d+)/, (_, n) => String(Math.max(0, Number(n) + delta)));
+  }
+
+  function applyTotals(totals) {
+    if (!totals || !totals.display) return;
+    const cur = totals.currency;
+    document.querySelectorAll("[data-total-cat]").forEach((el) => {
+      const v = totals.display.by_cat[el.dataset.totalCat] || "0.00";
+      el.textContent = cur + " " + v;
+    });
+    const all = document.querySelector("[data-total-all]");
+    if (all) all.textContent = cur + " " + totals.display.total_all;
+  }
+
+  function removeItemCard(id) {
+    document.querySelectorAll('.saved-card[data-id="' + id + '"]').forEach((card) => {
+      const cat = card.dataset.category;
+      const row = card.closest(".day-row");
+      card.remove();
+      document.querySelectorAll('[data-count-cat="' + cat + '"]').forEach((el) => bumpCount(el, -1));
+      if (row) {
+        const left = row.querySelectorAll(".saved-card").length;
+        if (left === 0) row.remove();
+        else row.querySelectorAll(".day-count").forEach((el) => bumpCount(el, -1));
+      }
+    });
+  }
+
+  // Card novo (linha de dia renderizada pelo servidor): entra na linha do
+  // mesmo dia ou vira uma linha nova na posição da data (sem data por último).
+  function insertItemCard(item, html) {
+    const cat = item.category;
+    let container = document.querySelector('[data-days="' + cat + '"]');
+    if (!container) {
+      // primeiro item da categoria: troca o "nenhum item" pela lista
+      const panel = Array.from(document.querySelectorAll('[data-count-cat="' + cat + '"]'))
+        .map((el) => el.closest(".panel-card"))
+        .find((el) => el && el.querySelector(".empty-state"));
+      if (!panel) return false;
+      container = document.createElement("div");
+      container.className = "mt-4 grid gap-4";
+      container.dataset.days = cat;
+      panel.querySelector(".empty-state").replaceWith(container);
+    }
+    const tpl = document.createElement("template");
+    tpl.innerHTML = html;
+    const row = tpl.content.querySelector(".day-row");
+    if (!row) return false;
+
+    const existing = container.querySelector('.day-row[data-date="' + row.dataset.date + '"]');
+    if (existing) {
+      existing.querySelector(".strip").appendChild(row.querySelector(".saved-card"));
+      existing.querySelectorAll(".day-count").forEach((el) => bumpCount(el, 1));
+    } else {
+      const key = (d) => (d === "None" ? "9999-99-99" : d);
+      const after = Array.from(container.querySelectorAll(".day-row"))
+        .find((r) => key(r.dataset.date) > key(row.dataset.date));
+      container.insertBefore(row, after || null);
+    }
+    document.querySelectorAll('[data-count-cat="' + cat + '"]').forEach((el) => bumpCount(el, 1));
+    // mapas com data-src: o trip.js carrega os novos no próximo resize
+    window.dispatchEvent(new Event("resize"));
+    return true;
+  }
+
+  function resetItemForm(form) {
+    form.reset();
+    // toggles (conexão, carro, gratuito) e total da hospedagem seguem o form
+    form.querySelectorAll("input").forEach((el) => {
+      el.dispatchEvent(new Event(el.type === "checkbox" ? "change" : "input", { bubbles: true }));
+    });
+  }
+
+  function participantChip(p, token) {
+    const div = document.createElement("div");
+    div.dataset.participantId = p.id;
+    div.className = "px-3 py-2 rounded-2xl bg-slate-950 border border-slate-800 text-sm text-slate-200 flex items-center gap-2";
+
+    const name = document.createElement("span");
+    name.className = "font-medium";
+    name.textContent = p.name;
+    div.appendChild(name);
+
+    if (p.email) {
+      const email = document.createElement("span");
+      email.className = "text-slate-400";
+      email.textContent = "• " + p.email;
+      div.appendChild(email);
+    }
+
+    const form = document.createElement("form");
+    form.method = "post";
+    form.action = "/t/" + token + "/participants/" + p.id + "/delete";
+    form.className = "js-api-delete";
+    form.innerHTML = '<button type="submit" class="ml-2 px-2 py-1 rounded-xl bg-slate-800 hover:bg-rose-600 transition text-xs">remover</button>';
+    div.appendChild(form);
+    return div;
+  }
+
+  document.addEventListener("submit", async (e) => {
+    const form = e.target;
+    if (!(form instanceof HTMLFormElement)) return;
+
+    if (form.classList.contains("js-api-delete")) {
+      e.preventDefault();
+      try {
+        const resp = await fetch(apiUrlFromAction(form.action), { method: "DELETE" });
+        if (!resp.ok) throw new Error(String(resp.status));
+        const data = await resp.json();
+        const chip = form.closest("[data-participant-id]");
+        if (chip) {
+          chip.remove();
+        } else {
+          removeItemCard(data.deleted);
+          const close = document.querySelector('#itemModal [data-close="1"]');
+          if (close) close.click();
+        }
+        applyTotals(data.totals);
+      } catch (err) {
+        form.submit();
+      }
+      return;
+    }
+
+    if (form.classList.contains("js-api-item")) {
+      // mesmo POST do formulário (o servidor monta o item a partir dos campos
+      // de cada categoria), mas a resposta é JSON em vez de 303 + página nova
+      e.preventDefault();
+      let resp;
+      try {
+        resp = await fetch(form.action, {
+          method: "POST",
+          headers: { Accept: "application/json" },
+          body: new FormData(form),
+        });
+      } catch (err) {
+        form.submit();
+        return;
+      }
+      if (resp.status === 400) {
+        const data = await resp.json().catch(() => ({}));
+        location.href = "/t/" + root.dataset.tripToken + "?error=" + encodeURIComponent(data.detail || "Erro ao salvar item.");
+        return;
+      }
+      if (!resp.ok) {
+        form.submit();
+        return;
+      }
+      // o item já foi gravado: daqui em diante, na dúvida, recarrega (não reenvia)
+      try {
+        const data = await resp.json();
+        if (!insertItemCard(data.item, data.html)) throw new Error("card");
+        resetItemForm(form);
+        applyTotals(data.totals);
+      } catch (err) {
+        location.reload();
+      }
+      return;
+    }
+
+    if (form.classList.contains("js-api-join")) {
+      e.preventDefault();
+      const fd = new FormData(form);
+      const body = { name: String(fd.get("name") || ""), email: String(fd.get("email") || "") || null };
+      try {
+        const resp = await fetch(form.dataset.api, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify(body),
+        });
+        if (!resp.ok) throw new Error(String(resp.status));
+        const data = await resp.json();
+        const list = document.getElementById("participantsList");
+        const chip = participantChip(data.participant, root.dataset.tripToken);
+        const old = list.querySelector('[data-participant-id="' + data.participant.id + '"]');
+        if (old) old.replaceWith(chip);
+        else list.appendChild(chip);
+        list.classList.remove("hidden");
+        form.reset();
+        applyTotals(data.totals);
+      } catch (err) {
+        form.submit();
+      }
+    }
+  });
+
+  // Alterações feitas por outras pessoas chegam por SSE (/t/<token>/events).
+  // Remoções e participantes viram diferença no DOM; itens novos e edição da
+  // viagem mostram um aviso para recarregar (o card depende do template).
+  const token = root.dataset.tripToken;
+  if (!token || !window.EventSource) return;
+
+  let totalsTimer = null;
+  function refreshTotals() {
+    clearTimeout(totalsTimer);
+    totalsTimer = setTimeout(async () => {
+      try {
+        const resp = await fetch("/api/t/" + token + "/totals");
+        if (resp.ok) applyTotals(await resp.json());
+      } catch (err) {}
+    }, 300);
+  }
+
+  function showReloadNotice() {
+    if (document.getElementById("liveNotice")) return;
+    const bar = document.createElement("button");
+    bar.id = "liveNotice";
+    bar.type = "button";
+    bar.className = "fixed bottom-4 left-1/2 -translate-x-1/2 z-50 px-4 py-2 rounded-2xl bg-indigo-600 text-white text-sm shadow-lg";
+    bar.textContent = "Há novidades nesta viagem — atualizar";
+    bar.addEventListener("click", () => location.reload());
+    document.body.appendChild(bar);
+  }
+
+  function upsertParticipant(p) {
+    const list = document.getElementById("participantsList");
+    if (!list) return;
+    const chip = participantChip(p, token);
+    const old = list.querySelector('[data-participant-id="' + p.id + '"]');
+    if (old) old.replaceWith(chip);
+    else list.appendChild(chip);
+    list.classList.remove("hidden");
+  }
+
+  const handlers = {
+    item_deleted: (d) => removeItemCard(d.id),
+    participant_added: (d) => upsertParticipant(d.participant),
+    participant_updated: (d) => upsertParticipant(d.participant),
+    participant_removed: (d) => {
+      document.querySelectorAll('#participantsList [data-participant-id="' + d.id + '"]').forEach((el) => el.remove());
+    },
+    item_created: (d) => {
+      // o evento do próprio item pode chegar antes da resposta do POST
+      setTimeout(() => {
+        if (!document.querySelector('.saved-card[data-id="' + d.item.id + '"]')) showReloadNotice();
+      }, 1500);
+    },
+    items_imported: showReloadNotice,
+    trip_updated: showReloadNotice,
+    resync: showReloadNotice,
+  };
+
+  const source = new EventSource("/t/" + token + "/events");
+  Object.keys(handlers).forEach((type) => {
+    source.addEventListener(type, (e) => {
+      const data = JSON.parse(e.data || "{}");
+      if (data.resync) showReloadNotice();
+      else handlers[type](data);
+      refreshTotals();
+    });
+  });
+})();
@@ -0,0 +1,381 @@
+(function(){
+  function byId(id){ return document.getElementById(id); }
+
+  window.openMaps = function(inputId){
+    const el = byId(inputId);
+    if(!el) return;
+    const q = (el.value || "").trim();
+    if(!q) return;
+    window.open("https://www.google.com/maps/search/?api=1&query=" + encodeURIComponent(q), "_blank");
+  };
+
+  // Copy share link
+  (function(){
+    const btn = byId("btnCopy");
+    const el = byId("shareLink");
+    const msg = byId("copyMsg");
+    if(!btn || !el) return;
+    btn.addEventListener("click", async () => {
+      try{
+        await navigator.clipboard.writeText(el.value);
+        if(msg) msg.innerText = "Copiado!";
+        setTimeout(() => { if(msg) msg.innerText = ""; }, 1200);
+      }catch(e){
+        if(msg) msg.innerText = "Falha ao copiar. Copie manualmente.";
+      }
+    });
+  })();
+
+  // Edit trip toggle
+  (function(){
+    const btn = byId("btnEditTrip");
+    const box = byId("editTripBox");
+    if(!btn || !box) return;
+    btn.addEventListener("click", () => box.classList.toggle("hidden"));
+  })();
+
+  // Tabs
+  (function() {
+    const btns = Array.from(document.querySelectorAll('.tab-btn'));
+    const panels = Array.from(document.querySelectorAll('.tab-panel'));
+    if(btns.length === 0) return;
+
+    function activate(tabId){
+      btns.forEach(b => b.classList.toggle('active', b.dataset.tab === tabId));
+      panels.forEach(p => p.classList.toggle('active', p.id === tabId));
+      localStorage.setItem('tripPlannerTab', tabId);
+      // Re-observe maps when switching tabs
+      setTimeout(initLazyMaps, 50);
+    }
+
+    const saved = localStorage.getItem('tripPlannerTab');
+    const first = saved && document.getElementById(saved) ? saved : btns[0].dataset.tab;
+    activate(first);
+
+    btns.forEach(b => b.addEventListener('click', () => activate(b.dataset.tab)));
+  })();
+
+  // Create mode end date auto
+  (function(){
+    const start = byId("startDate");
+    const dur = byId("durationDays");
+    const end = byId("endDate");
+    if(!start || !dur || !end) return;
+
+    function calc(){
+      const s = start.value;
+      const d = parseInt(dur.value || "0", 10);
+      if(!s || !d || d <= 0) return;
+      const dt = new Date(s + "T00:00:00");
+      dt.setDate(dt.getDate() + (d - 1));
+      end.value = dt.toISOString().slice(0,10);
+    }
+    start.addEventListener("change", calc);
+    dur.addEventListener("input", calc);
+  })();
+
+  // Passeio: gratuito -> esconde pago
+  (function(){
+    const free = byId("actFree");
+    const paid = byId("actPaidBox");
+    if(!free || !paid) return;
+    const sync = () => paid.classList.toggle("hidden", free.checked);
+    free.addEventListener("change", sync);
+    sync();
+  })();
+
+  // Passagem: conexão
+  (function(){
+    const c = byId("hasConn");
+    const box = byId("connBox");
+    if(!c || !box) return;
+    const sync = () => box.classList.toggle("hidden", !c.checked);
+    c.addEventListener("change", sync);
+    sync();
+  })();
+
+  // Transporte: carro
+  (function(){
+    const c = byId("isCar");
+    const box = byId("carBox");
+    if(!c || !box) return;
+    const sync = () => box.classList.toggle("hidden", !c.checked);
+    c.addEventListener("change", sync);
+    sync();
+  })();
+
+  // Hospedagem total auto (UI)
+  (function(){
+    const n = byId("hotelNights");
+    const d = byId("hotelDaily");
+    const out = byId("hotelTotal");
+    if(!n || !d || !out) return;
+
+    function parseMoney(s){
+      if(!s) return 0;
+      s = String(s).trim().replace(" ", "");
+      if(s.includes(",") && s.includes(".")){
+        if(s.lastIndexOf(",") > s.lastIndexOf(".")) s = s.replace(/\./g,"").replace(",",".");
+        else s = s.replace(/,/g,"");
+      } else {
+        s = s.replace(",",".");
+      }
+      const v = parseFloat(s);
+      return isNaN(v) ? 0 : v;
+    }
+    function calc(){
+      const nights = parseInt(n.value || "0",10) || 0;
+      const daily = parseMoney(d.value);
+      const total = nights * daily;
+      out.textContent = total ? total.toFixed(2) : "";
+    }
+    n.addEventListener("input", calc);
+    d.addEventListener("input", calc);
+    calc();
+  })();
+
+  // Strip scroll buttons (all, incl. linhas carregadas depois)
+  document.addEventListener("click", (e)=>{
+    const btn = e.target.closest(".strip-btn");
+    if(!btn) return;
+    const wrap = btn.closest(".strip-wrap");
+    const strip = wrap ? wrap.querySelector(".strip") : null;
+    if(!strip) return;
+    const dir = btn.dataset.strip;
+    const amt = Math.floor(strip.clientWidth * 0.92);
+    strip.scrollBy({ left: dir === "left" ? -amt : amt, behavior: "smooth" });
+  });
+
+  // ===== LAZY MAPS (PREMIUM) =====
+  let mapObserver = null;
+
+  function initLazyMaps(){
+    // Disconnect old observer
+    if(mapObserver){ try { mapObserver.disconnect(); } catch(e){} }
+
+    const frames = Array.from(document.querySelectorAll("iframe.js-lazy-map"));
+    if(frames.length === 0) return;
+
+    // Put skeleton for all that are not loaded
+    frames.forEach(f=>{
+      if(f.dataset.loaded === "1") return;
+      const parent = f.parentElement;
+      if(parent && !parent.querySelector(".saved-skel")){
+        const sk = document.createElement("div");
+        sk.className = "saved-skel";
+        parent.appendChild(sk);
+      }
+    });
+
+    mapObserver = new IntersectionObserver((entries)=>{
+      entries.forEach(entry=>{
+        if(!entry.isIntersecting) return;
+        const iframe = entry.target;
+        if(iframe.dataset.loaded === "1") { mapObserver.unobserve(iframe); return; }
+
+        const src = iframe.getAttribute("data-src");
+        if(src){
+          iframe.src = src;
+          iframe.dataset.loaded = "1";
+
+          iframe.addEventListener("load", ()=>{
+            iframe.classList.add("is-loaded");
+            const parent = iframe.parentElement;
+            const sk = parent ? parent.querySelector(".saved-skel") : null;
+            if(sk) sk.remove();
+          }, { once:true });
+        }
+        mapObserver.unobserve(iframe);
+      });
+    }, {
+      root: null,
+      rootMargin: "250px 0px", // carrega antes de aparecer
+      threshold: 0.01
+    });
+
+    frames.forEach(f=> mapObserver.observe(f));
+  }
+
+  // ===== CARREGAR MAIS (seções paginadas) =====
+  // O fragmento traz linhas de dia; se o primeiro dia já existe na página
+  // (página cortou no meio do dia), os cards vão para a linha existente.
+  function mergeDayRows(container, html){
+    const tpl = document.createElement("template");
+    tpl.innerHTML = html;
+    tpl.content.querySelectorAll(".day-row").forEach(row=>{
+      const existing = container.querySelector('.day-row[data-date="' + row.dataset.date + '"]');
+      if(!existing){ container.appendChild(row); return; }
+      const strip = existing.querySelector(".strip");
+      row.querySelectorAll(".saved-card").forEach(card=> strip.appendChild(card));
+      const total = strip.querySelectorAll(".saved-card").length;
+      existing.querySelectorAll(".day-count").forEach(el=>{
+        el.textContent = el.textContent.replace(/^\s*\d+/, String(total));
+      });
+    });
+  }
+
+  document.addEventListener("click", async (e)=>{
+    const btn = e.target.closest(".js-load-more");
+    if(!btn || btn.disabled) return;
+    const container = btn.parentElement.querySelector("[data-days]");
+    if(!container) return;
+    btn.disabled = true;
+    try{
+      const url = btn.dataset.section + "?cursor=" + encodeURIComponent(btn.dataset.cursor);
+      const resp = await fetch(url);
+      if(!resp.ok) throw new Error(String(resp.status));
+      mergeDayRows(container, await resp.text());
+      const next = resp.headers.get("X-Next-Cursor");
+      if(next){ btn.dataset.cursor = next; btn.disabled = false; }
+      else btn.remove();
+      initLazyMaps();
+    }catch(err){
+      btn.disabled = false;
+    }
+  });
+
+  // init once
+  window.addEventListener("load", initLazyMaps);
+  // also in case of dynamic layout changes
+  window.addEventListener("resize", ()=> setTimeout(initLazyMaps, 150));
+
+  // ===== MODAL =====
+  (function(){
+    const root = byId("pageRoot");
+    if(!root) return;
+    const token = root.dataset.tripToken || "";
+
+    const modal = byId("itemModal");
+    if(!modal) return;
+
+    const mTitle = byId("mTitle");
+    const mSub = byId("mSub");
+    const mChips = byId("mChips");
+    const mNotes = byId("mNotes");
+    const mMapBox = byId("mMapBox");
+    const mMap = byId("mMap");
+    const mUrl = byId("mUrl");
+    const mMapsLink = byId("mMapsLink");
+    const mDeleteForm = byId("mDeleteForm");
+    const mEditBtn = byId("mEditBtn");
+    const mEditBox = byId("mEditBox");
+    const mEditForm = byId("mEditForm");
+
+    function show(){
+      modal.classList.add("open");
+      document.body.style.overflow = "hidden";
+    }
+    function hide(){
+      modal.classList.remove("open");
+      document.body.style.overflow = "";
+      if(mMap) mMap.removeAttribute("src");
+      if(mEditBox) mEditBox.classList.add("hidden");
+      if(mEditForm) mEditForm.innerHTML = "";
+    }
+    function chip(txt){
+      const s = document.createElement("span");
+      s.className = "chip";
+      s.textContent = txt;
+      mChips.appendChild(s);
+    }
+    function esc(s){ return String(s || "").replaceAll('"', "&quot;"); }
+
+    function openFromBtn(btn){
+      const id = btn.dataset.id;
+      const title = btn.dataset.title || "";
+      const category = btn.dataset.category || "";
+      if(!id || !title || !category) return;
+
+      const date = btn.dataset.date || "";
+      const address = btn.dataset.address || "";
+      const url = btn.dataset.url || "";
+      const notes = btn.dataset.notes || "";
+      const cost = (btn.dataset.cost || "").trim();
+
+      mTitle.textContent = title;
+      mSub.textContent = [category, date].filter(Boolean).join(" • ");
+
+      mChips.innerHTML = "";
+      if(cost) chip(cost);
+
+      if(btn.dataset.period) chip("🕒 " + btn.dataset.period);
+      if(btn.dataset.isFree === "1") chip("🆓 Gratuito");
+      if(btn.dataset.company) chip("✈️ " + btn.dataset.company);
+      if(btn.dataset.origin || btn.dataset.destination) chip((btn.dataset.origin||"") + " → " + (btn.dataset.destination||""));
+      if(btn.dataset.transportType) chip("🧭 " + btn.dataset.transportType);
+      if(btn.dataset.duration) chip("⏱ " + btn.dataset.duration);
+      if(btn.dataset.meal) chip("🍽 " + btn.dataset.meal);
+
+      if(notes.trim()){
+        mNotes.classList.remove("hidden");
+        mNotes.textContent = notes;
+      } else {
+        mNotes.classList.add("hidden");
+        mNotes.textContent = "";
+      }
+
+      if(url.trim()){
+        mUrl.classList.remove("hidden");
+        mUrl.href = url;
+      } else {
+        mUrl.classList.add("hidden");
+        mUrl.removeAttribute("href");
+      }
+
+      if(address.trim()){
+        mMapsLink.classList.remove("hidden");
+        mMapsLink.href = "https://www.google.com/maps/search/?api=1&query=" + encodeURIComponent(address);
+        mMapBox.classList.remove("hidden");
+        // Modal pode carregar direto (é um só)
+        mMap.src = "https://www.google.com/maps?q=" + encodeURIComponent(address) + "&output=embed";
+      } else {
+        mMapsLink.classList.add("hidden");
+        mMapBox.classList.add("hidden");
+        mMap.removeAttribute("src");
+      }
+
+      mDeleteForm.action = `/t/${token}/items/${id}/delete`;
+
+      mEditForm.action = `/t/${token}/items/${id}/edit`;
+      mEditForm.innerHTML = `
+        <input type="hidden" name="category" value="${esc(category)}">
+        <label class="text-sm text-slate-300">Título</label>
+        <input class="field field-light" name="title" value="${esc(title)}" required>
+        <label class="text-sm text-slate-300">Data</label>
+        <input class="field field-light" type="date" name="item_date" value="${esc(date)}">
+        <label class="text-sm text-slate-300">Endereço</label>
+        <input class="field field-light" name="address" value="${esc(address)}">
+        <label class="text-sm text-slate-300">Link (opcional)</label>
+        <input class="field field-light" name="url" value="${esc(url)}">
+        <label class="text-sm text-slate-300">Nota</label>
+        <textarea class="field field-light" rows="4" name="notes">${esc(notes).replaceAll("&quot;", '"')}</textarea>
+        <button class="px-4 py-2 rounded-2xl bg-indigo-600 hover:bg-indigo-500 transition font-medium">
+          Salvar edição
+        </button>
+      `;
+      mEditBox.classList.add("hidden");
+      mEditBtn.textContent = "Editar";
+
+      show();
+    }
+
+    modal.addEventListener("click", (e) => {
+      const t = e.target;
+      if(t && t.dataset && t.dataset.close === "1") hide();
+    });
+    document.addEventListener("keydown", (e)=>{ if(e.key==="Escape") hide(); });
+
+    document.addEventListener("click", (e) => {
+      const btn = e.target.closest(".js-open-modal");
+      if(!btn) return;
+      openFromBtn(btn);
+    });
+
+    mEditBtn.addEventListener("click", () => {
+      const isOpen = !mEditBox.classList.contains("hidden");
+      mEditBox.classList.toggle("hidden", isOpen);
+      mEditBtn.textContent = isOpen ? "Editar" : "Fechar edição";
+    });
+  })();
+
+})();
@@ -0,0 +1,138 @@
+"""
+Ambiente Jinja do app, com cache de bytecode em disco.
+
+Sem cache, cada processo novo (cold start, cada worker do gunicorn) compila
+os templates de novo no primeiro render. Com FileSystemBytecodeCache o código
+compilado fica em TEMPLATE_CACHE_DIR e é só carregado; o build do deploy
+pré-compila tudo com `python -m app.manage compile-templates`.
+
+TEMPLATE_CACHE_DIR: diretório do cache (padrão ./.jinja_cache; "off" desliga)
+HTML_MINIFY: 1 (padrão) tira indentação/linhas vazias do HTML renderizado
+
+Arquivos de app/static são referenciados com static_url("x.js"), que põe a
+impressão digital do conteúdo na query (?v=...). URLs com ?v= são servidas
+com cache longo (immutable): o arquivo mudou, a URL muda junto.
+"""
+import hashlib
+import os
+import re
+from typing import Dict, Optional
+
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from jinja2 import BytecodeCache, Environment, FileSystemBytecodeCache, FileSystemLoader
+
+TEMPLATE_DIR = os.path.join("app", "templates")
+STATIC_DIR = os.path.join("app", "static")
+HTML_MINIFY = (os.getenv("HTML_MINIFY") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def template_bytecode_cache() -> Optional[BytecodeCache]:
+    directory = (os.getenv("TEMPLATE_CACHE_DIR") or "./.jinja_cache").strip()
+    if directory.lower() in ("off", "none", "0", ""):
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        # disco somente leitura: segue sem cache (só compila em memória)
+        return None
+    return FileSystemBytecodeCache(directory)
+
+
+# -------------------------
+# Static com impressão digital
+# -------------------------
+_static_versions: Dict[str, str] = {}
+
+
+def static_version(name: str) -> str:
+    """sha1 curto do conteúdo (calculado uma vez por processo)."""
+    version = _static_versions.get(name)
+    if version is None:
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:10]
+        _static_versions[name] = version
+    return version
+
+
+def static_url(name: str) -> str:
+    return f"/static/{name}?v={static_version(name)}"
+
+
+def static_fingerprint() -> str:
+    """Versão de todos os arquivos estáticos juntos (entra no salt do ETag)."""
+    names = sorted(n for n in os.listdir(STATIC_DIR) if not n.startswith("."))
+    return hashlib.sha1("".join(n + static_version(n) for n in names).encode()).hexdigest()[:10]
+
+
+def templates_fingerprint() -> str:
+    """Conteúdo de todos os templates (partials inclusive), para o salt do ETag."""
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(TEMPLATE_DIR):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, TEMPLATE_DIR).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:10]
+
+
+class VersionedStaticFiles(StaticFiles):
+    STATIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200 and b"v=" in scope.get("query_string", b""):
+            response.headers["Cache-Control"] = self.STATIC_CACHE_CONTROL
+        return response
+
+
+# -------------------------
+# Minificação do HTML renderizado
+# -------------------------
+# trechos onde espaço em branco importa (ou que não vale a pena mexer)
+_KEEP_RE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+_INDENT_RE = re.compile(r"\n[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n{2,}")
+_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+
+
+def minify_html(html: str) -> str:
+    """
+    Conservador: só remove indentação, linhas vazias e comentários HTML.
+    Não junta linhas (um \n entre tags inline continua valendo como espaço)
+    e não toca em <pre>, <textarea>, <script> e <style>.
+    """
+    if not HTML_MINIFY:
+        return html
+    parts = _KEEP_RE.split(html)
+    out = []
+    # split com 2 grupos: [texto, bloco, nome_da_tag, texto, bloco, nome, ...]
+    for i in range(0, len(parts), 3):
+        text = _COMMENT_RE.sub("", parts[i])
+        text = _BLANK_LINES_RE.sub("\n", _INDENT_RE.sub("\n", text))
+        out.append(text)
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out).strip() + "\n"
+
+
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,  # o padrão do Jinja2Templates
+        bytecode_cache=template_bytecode_cache(),
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+)
+templates.env.globals["static_url"] = static_url
+
+
+def compile_templates() -> int:
+    """Carrega todos os templates (grava o bytecode no cache). Retorna quantos."""
+    names = templates.env.list_templates()
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
@@ -0,0 +1,31 @@
+"""
+Base comum dos benchmarks: aponta o app para um banco próprio ANTES de
+importar qualquer coisa de app/ (o engine é criado no import).
+
+Todos os scripts rodam a partir da raiz do repositório (o app usa caminhos
+relativos para app/static e app/templates); este módulo faz o chdir.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "bench")
+DEFAULT_BENCH_DB = "sqlite:///./bench/bench.db"
+SEED_FILE = os.path.join(BENCH_DIR, ".seed.json")
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+
+def use_bench_database(database_url=None) -> str:
+    """
+    Define DATABASE_URL (padrão: SQLite em bench/bench.db; passe uma URL
+    postgresql:// para medir no Postgres local) e prepara sys.path/cwd.
+    """
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    url = database_url or os.getenv("BENCH_DATABASE_URL") or DEFAULT_BENCH_DB
+    os.environ["DATABASE_URL"] = url
+    # números reproduzíveis: sem cache de HTML e sem eventos entre rodadas
+    os.environ.setdefault("HTML_CACHE_BACKEND", "off")
+    os.environ.setdefault("EVENTS_BACKEND", "off")
+    return url
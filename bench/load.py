@@ -0,0 +1,72 @@
+"""
+Teste de carga HTTP simples (um processo, asyncio + httpx).
+
+    python bench/load.py http://127.0.0.1:8000/t/<token> --concurrency 50 --duration 15
+
+Mostra requisições/s e latências p50/p95/p99. Para comparar sync x async,
+suba o mesmo app com e sem DB_ASYNC=1 (um worker só) e rode o mesmo comando.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+async def _worker(client, url, deadline, latencies, errors, headers):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            resp = await client.get(url, headers=headers)
+            if resp.status_code >= 400:
+                errors.append(resp.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run_load(url: str, concurrency: int, duration: float, headers=None) -> dict:
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            *[_worker(client, url, deadline, latencies, errors, headers or {}) for _ in range(concurrency)]
+        )
+        elapsed = time.perf_counter() - started
+
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": len(errors),
+        "rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50) * 1000, 2),
+        "p95_ms": round(percentile(lat, 95) * 1000, 2),
+        "p99_ms": round(percentile(lat, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(lat) * 1000, 2) if lat else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args.url, args.concurrency, args.duration))
+    for k, v in result.items():
+        print(f"{k:>9}: {v}")
+
+
+if __name__ == "__main__":
+    main()
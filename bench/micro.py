@@ -0,0 +1,118 @@
+"""
+Micro-benchmarks das partes quentes da página da viagem.
+
+    python bench/micro.py            # usa as viagens de bench/.seed.json
+    python bench/micro.py --json
+
+Cada caso roda em rodadas de timeit; reporta a mediana e o mínimo por
+operação (µs). Rode bench/seed.py antes.
+"""
+import argparse
+import json
+import statistics
+import timeit
+
+try:
+    from common import use_bench_database
+    from seed import load_tokens
+except ImportError:
+    from .common import use_bench_database
+    from .seed import load_tokens
+
+MONEY_SAMPLES = ["120", "120,50", "1.234,56", "1,234.56", " 99 ", "", "0,5"]
+META_SAMPLE = json.dumps(
+    {"address": "Rua 12, Centro", "notes": "x" * 80, "time": "08:30", "company": "Air Bench", "has_connection": False}
+)
+
+
+def bench(fn, number: int, repeat: int = 5) -> dict:
+    runs = timeit.repeat(fn, number=number, repeat=repeat)
+    per_op = sorted(r / number * 1e6 for r in runs)
+    return {"median_us": round(statistics.median(per_op), 2), "min_us": round(per_op[0], 2), "number": number}
+
+
+def _fake_request(path: str):
+    from starlette.requests import Request
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"host", b"bench.local")], "scheme": "http", "server": ("bench.local", 80),
+        "root_path": "", "app": None,
+    }
+    return Request(scope)
+
+
+def run_micro() -> dict:
+    from app.db import SessionLocal
+    from app.main import parse_money_to_float, render_trip_page
+    from app.services import (
+        build_settlement,
+        build_trip_page_view,
+        build_trip_view,
+        first_pages_query,
+        get_trip_aggregate,
+        group_items_by_day,
+        item_view,
+        meta_from_json,
+        settlement_queries,
+    )
+    from app.models import Trip, TripTotal
+    from sqlalchemy.orm import joinedload
+
+    results = {
+        "parse_money_to_float": bench(lambda: [parse_money_to_float(v) for v in MONEY_SAMPLES], number=20000),
+        "meta_from_json": bench(lambda: meta_from_json(META_SAMPLE), number=20000),
+    }
+
+    db = SessionLocal()
+    try:
+        for size, token in sorted(load_tokens().items(), key=lambda kv: int(kv[0])):
+            number = max(3, 3000 // int(size))
+            trip = get_trip_aggregate(db, token)
+            items = [item_view(it) for it in trip.items]
+            results[f"group_items_by_day[{size}]"] = bench(lambda: group_items_by_day(items), number=number * 10)
+            results[f"build_trip_view[{size}]"] = bench(lambda: build_trip_view(trip), number=number)
+
+            page_trip = db.query(Trip).options(joinedload(Trip.participants)).filter(Trip.token == token).first()
+            totals = db.query(TripTotal).filter(TripTotal.trip_id == page_trip.id).all()
+            first = db.execute(first_pages_query(page_trip.id)).scalars().all()
+            results[f"load_first_pages[{size}]"] = bench(
+                lambda: db.execute(first_pages_query(page_trip.id)).scalars().all(), number=number
+            )
+            view = build_trip_page_view(page_trip, totals, first)
+
+            # acerto de contas sem cache: só a montagem em Python (linhas já lidas)
+            rows = [db.execute(q) for q in settlement_queries(page_trip.id)]
+            people, expenses, shares = rows[0].scalars().all(), rows[1].all(), rows[2].all()
+            results[f"build_settlement[{size}]"] = bench(
+                lambda: build_settlement(view.trip, view.trip.revision, people, expenses, shares), number=number
+            )
+            settlement = build_settlement(view.trip, view.trip.revision, people, expenses, shares)
+
+            request = _fake_request(f"/t/{token}")
+            results[f"render_trip_onepage[{size}]"] = bench(
+                lambda: render_trip_page(request, view, settlement, "http://bench.local", None), number=number
+            )
+    finally:
+        db.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    use_bench_database(args.database_url)
+    results = run_micro()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in results.items():
+            print(f"{name:<32} {r['median_us']:>12.2f} µs  (mín {r['min_us']:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+"""
+Suíte completa: seed -> micro-benchmarks -> cenários HTTP, com baselines.
+
+    python bench/run.py                          # roda tudo e imprime
+    python bench/run.py --save sqlite-local      # grava bench/baselines/sqlite-local.json
+    python bench/run.py --compare sqlite-local   # compara; sai com 1 se piorou além do limite
+    python bench/run.py --skip-load --compare sqlite-local
+    python bench/run.py --database-url postgresql://localhost/trip_bench
+
+O servidor dos cenários é um uvicorn (1 worker) subido aqui, com o mesmo
+DATABASE_URL. Compare sempre na mesma máquina: os números absolutos só
+fazem sentido contra um baseline do mesmo ambiente.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    from common import BASELINE_DIR, ROOT, use_bench_database
+except ImportError:
+    from .common import BASELINE_DIR, ROOT, use_bench_database
+
+# métricas em que "maior é melhor"; o resto (tempos) é "menor é melhor"
+HIGHER_IS_BETTER = {"rps"}
+COMPARED_LOAD_KEYS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip()
+    except OSError:
+        return ""
+
+
+def _wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/health", timeout=2).json().get("db_ready"):
+                return
+        except Exception:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError("servidor de benchmark não ficou pronto")
+
+
+def run_load_scenarios(port: int, concurrency: int, duration: float) -> dict:
+    from scenarios import SCENARIOS, run_scenario
+
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=os.environ.copy(),
+    )
+    try:
+        _wait_ready(base_url)
+        results = {}
+        for name in SCENARIOS:
+            results[name] = asyncio.run(run_scenario(base_url, name, concurrency, duration))
+            print(f"{name}: {results[name]}", flush=True)
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=20)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Lista de (métrica, baseline, atual, variação) que pioraram além do limite."""
+    regressions = []
+
+    def check(name, old, new, higher_is_better):
+        if not old:
+            return
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = "PIOROU" if worse > threshold else ""
+        print(f"  {name:<42} {old:>12.2f} -> {new:>12.2f}  {change:+7.1%} {flag}")
+        if flag:
+            regressions.append((name, old, new, change))
+
+    for name, res in current.get("micro", {}).items():
+        old = baseline.get("micro", {}).get(name)
+        if old:
+            check(f"micro {name} (µs)", old["median_us"], res["median_us"], False)
+    for scenario, res in current.get("load", {}).items():
+        old = baseline.get("load", {}).get(scenario)
+        if not old:
+            continue
+        for key in COMPARED_LOAD_KEYS:
+            check(f"load {scenario} {key}", old[key], res[key], key in HIGHER_IS_BETTER)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--skip-seed", action="store_true", help="reusa bench/.seed.json")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--save", metavar="NOME", help="grava o resultado como baseline")
+    parser.add_argument("--compare", metavar="NOME", help="compara com um baseline gravado")
+    parser.add_argument("--threshold", type=float, default=0.15, help="piora tolerada (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    url = use_bench_database(args.database_url)
+    sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+    if not args.skip_seed:
+        if url.startswith("sqlite:///./bench/"):
+            # banco local de bench: recomeça do zero para a rodada ser reproduzível
+            path = os.path.join(ROOT, url[len("sqlite:///./"):])
+            if os.path.exists(path):
+                os.remove(path)
+        from seed import SEED_FILE, seed
+
+        with open(SEED_FILE, "w") as f:
+            json.dump(seed(args.sizes), f, indent=2)
+
+    result = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} cpus={os.cpu_count()}",
+            "database": url.split("://", 1)[0],
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+        }
+    }
+    if not args.skip_micro:
+        from micro import run_micro
+
+        result["micro"] = run_micro()
+        for name, r in result["micro"].items():
+            print(f"{name:<32} {r['median_us']:>12.2f} µs", flush=True)
+    if not args.skip_load:
+        result["load"] = run_load_scenarios(args.port, args.concurrency, args.duration)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"baseline gravado em {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        print(f"comparando com {args.compare} ({baseline['meta'].get('commit')}, {baseline['meta'].get('date')}):")
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} métrica(s) piorou(aram) mais de {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""
+Cenários de carga HTTP com mistura de requisições (pesos fixos, sorteio
+determinístico por worker) contra um servidor já rodando.
+
+    python bench/scenarios.py http://127.0.0.1:8000 --scenario view_heavy
+    python bench/scenarios.py http://127.0.0.1:8000 --scenario write_heavy --duration 20
+
+Usa as viagens de bench/.seed.json. O write_heavy cria e apaga itens na
+viagem de 100 itens e remove o que sobrou no fim.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+try:
+    from load import percentile
+    from seed import load_tokens
+except ImportError:
+    from .load import percentile
+    from .seed import load_tokens
+
+
+def _page(size):
+    return lambda c, t, st: c.get(f"/t/{t[size]}")
+
+
+def _api(size):
+    return lambda c, t, st: c.get(f"/api/t/{t[size]}")
+
+
+def _totals(size):
+    return lambda c, t, st: c.get(f"/api/t/{t[size]}/totals")
+
+
+def _section(size, category="activity"):
+    return lambda c, t, st: c.get(f"/t/{t[size]}/sections/{category}", params={"cursor": ""})
+
+
+async def _create_item(c, t, st):
+    n = st["rng"].randrange(1_000_000)
+    resp = await c.post(
+        f"/api/t/{t['100']}/items",
+        json={"category": "activity", "title": f"load {n}", "item_date": "2025-01-10", "cost": 12.5},
+    )
+    if resp.status_code == 201:
+        st["created"].append(resp.json()["item"]["id"])
+    return resp
+
+
+async def _delete_item(c, t, st):
+    if not st["created"]:
+        return await _create_item(c, t, st)
+    item_id = st["created"].pop(st["rng"].randrange(len(st["created"])))
+    return await c.delete(f"/api/t/{t['100']}/items/{item_id}")
+
+
+SCENARIOS = {
+    # leitura dominante: o caso comum (link compartilhado sendo aberto)
+    "view_heavy": [
+        (15, _page("10")),
+        (40, _page("100")),
+        (15, _page("1000")),
+        (10, _totals("100")),
+        (10, _api("100")),
+        (10, _section("1000")),
+    ],
+    # grupo editando ao mesmo tempo
+    "write_heavy": [
+        (35, _create_item),
+        (25, _delete_item),
+        (20, _totals("100")),
+        (20, _page("100")),
+    ],
+}
+
+
+async def _worker(client, tokens, mix, deadline, seed, latencies, errors, created):
+    rng = random.Random(seed)
+    state = {"rng": rng, "created": created}
+    ops = [op for _, op in mix]
+    weights = [w for w, _ in mix]
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            resp = await op(client, tokens, state)
+            if resp.status_code >= 400:
+                errors.append(resp.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run_scenario(base_url: str, scenario: str, concurrency: int = 20, duration: float = 15.0) -> dict:
+    tokens = load_tokens()
+    mix = SCENARIOS[scenario]
+    latencies, errors, created = [], [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            *[
+                _worker(client, tokens, mix, deadline, seed, latencies, errors, created)
+                for seed in range(concurrency)
+            ]
+        )
+        elapsed = time.perf_counter() - started
+        # deixa a viagem como estava para a próxima rodada
+        for item_id in created:
+            await client.delete(f"/api/t/{tokens['100']}/items/{item_id}")
+
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": len(errors),
+        "rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50) * 1000, 2),
+        "p95_ms": round(percentile(lat, 95) * 1000, 2),
+        "p99_ms": round(percentile(lat, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(lat) * 1000, 2) if lat else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base_url")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="view_heavy")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_scenario(args.base_url, args.scenario, args.concurrency, args.duration))
+    for k, v in result.items():
+        print(f"{k:>9}: {v}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""
+Popula o banco de benchmark com viagens sintéticas (determinísticas).
+
+    python bench/seed.py                       # 10/100/1000 itens em bench/bench.db
+    python bench/seed.py --sizes 50 5000
+    python bench/seed.py --database-url postgresql://localhost/trip_bench
+
+Grava os tokens em bench/.seed.json ({"10": "<token>", ...}), lido pelos
+outros scripts. Usa os services do app, então trip_totals fica consistente.
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+try:
+    from common import SEED_FILE, use_bench_database
+except ImportError:  # importado como bench.seed
+    from .common import SEED_FILE, use_bench_database
+
+CATEGORIES = ("activity", "flight", "hotel", "restaurant", "transport")
+TRIP_DAYS = 30
+
+
+def synthetic_item(rng: random.Random, n: int, start: date) -> dict:
+    category = CATEGORIES[n % len(CATEGORIES)]
+    meta = {"address": f"Rua {rng.randint(1, 999)}, Centro", "notes": "x" * rng.randint(0, 120)}
+    if category == "flight":
+        meta.update(time=f"{rng.randint(0, 23):02d}:{rng.choice(('00', '15', '30', '45'))}", company="Air Bench")
+    if category == "activity":
+        meta.update(period=rng.choice(("manhã", "tarde", "noite")), is_free=rng.random() < 0.2)
+    return {
+        "category": category,
+        "title": f"{category} {n}",
+        # ~10% sem data, como na vida real
+        "item_date": None if rng.random() < 0.1 else start + timedelta(days=rng.randrange(TRIP_DAYS)),
+        "cost": round(rng.uniform(10, 900), 2),
+        "url": "https://example.com/" + str(n),
+        "meta": meta,
+    }
+
+
+def seed(sizes, participants: int = 4) -> dict:
+    from app.db import unit_of_work
+    from app.migrations import run_migrations
+    from app.schemas import ItemCreate, ParticipantCreate, TripCreate
+    from app.services import add_participant, create_items_bulk, create_trip
+
+    run_migrations()
+    start = date(2025, 1, 1)
+    tokens = {}
+    for size in sizes:
+        rng = random.Random(size)  # mesmo tamanho -> mesmos dados
+        with unit_of_work() as db:  # uma transação por viagem
+            trip = create_trip(
+                db,
+                TripCreate(
+                    title=f"Bench {size}",
+                    destination="Benchville",
+                    start_date=start,
+                    end_date=start + timedelta(days=TRIP_DAYS - 1),
+                ),
+            )
+            people = [
+                add_participant(db, trip, ParticipantCreate(name=f"Pessoa {i}", email=f"p{i}@bench.local")).id
+                for i in range(participants)
+            ]
+            payloads = [ItemCreate(**synthetic_item(rng, n, start)) for n in range(size)]
+            # pagador/moeda com outro gerador: os itens continuam iguais aos de antes
+            extra = random.Random(-size)
+            for p in payloads:
+                p.paid_by = extra.choice(people)
+                p.currency = extra.choice(("BRL", "BRL", "BRL", "EUR", "USD"))
+            create_items_bulk(db, trip, payloads)
+            tokens[str(size)] = trip.token
+    return tokens
+
+
+def load_tokens() -> dict:
+    with open(SEED_FILE) as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args(argv)
+
+    url = use_bench_database(args.database_url)
+    tokens = seed(args.sizes)
+    with open(SEED_FILE, "w") as f:
+        json.dump(tokens, f, indent=2)
+    print(f"{len(tokens)} viagem(ns) em {url}: {tokens}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
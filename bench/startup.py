@@ -0,0 +1,101 @@
+"""
+Custo de subir o processo do app: tempo de import de app.main e memória (RSS).
+
+    python bench/startup.py                 # 5 rodadas, processo novo em cada
+    python bench/startup.py --top 15        # + os módulos mais lentos (-X importtime)
+    python bench/startup.py --limit-mb 400  # sai com 1 se o RSS passar do limite
+
+Roda a partir da raiz do repositório (o app monta app/static e app/templates
+com caminhos relativos). Use o mesmo .env/variáveis do deploy: DB_ASYNC=1 ou
+DATABASE_URL de Postgres mudam o que é importado.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main  # noqa: F401
+elapsed = time.perf_counter() - t0
+rss_kb = None
+try:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+except OSError:
+    pass
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    peak //= 1024  # macOS reporta em bytes
+print(json.dumps({"import_s": elapsed, "rss_kb": rss_kb or peak, "peak_rss_kb": peak}))
+"""
+
+
+def _run_probe() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True, text=True, check=True, env=os.environ.copy(),
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int):
+    """(módulo, ms cumulativos) dos `top` imports mais caros."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(cumulative_us) / 1000.0))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="lista os N imports mais lentos")
+    parser.add_argument("--limit-mb", type=float, default=None, help="falha se o RSS passar disso")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args(argv)
+
+    runs = [_run_probe() for _ in range(max(1, args.runs))]
+    import_ms = sorted(r["import_s"] * 1000 for r in runs)
+    rss_mb = max(r["rss_kb"] for r in runs) / 1024.0
+    result = {
+        "runs": len(runs),
+        "import_ms_median": round(statistics.median(import_ms), 1),
+        "import_ms_min": round(import_ms[0], 1),
+        "rss_mb": round(rss_mb, 1),
+        "peak_rss_mb": round(max(r["peak_rss_kb"] for r in runs) / 1024.0, 1),
+    }
+    if args.top:
+        result["slowest_imports_ms"] = [[name, round(ms, 1)] for name, ms in slowest_imports(args.top)]
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"runs:          {result['runs']}")
+        print(f"import app.main: {result['import_ms_median']} ms (mediana), {result['import_ms_min']} ms (mín)")
+        print(f"RSS após import: {result['rss_mb']} MB (pico {result['peak_rss_mb']} MB)")
+        for name, ms in result.get("slowest_imports_ms", []):
+            print(f"  {ms:9.1f} ms  {name}")
+
+    if args.limit_mb is not None and rss_mb > args.limit_mb:
+        print(f"RSS {rss_mb:.1f} MB acima do limite de {args.limit_mb} MB", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+Perfil multi-worker: gunicorn gerenciando workers uvicorn.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Cada worker é um processo com seu próprio pool de conexões (app/db.py).
+Com DB_MAX_CONNECTIONS definido, cada worker usa no máximo
+DB_MAX_CONNECTIONS // WEB_CONCURRENCY (pools sync/async + LISTEN), sem overflow.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# padrão conservador (plano free tem pouca RAM); suba via WEB_CONCURRENCY
+workers = int(os.getenv("WEB_CONCURRENCY") or min(2, multiprocessing.cpu_count()))
+os.environ.setdefault("WEB_CONCURRENCY", str(workers))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 20
+keepalive = 5
+
+# recicla workers de vez em quando (vazamentos lentos de memória)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = 100
+
+accesslog = "-"
+errorlog = "-"
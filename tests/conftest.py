@@ -0,0 +1,96 @@
+"""
+Os testes rodam contra um SQLite temporário: DATABASE_URL é definido aqui,
+antes de qualquer import do app (app.db lê o ambiente no import).
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="trip-planner-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ.setdefault("EVENTS_BACKEND", "off")
+
+from sqlalchemy import event  # noqa: E402
+
+from app.db import SessionLocal, engine, unit_of_work  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.schemas import ItemCreate, ParticipantCreate, TripCreate  # noqa: E402
+from app.services import add_participant, create_item, create_trip  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _schema():
+    run_migrations()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """TestClient sem o startup (o schema já existe): o gate do banco fica aberto."""
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    monkeypatch.setattr(main, "DB_OK", True)
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@contextmanager
+def count_statements(bind=engine):
+    """Lista com o SQL emitido dentro do bloco (listener before_cursor_execute)."""
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", _before)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", _before)
+
+
+@contextmanager
+def count_commits(bind=engine):
+    """Lista com um elemento por COMMIT dentro do bloco (evento commit do engine)."""
+    commits = []
+
+    def _commit(conn):
+        commits.append(conn)
+
+    event.listen(bind, "commit", _commit)
+    try:
+        yield commits
+    finally:
+        event.remove(bind, "commit", _commit)
+
+
+def make_trip(items=(), participants=(), currency="BRL") -> str:
+    """Cria uma viagem (commitada) e devolve o token."""
+    with unit_of_work() as db:
+        trip = create_trip(
+            db,
+            TripCreate(
+                title="Viagem", destination="Roma",
+                start_date=date(2025, 1, 1), end_date=date(2025, 1, 10), currency=currency,
+            ),
+        )
+        for name in participants:
+            add_participant(db, trip, ParticipantCreate(name=name))
+        for item in items:
+            create_item(db, trip, item if isinstance(item, ItemCreate) else ItemCreate(**item))
+        return trip.token
@@ -0,0 +1,113 @@
+"""
+API JSON (/api/t/...) e o caminho JSON do formulário de item (app.js):
+escrita devolve só o pedaço que mudou + totais; leitura com ETag/304.
+"""
+from .conftest import make_trip
+
+
+def test_api_trip_etag_and_304(client):
+    token = make_trip(items=[{"category": "hotel", "title": "Hotel", "cost": 100}], participants=["Ana"])
+
+    r = client.get(f"/api/t/{token}")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["trip"]["token"] == token
+    assert [it["title"] for it in body["items"]] == ["Hotel"]
+    assert [p["name"] for p in body["participants"]] == ["Ana"]
+    assert body["totals"]["display"]["total_all"] == "100.00"
+
+    etag = r.headers["etag"]
+    r = client.get(f"/api/t/{token}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+    assert r.content == b""
+
+
+def test_api_add_and_delete_item(client):
+    token = make_trip(participants=["Ana"])
+    ana = client.get(f"/api/t/{token}").json()["participants"][0]["id"]
+
+    r = client.post(
+        f"/api/t/{token}/items",
+        json={"category": "restaurant", "title": "Jantar", "cost": 80.5, "paid_by": ana, "shared_with": [ana]},
+    )
+    assert r.status_code == 201
+    body = r.json()
+    item = body["item"]
+    assert (item["title"], item["cost"], item["paid_by"]) == ("Jantar", 8050, ana)
+    assert body["totals"]["total_by_cat"]["restaurant"] == 8050
+    assert body["totals"]["count_by_cat"] == {"restaurant": 1}
+
+    r = client.delete(f"/api/t/{token}/items/{item['id']}")
+    assert r.status_code == 200
+    assert r.json()["deleted"] == item["id"]
+    assert r.json()["totals"]["total_all"] == 0
+
+    r = client.delete(f"/api/t/{token}/items/{item['id']}")
+    assert r.status_code == 404
+
+
+def test_api_add_item_with_foreign_payer_is_400(client):
+    token = make_trip(participants=["Ana"])
+    other = make_trip(participants=["Zé"])
+    foreign = client.get(f"/api/t/{other}").json()["participants"][0]["id"]
+
+    r = client.post(f"/api/t/{token}/items", json={"category": "hotel", "title": "Hotel", "cost": 10, "paid_by": foreign})
+    assert r.status_code == 400
+    assert "Participante" in r.json()["detail"]
+    assert client.get(f"/api/t/{token}").json()["items"] == []
+
+
+def test_api_join_and_remove_participant(client):
+    token = make_trip(items=[{"category": "hotel", "title": "Hotel", "cost": 100}])
+
+    r = client.post(f"/api/t/{token}/participants", json={"name": "Ana", "email": "ANA@x.com"})
+    assert r.status_code == 201
+    p = r.json()["participant"]
+    assert (p["name"], p["email"]) == ("Ana", "ana@x.com")
+    assert r.json()["totals"]["per_person"] == 10000
+
+    r = client.post(f"/api/t/{token}/participants", json={"name": "Bia"})
+    assert r.json()["totals"]["per_person"] == 5000
+
+    r = client.delete(f"/api/t/{token}/participants/{p['id']}")
+    assert r.status_code == 200
+    assert r.json() == {"deleted": p["id"], "totals": r.json()["totals"]}
+    assert r.json()["totals"]["per_person"] == 10000
+
+    assert client.delete(f"/api/t/{token}/participants/{p['id']}").status_code == 404
+
+
+def test_api_unknown_trip_is_404(client):
+    assert client.get("/api/t/nao-existe").status_code == 404
+    assert client.post("/api/t/nao-existe/items", json={"category": "hotel", "title": "x"}).status_code == 404
+
+
+def test_item_form_answers_json_to_app_js(client):
+    token = make_trip()
+    r = client.post(
+        f"/t/{token}/items",
+        data={"category": "hotel", "title": "Hotel", "checkin_date": "2025-01-03", "nights": "2", "daily_value": "150"},
+        headers={"Accept": "application/json"},
+    )
+    assert r.status_code == 201
+    body = r.json()
+    assert body["item"]["cost"] == 30000  # noites x diária, como no POST sem JS
+    assert 'data-date="2025-01-03"' in body["html"]
+    assert f'data-id="{body["item"]["id"]}"' in body["html"]
+    assert body["totals"]["display"]["by_cat"]["hotel"] == "300.00"
+
+    r = client.post(
+        f"/t/{token}/items",
+        data={"category": "hotel", "title": "Hotel", "checkin_date": "2030-01-01"},
+        headers={"Accept": "application/json"},
+    )
+    assert r.status_code == 400
+    assert "fora do período" in r.json()["detail"]
+
+
+def test_item_form_without_js_still_redirects(client):
+    token = make_trip()
+    r = client.post(f"/t/{token}/items", data={"category": "activity", "title": "Museu"}, follow_redirects=False)
+    assert r.status_code == 303
+    assert r.headers["location"] == f"/t/{token}"
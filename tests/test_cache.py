@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.cache import FileCacheBackend, HtmlCache, MemoryCacheBackend
+from app.db import unit_of_work
+from app.schemas import ItemCreate
+from app.services import create_item, get_trip_page_view, get_trip_ref, get_trip_revision, get_trip_view
+
+from .conftest import count_statements, make_trip
+
+
+class _ThreadRecordingBackend(MemoryCacheBackend):
+    blocking = True
+
+    def __init__(self):
+        super().__init__(max_bytes=1 << 20)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value):
+        self.threads.append(threading.get_ident())
+        super().set(key, value)
+
+
+def test_blocking_backends_run_off_the_event_loop():
+    backend = _ThreadRecordingBackend()
+    cache = HtmlCache(backend)
+
+    async def go():
+        loop_thread = threading.get_ident()
+        await cache.aset("k", b"html")
+        assert await cache.aget("k") == b"html"
+        return loop_thread
+
+    loop_thread = asyncio.run(go())
+    assert len(backend.threads) == 2
+    assert loop_thread not in backend.threads
+    assert cache.hits == 1
+
+
+def test_file_backend_is_blocking_and_memory_is_not(tmp_path):
+    assert FileCacheBackend(str(tmp_path), max_bytes=1 << 20).blocking
+    assert not MemoryCacheBackend(max_bytes=1 << 20).blocking
+
+
+# -------------------------
+# View model por (token, revisão)
+# -------------------------
+def _read_view(db, token, loader):
+    db.rollback()  # transação nova: enxerga o que outras já commitaram
+    with count_statements() as statements:
+        view = loader(db, token, get_trip_revision(db, token))
+    return view, len(statements)
+
+
+@pytest.mark.parametrize("loader", [get_trip_view, get_trip_page_view])
+def test_trip_view_cache_misses_after_a_write(db, loader):
+    token = make_trip(items=[{"category": "hotel", "title": "Hotel", "cost": 100}])
+
+    first, n_first = _read_view(db, token, loader)
+    again, n_again = _read_view(db, token, loader)
+    assert again is first
+    assert n_again == 1  # só a revisão
+    assert n_first > n_again
+
+    with unit_of_work() as w:
+        create_item(w, get_trip_ref(w, token), ItemCreate(category="hotel", title="Hostel", cost=50))
+
+    after, n_after = _read_view(db, token, loader)
+    assert after is not first
+    assert n_after == n_first
+    assert after.trip.revision == first.trip.revision + 1
+    assert after.total_all == 15000
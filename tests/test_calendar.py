@@ -0,0 +1,32 @@
+from datetime import date, datetime
+
+from app.calendar_export import build_trip_ics
+from app.services import ItemView, TripSnapshot
+
+
+def _trip():
+    return TripSnapshot(
+        id=1, token="abc", title="Roma", destination="Itália",
+        start_date=date(2025, 1, 1), end_date=date(2025, 1, 5), currency="BRL", revision=3,
+        created_at=datetime(2024, 12, 1, 8, 30),
+    )
+
+
+def test_ics_body_is_stable_for_the_same_revision():
+    items = [
+        ItemView(id=7, category="activity", title="Coliseu", item_date=date(2025, 1, 2), url=None,
+                 notes=None, cost=None, created_at=datetime(2024, 12, 2, 9, 0), meta={"time": "14:30"}),
+    ]
+    first = build_trip_ics(_trip(), items)
+    assert first == build_trip_ics(_trip(), items)
+    assert "DTSTAMP:20241201T083000Z\r\n" in first
+    assert "DTSTART:20250102T143000\r\n" in first
+
+
+def test_ics_folds_long_lines_at_75_octets():
+    items = [
+        ItemView(id=1, category="hotel", title="á" * 120, item_date=date(2025, 1, 2), url=None,
+                 notes=None, cost=None, created_at=datetime(2024, 12, 2), meta={}),
+    ]
+    for line in build_trip_ics(_trip(), items).split("\r\n"):
+        assert len(line.encode("utf-8")) <= 75
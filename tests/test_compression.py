@@ -0,0 +1,59 @@
+import asyncio
+import gzip
+import zlib
+
+from app.compression import STREAM_BUFFER_BYTES, CompressionMiddleware
+
+
+def _run(app, accept=b"gzip"):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept)]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    return sent
+
+
+def _streaming_app(chunks, ctype=b"text/calendar; charset=utf-8"):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", ctype)]})
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    return app
+
+
+def test_streamed_small_chunks_compress_like_one_shot():
+    lines = [f"BEGIN:VEVENT\r\nUID:item-{i}@trip-planner\r\nSUMMARY:Passeio {i}\r\nEND:VEVENT\r\n".encode()
+             for i in range(300)]
+    sent = _run(_streaming_app(lines))
+    bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+    wire = b"".join(bodies)
+
+    assert gzip.decompress(wire) == b"".join(lines)
+    one_shot = len(gzip.compress(b"".join(lines), 6))
+    assert len(wire) < one_shot * 1.5
+    # um flush por bloco de STREAM_BUFFER_BYTES, não por linha
+    assert len(bodies) <= len(b"".join(lines)) // STREAM_BUFFER_BYTES + 2
+
+
+def test_large_streams_are_still_sent_before_the_end():
+    chunk = b"x" * 4096
+    sent = _run(_streaming_app([chunk] * 16))
+    bodies = [m for m in sent if m["type"] == "http.response.body"]
+    assert any(m.get("more_body") for m in bodies)
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert d.decompress(b"".join(m["body"] for m in bodies)) == chunk * 16
+
+
+def test_event_stream_is_not_compressed():
+    sent = _run(_streaming_app([b"data: 1\n\n", b"data: 2\n\n"], ctype=b"text/event-stream"))
+    start = sent[0]
+    assert all(k != b"content-encoding" for k, _ in start["headers"])
+    assert [m["body"] for m in sent[1:3]] == [b"data: 1\n\n", b"data: 2\n\n"]
@@ -0,0 +1,17 @@
+from app.db import split_connection_budget
+
+
+def test_budget_is_split_between_workers_engines_and_listener():
+    # 20 no plano, 2 workers: 10 por worker, 1 do LISTEN, 9 entre sync e async
+    sync_size, async_size = split_connection_budget(20, 2, listen=1, async_pooled=True)
+    assert (sync_size, async_size) == (4, 5)
+    assert 2 * (sync_size + async_size + 1) <= 20
+
+
+def test_budget_without_async_engine_goes_to_the_sync_pool():
+    assert split_connection_budget(20, 2, listen=0, async_pooled=False) == (10, 0)
+    assert split_connection_budget(20, 4, listen=1, async_pooled=False) == (4, 0)
+
+
+def test_budget_never_drops_below_one_connection_per_pool():
+    assert split_connection_budget(2, 4, listen=1, async_pooled=True) == (1, 1)
@@ -0,0 +1,86 @@
+"""
+GET condicional da página da viagem: ETag por (viagem, revisão); 304 sem
+carregar nem renderizar; qualquer escrita sobe a revisão e muda o ETag.
+"""
+import pytest
+
+from app import main
+
+from .conftest import make_trip
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("não deveria carregar/renderizar num 304")
+
+
+def test_if_none_match_is_304_without_rendering(client, monkeypatch):
+    token = make_trip(items=[{"category": "hotel", "title": "Hotel", "cost": 100}])
+    etag = client.get(f"/t/{token}", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    assert not etag.startswith("W/")
+
+    monkeypatch.setattr(main, "read_trip_page_view", _fail)
+    monkeypatch.setattr(main, "render_trip_page", _fail)
+    r = client.get(f"/t/{token}", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+    assert r.headers["cache-control"] == main.TRIP_CACHE_CONTROL
+    assert r.content == b""
+
+
+def test_weak_etag_from_compression_still_matches(client):
+    token = make_trip(items=[{"category": "hotel", "title": f"Hotel {i}", "cost": 100} for i in range(5)])
+    r = client.get(f"/t/{token}", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    weak = r.headers["etag"]
+    assert weak.startswith('W/"')
+
+    r = client.get(f"/t/{token}", headers={"If-None-Match": weak, "Accept-Encoding": "gzip"})
+    assert r.status_code == 304
+    # lista com vários candidatos também vale
+    r = client.get(f"/t/{token}", headers={"If-None-Match": f'"outro", {weak}', "Accept-Encoding": "identity"})
+    assert r.status_code == 304
+
+
+def _add_item(client, token):
+    client.post(f"/api/t/{token}/items", json={"category": "activity", "title": "Museu", "cost": 20})
+
+
+def _delete_item(client, token):
+    item = client.get(f"/api/t/{token}").json()["items"][0]
+    client.delete(f"/api/t/{token}/items/{item['id']}")
+
+
+def _join(client, token):
+    client.post(f"/api/t/{token}/participants", json={"name": "Caio"})
+
+
+def _leave(client, token):
+    p = client.get(f"/api/t/{token}").json()["participants"][0]
+    client.delete(f"/api/t/{token}/participants/{p['id']}")
+
+
+def _edit_trip(client, token):
+    client.post(
+        f"/t/{token}/edit",
+        data={"title": "Outra", "destination": "Roma", "start_date": "2025-01-01", "end_date": "2025-01-10"},
+        follow_redirects=False,
+    )
+
+
+def _import(client, token):
+    client.post(f"/api/t/{token}/items/bulk", json=[{"category": "hotel", "title": "Hostel"}])
+
+
+@pytest.mark.parametrize("write", [_add_item, _delete_item, _join, _leave, _edit_trip, _import])
+def test_every_write_changes_the_etag(client, write):
+    token = make_trip(items=[{"category": "hotel", "title": "Hotel", "cost": 100}], participants=["Ana"])
+    headers = {"Accept-Encoding": "identity"}
+    before = client.get(f"/t/{token}", headers=headers).headers["etag"]
+    api_before = client.get(f"/api/t/{token}").headers["etag"]
+
+    write(client, token)
+
+    r = client.get(f"/t/{token}", headers={**headers, "If-None-Match": before})
+    assert r.status_code == 200
+    assert r.headers["etag"] != before
+    assert client.get(f"/api/t/{token}", headers={"If-None-Match": api_before}).status_code == 200
@@ -0,0 +1,110 @@
+"""
+Importação em lote (JSON e CSV): erros por linha com o número da linha,
+válidas numa transação só, limite de MAX_IMPORT_ROWS.
+"""
+import pytest
+
+from app import main
+from app.schemas import ItemCreate
+from app.services import create_items_bulk, get_trip_aggregate, get_trip_ref
+
+from .conftest import count_commits, count_statements, make_trip
+
+
+def _titles(db, token):
+    db.expire_all()
+    return sorted(it.title for it in get_trip_aggregate(db, token).items)
+
+
+def test_bulk_reports_row_errors_and_keeps_valid_rows(client, db):
+    token = make_trip()
+    rows = [
+        {"category": "hotel", "title": "Hotel", "cost": "1.200,50", "item_date": "2025-01-02"},
+        {"category": "spaceship", "title": "Nave"},
+        {"category": "activity", "title": "Coliseu", "item_date": "2030-01-01"},
+        "não é objeto",
+        {"category": "activity", "title": "Vaticano", "cost": 30, "currency": "EUR"},
+        {"category": "activity", "title": "Museu", "cost": "abc"},
+    ]
+    r = client.post(f"/api/t/{token}/items/bulk", json=rows)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["created"] == 2
+    assert [e["row"] for e in body["errors"]] == [2, 3, 4, 6]
+    assert "category" in body["errors"][0]["error"]
+    assert "fora do período" in body["errors"][1]["error"]
+    assert body["totals"]["count_by_cat"] == {"hotel": 1, "activity": 1}
+    assert body["totals"]["by_currency"] == {"BRL": 120050, "EUR": 3000}
+    assert _titles(db, token) == ["Hotel", "Vaticano"]
+
+
+def test_bulk_valid_rows_go_in_one_transaction(client):
+    token = make_trip()
+    rows = [{"category": "activity", "title": f"Passeio {i}", "cost": i} for i in range(50)]
+    with count_commits() as commits, count_statements() as statements:
+        r = client.post(f"/api/t/{token}/items/bulk", json=rows)
+    assert r.json()["created"] == 50
+    assert len(commits) == 1
+    # totais: um upsert por (categoria, moeda), não por linha
+    assert len([s for s in statements if s.startswith("INSERT INTO trip_totals")]) == 1
+    # índice de busca num executemany só
+    assert len([s for s in statements if s.startswith("INSERT INTO trip_item_fts")]) == 1
+
+
+def test_bulk_is_all_or_nothing(db):
+    token = make_trip(participants=["Ana"])
+    other = get_trip_ref(db, make_trip(participants=["Zé"]))
+    foreign = get_trip_aggregate(db, other.token).participants[0].id
+    trip = get_trip_ref(db, token)
+    payloads = [
+        ItemCreate(category="hotel", title="Hotel"),
+        ItemCreate(category="hotel", title="Hostel", paid_by=foreign),
+    ]
+    with pytest.raises(ValueError):
+        create_items_bulk(db, trip, payloads)
+    db.rollback()
+    assert _titles(db, token) == []
+
+
+def test_bulk_row_cap(client, monkeypatch):
+    monkeypatch.setattr(main, "MAX_IMPORT_ROWS", 3)
+    token = make_trip()
+    rows = [{"category": "activity", "title": f"Passeio {i}"} for i in range(4)]
+    r = client.post(f"/api/t/{token}/items/bulk", json=rows)
+    assert r.status_code == 413
+    assert client.get(f"/api/t/{token}").json()["items"] == []
+
+    r = client.post(f"/api/t/{token}/items/bulk", json=rows[:3])
+    assert r.json()["created"] == 3
+
+
+def test_csv_import(client, db):
+    token = make_trip()
+    csv_text = (
+        "category;title;item_date;cost;address;is_free\n"
+        "hotel;Hotel Centrale;2025-01-02;300,00;Via Roma 7;\n"
+        "activity;;2025-01-03;;;\n"
+        "activity;Coliseu;2025-01-03;25;;sim\n"
+    )
+    r = client.post(
+        f"/api/t/{token}/items/import",
+        files={"file": ("itens.csv", csv_text.encode("utf-8-sig"), "text/csv")},
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert body["created"] == 2
+    assert [e["row"] for e in body["errors"]] == [2]
+    trip = get_trip_aggregate(db, token)
+    by_title = {it.title: it for it in trip.items}
+    assert by_title["Hotel Centrale"].cost == 30000
+    assert by_title["Hotel Centrale"].meta["address"] == "Via Roma 7"
+    assert by_title["Coliseu"].cost is None  # gratuito
+
+
+def test_csv_must_be_utf8(client):
+    token = make_trip()
+    r = client.post(
+        f"/api/t/{token}/items/import",
+        files={"file": ("itens.csv", "category,title\nhotel,Hôtel\n".encode("latin-1"), "text/csv")},
+    )
+    assert r.status_code == 400
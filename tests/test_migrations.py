@@ -0,0 +1,113 @@
+"""
+Migrações: banco novo vai direto para a última versão; banco no schema
+original (antes das migrações) sobe passo a passo sem perder dados.
+"""
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import engine
+from app.migrations import LATEST_VERSION, MIGRATIONS, get_schema_version, m011_fts_rowid_is_item_id, run_migrations
+from app.search import search_query
+from app.services import check_trip_totals
+
+# schema da primeira versão do app (models.py do commit inicial)
+BASELINE_DDL = [
+    """CREATE TABLE trips (
+        id INTEGER PRIMARY KEY, token VARCHAR(64) NOT NULL UNIQUE,
+        title VARCHAR(200) NOT NULL, destination VARCHAR(200) NOT NULL,
+        start_date DATE NOT NULL, end_date DATE NOT NULL, currency VARCHAR(8) NOT NULL,
+        created_at DATETIME NOT NULL)""",
+    """CREATE TABLE trip_items (
+        id INTEGER PRIMARY KEY, trip_id INTEGER NOT NULL REFERENCES trips(id),
+        category VARCHAR(50) NOT NULL, title VARCHAR(200) NOT NULL, item_date DATE,
+        url TEXT, notes TEXT, cost INTEGER, meta_json TEXT, created_at DATETIME NOT NULL)""",
+    """CREATE TABLE trip_participants (
+        id INTEGER PRIMARY KEY, trip_id INTEGER NOT NULL REFERENCES trips(id),
+        name VARCHAR(120) NOT NULL, email VARCHAR(200), created_at DATETIME NOT NULL)""",
+]
+
+
+def _baseline_db(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with eng.begin() as conn:
+        for ddl in BASELINE_DDL:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO trips VALUES (1, 'tok', 'Roma', 'Roma', '2025-01-01', '2025-01-05', 'EUR',"
+            " '2024-12-01 10:00:00')"
+        ))
+        conn.execute(text(
+            "INSERT INTO trip_participants VALUES (1, 1, 'Ana', NULL, '2024-12-01 10:00:00'),"
+            " (2, 1, 'Bia', NULL, '2024-12-01 10:00:00')"
+        ))
+        conn.execute(text(
+            "INSERT INTO trip_items VALUES"
+            " (1, 1, 'hotel', 'Hotel Centrale', '2025-01-01', NULL, NULL, 30000,"
+            "  '{\"address\": \"Via Cavour 1\"}', '2024-12-01 10:00:00'),"
+            " (2, 1, 'activity', 'Coliseu', '2025-01-02', NULL, NULL, 2500, NULL, '2024-12-01 10:00:00'),"
+            " (3, 1, 'activity', 'Vaticano', NULL, NULL, NULL, NULL, '{}', '2024-12-01 10:00:00')"
+        ))
+    return eng
+
+
+def _migrate(eng):
+    with eng.begin() as conn:
+        for _, migrate in MIGRATIONS:
+            migrate(conn)
+
+
+def test_fresh_database_is_at_latest_version():
+    assert run_migrations() == LATEST_VERSION
+    with engine.connect() as conn:
+        assert get_schema_version(conn) == LATEST_VERSION
+
+
+def test_upgrade_from_baseline_keeps_data(tmp_path):
+    eng = _baseline_db(tmp_path)
+    _migrate(eng)
+
+    with eng.connect() as conn:
+        cols = {c["name"] for c in inspect(conn).get_columns("trip_items")}
+        assert {"meta", "currency", "paid_by_id"} <= cols
+        assert conn.execute(text("SELECT revision, participant_count FROM trips")).one() == (1, 2)
+        # meta_json copiado para a coluna JSON; moeda herdada da viagem
+        rows = conn.execute(text("SELECT id, json_extract(meta, '$.address'), currency FROM trip_items ORDER BY id")).all()
+        assert rows == [(1, "Via Cavour 1", "EUR"), (2, None, "EUR"), (3, None, "EUR")]
+        assert check_trip_totals(conn) == []
+        totals = dict(conn.execute(text("SELECT category, cost_cents FROM trip_totals")).all())
+        assert totals == {"hotel": 30000, "activity": 2500}
+        # índice de busca preenchido com os itens antigos (endereço do meta)
+        assert [r[0] for r in conn.execute(*search_query("sqlite", 1, "cavour"))] == [1]
+        indexes = {r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert "ix_trip_items_trip_cat_date_created" in indexes
+        assert "ix_trip_items_trip_id_meta_time" not in indexes
+
+
+def test_migrations_are_idempotent(tmp_path):
+    eng = _baseline_db(tmp_path)
+    _migrate(eng)
+    _migrate(eng)
+    with eng.connect() as conn:
+        assert check_trip_totals(conn) == []
+        assert conn.execute(text("SELECT COUNT(*) FROM trip_item_fts")).scalar() == 3
+
+
+def test_fts_index_is_keyed_by_item_id(tmp_path):
+    eng = _baseline_db(tmp_path)
+    _migrate(eng)
+    with eng.begin() as conn:
+        # índice no formato da migração 9 (item_id UNINDEXED, rowid próprio)
+        conn.execute(text("DROP TABLE trip_item_fts"))
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE trip_item_fts USING fts5(title, place, notes, item_id UNINDEXED, trip_id UNINDEXED)"
+        ))
+        conn.execute(text(
+            "INSERT INTO trip_item_fts (title, place, notes, item_id, trip_id)"
+            " SELECT title, '', '', id, trip_id FROM trip_items ORDER BY id DESC"
+        ))
+        m011_fts_rowid_is_item_id(conn)
+
+    with eng.connect() as conn:
+        rows = conn.execute(text("SELECT rowid, title FROM trip_item_fts ORDER BY rowid")).all()
+        assert rows == [(1, "Hotel Centrale"), (2, "Coliseu"), (3, "Vaticano")]
+        assert "item_id" not in conn.execute(text("SELECT * FROM trip_item_fts LIMIT 0")).keys()
+        assert [r[0] for r in conn.execute(*search_query("sqlite", 1, "vaticano"))] == [3]
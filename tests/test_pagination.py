@@ -0,0 +1,71 @@
+"""
+Paginação das seções por keyset: percorrer as páginas pelo cursor devolve
+todos os itens uma vez só, na mesma ordem do ORDER BY completo.
+"""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models import Trip, TripItem
+from app.services import (
+    PAGE_ITEMS,
+    decode_item_cursor,
+    get_section_page,
+    get_trip_page_view,
+    section_page_query,
+)
+
+from .conftest import count_statements, make_trip
+
+
+def _walk_section(db, trip_id, category, first_days, cursor):
+    ids = [it.id for _, items in first_days for it in items]
+    while cursor:
+        days, cursor = get_section_page(db, trip_id, category, cursor)
+        ids += [it.id for _, items in days for it in items]
+    return ids
+
+
+@pytest.fixture
+def paged_trip(db):
+    count = PAGE_ITEMS * 2 + 3
+    items = [
+        # datas repetidas e algumas sem data (vão para o fim)
+        {"category": "activity", "title": f"A{i}", "item_date": None if i % 7 == 0 else date(2025, 1, 1 + i % 3)}
+        for i in range(count)
+    ]
+    token = make_trip(items=items)
+    trip_id = db.execute(select(Trip.id).where(Trip.token == token)).scalar_one()
+    # mesmo created_at em todos: o desempate fica só no id
+    db.execute(update(TripItem).where(TripItem.trip_id == trip_id).values(created_at=datetime(2025, 1, 1)))
+    db.commit()
+    return token, trip_id, count
+
+
+def test_cursor_walk_returns_every_item_once_in_order(db, paged_trip):
+    token, trip_id, count = paged_trip
+    view = get_trip_page_view(db, token, revision=-1)  # revisão que nunca está no cache
+
+    ids = _walk_section(db, trip_id, "activity", view.days_by_cat["activity"], view.next_cursor_by_cat["activity"])
+
+    rows = db.execute(select(TripItem.id, TripItem.item_date).where(TripItem.trip_id == trip_id)).all()
+    expected = [r.id for r in sorted(rows, key=lambda r: (r.item_date is None, r.item_date or date.min, r.id))]
+    assert len(ids) == count
+    assert ids == expected
+
+
+def test_page_view_uses_three_statements(db, paged_trip):
+    token, _, _ = paged_trip
+    with count_statements() as statements:
+        get_trip_page_view(db, token, revision=-2)
+    assert len(statements) == 3, statements
+
+
+def test_cursor_round_trip_and_invalid_cursor():
+    assert decode_item_cursor("2025-01-02_2025-01-01T10:00:00_42") == (
+        date(2025, 1, 2), datetime(2025, 1, 1, 10, 0), 42
+    )
+    assert decode_item_cursor("-_2025-01-01T10:00:00_7")[0] is None
+    with pytest.raises(ValueError):
+        section_page_query(1, "activity", "lixo")
@@ -0,0 +1,163 @@
+"""
+Orçamento de SQL dos carregamentos quentes: se alguém trocar um eager load
+por lazy load (ou acrescentar um), o número de statements muda e o teste cai.
+Mais abaixo, os totais por moeda (trip_totals + câmbio).
+"""
+from datetime import date
+from urllib.parse import unquote
+
+import pytest
+
+from app.fx import rate_table
+from app.models import TripTotal
+from app.schemas import ItemCreate, TripCreate
+from app.services import (
+    build_trip_view,
+    create_item,
+    create_trip,
+    get_trip_aggregate,
+    get_trip_by_token,
+    get_trip_totals,
+)
+
+from .conftest import count_statements, make_trip
+
+
+def _items(n):
+    return [
+        {"category": "activity", "title": f"Passeio {i}", "item_date": date(2025, 1, 1 + i % 5), "cost": 10}
+        for i in range(n)
+    ]
+
+
+def test_get_trip_aggregate_uses_two_statements(db):
+    token = make_trip(items=_items(12), participants=["Ana", "Bia", "Caio"])
+
+    with count_statements() as statements:
+        trip = get_trip_aggregate(db, token)
+        # viagem + participantes (joined) e itens (selectin): nada de lazy load depois
+        assert len(trip.participants) == 3
+        assert len(trip.items) == 12
+        build_trip_view(trip)
+
+    assert len(statements) == 2, statements
+
+
+def test_get_trip_aggregate_budget_does_not_grow_with_items(db):
+    small = make_trip(items=_items(1), participants=["Ana"])
+    large = make_trip(items=_items(60), participants=["Ana", "Bia"])
+
+    counts = []
+    for token in (small, large):
+        with count_statements() as statements:
+            build_trip_view(get_trip_aggregate(db, token))
+        counts.append(len(statements))
+    assert counts == [2, 2]
+
+
+def test_get_trip_aggregate_unknown_token(db):
+    with count_statements() as statements:
+        assert get_trip_aggregate(db, "nao-existe") is None
+    assert len(statements) == 1
+
+
+# -------------------------
+# Totais por moeda (trip_totals)
+# -------------------------
+def test_trip_totals_keep_one_row_per_currency(db):
+    token = make_trip(
+        items=[
+            {"category": "hotel", "title": "Hotel", "cost": 100},
+            {"category": "hotel", "title": "Hostel", "cost": 50, "currency": "eur"},
+            {"category": "hotel", "title": "Pousada", "cost": 10, "currency": "EUR"},
+        ],
+    )
+    trip = get_trip_by_token(db, token)
+
+    rows = db.query(TripTotal).filter(TripTotal.trip_id == trip.id).order_by(TripTotal.currency).all()
+    assert [(r.category, r.currency, r.item_count, r.cost_cents) for r in rows] == [
+        ("hotel", "BRL", 1, 10000),
+        ("hotel", "EUR", 2, 6000),
+    ]
+
+
+def test_trip_totals_convert_into_trip_currency(db):
+    token = make_trip(
+        items=[
+            {"category": "hotel", "title": "Hotel", "cost": 100},
+            {"category": "flight", "title": "Voo", "cost": 200, "currency": "USD"},
+        ],
+        participants=["Ana", "Bia"],
+    )
+    totals = get_trip_totals(db, get_trip_by_token(db, token))
+
+    usd = rate_table().convert(20000, "USD", "BRL")
+    assert totals["total_by_cat"]["hotel"] == 10000
+    assert totals["total_by_cat"]["flight"] == usd
+    assert totals["total_all"] == 10000 + usd
+    assert totals["by_currency"] == {"BRL": 10000, "USD": 20000}
+    assert totals["unconverted"] == {}
+    # o view model da página completa chega no mesmo total
+    assert build_trip_view(get_trip_aggregate(db, token)).total_all == totals["total_all"]
+
+
+def test_item_with_unknown_currency_is_rejected(db):
+    token = make_trip()
+    trip = get_trip_by_token(db, token)
+    with pytest.raises(ValueError, match="Moeda sem taxa de câmbio: XYZ"):
+        create_item(db, trip, ItemCreate(category="hotel", title="Hotel", cost=10, currency="XYZ"))
+    db.rollback()
+
+
+def test_api_item_with_unknown_currency_is_400(client):
+    token = make_trip()
+    r = client.post(f"/api/t/{token}/items", json={"category": "hotel", "title": "Hotel", "cost": 10, "currency": "XYZ"})
+    assert r.status_code == 400
+    assert "XYZ" in r.json()["detail"]
+
+
+def test_form_item_with_unknown_currency_shows_the_reason(client):
+    token = make_trip()
+    r = client.post(
+        f"/t/{token}/items", data={"category": "hotel", "title": "Hotel", "currency": "XYZ"}, follow_redirects=False
+    )
+    assert r.status_code == 303
+    assert "Moeda sem taxa" in unquote(r.headers["location"])
+
+
+@pytest.mark.parametrize("code", ["EURO", "US$", "XYZ"])
+def test_trip_currency_must_have_a_rate(db, code):
+    with pytest.raises(ValueError):
+        create_trip(
+            db, TripCreate(title="Viagem", destination="Roma", start_date=date(2025, 1, 1), end_date=date(2025, 1, 2), currency=code)
+        )
+    db.rollback()
+
+
+def test_trip_currency_is_checked_by_the_forms(client, db):
+    r = client.post(
+        "/t/new",
+        data={"title": "Viagem", "destination": "Roma", "start_date": "2025-01-01", "end_date": "2025-01-02", "currency": "EURO"},
+        follow_redirects=False,
+    )
+    assert r.status_code == 400
+
+    token = make_trip()
+    r = client.post(
+        f"/t/{token}/edit",
+        data={"title": "Viagem", "destination": "Roma", "start_date": "2025-01-01", "end_date": "2025-01-10", "currency": "US$"},
+        follow_redirects=False,
+    )
+    assert "Moeda inv" in unquote(r.headers["location"])
+    assert get_trip_by_token(db, token).currency == "BRL"
+
+
+def test_page_lists_currencies_before_the_rate_date(client):
+    token = make_trip(
+        items=[
+            {"category": "hotel", "title": "Hotel", "cost": 100},
+            {"category": "hotel", "title": "Hostel", "cost": 50, "currency": "EUR"},
+        ],
+    )
+    html = client.get(f"/t/{token}").text
+    assert f"EUR 50.00 · câmbio de {rate_table().date}" in html
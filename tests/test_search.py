@@ -0,0 +1,51 @@
+from sqlalchemy import text
+
+from app.services import delete_item, get_trip_ref, search_trip_items
+
+from .conftest import count_statements, make_trip
+
+
+def _trip(db):
+    token = make_trip(items=[
+        {"category": "hotel", "title": "Hotel Centrale", "meta": {"address": "Via Roma 7", "company": "Booking"}},
+        {"category": "activity", "title": "Coliseu", "meta": {"notes": "comprar ingresso antecipado, levar água"}},
+        {"category": "restaurant", "title": "Trattoria da Roma", "notes": "massa fresca"},
+    ])
+    return get_trip_ref(db, token)
+
+
+def test_search_ranks_title_matches_first_and_ignores_accents(db):
+    trip = _trip(db)
+    # título pesa mais que endereço
+    assert [h.item.title for h in search_trip_items(db, trip, "roma").hits] == ["Trattoria da Roma", "Hotel Centrale"]
+    assert [h.item.title for h in search_trip_items(db, trip, "AGUA ingres").hits] == ["Coliseu"]
+    assert [h.item.title for h in search_trip_items(db, trip, "booking").hits] == ["Hotel Centrale"]
+    assert search_trip_items(db, trip, '" OR * NEAR(').hits == []
+
+
+def test_search_is_a_read(db):
+    trip = _trip(db)
+    search_trip_items(db, trip, "roma")
+    assert not db.info.get("has_writes")
+
+
+def test_deleted_items_leave_the_index(db):
+    trip = _trip(db)
+    hit = search_trip_items(db, trip, "coliseu").hits[0]
+    assert delete_item(db, trip, hit.item.id)
+    db.commit()
+    assert search_trip_items(db, trip, "coliseu").hits == []
+
+
+def test_index_rowid_is_the_item_id(db):
+    trip = _trip(db)
+    hit = search_trip_items(db, trip, "trattoria").hits[0]
+    row = db.execute(text("SELECT rowid FROM trip_item_fts WHERE rowid = :id"), {"id": hit.item.id}).first()
+    assert row == (hit.item.id,)
+
+    # apagar sai do índice pela chave, sem filtro em coluna UNINDEXED
+    with count_statements() as statements:
+        delete_item(db, trip, hit.item.id)
+    fts = [s for s in statements if "trip_item_fts" in s]
+    assert fts == ["DELETE FROM trip_item_fts WHERE rowid = ?"]
+    db.rollback()
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Trip, TripItemShare, TripParticipant
+from app.schemas import ItemCreate
+from app.services import create_items_bulk, get_trip_ref, get_trip_settlement
+from app.settlement import compute_balances, settle_expenses, settle_up, split_cents
+
+from .conftest import make_trip
+
+
+def _naive_balances(people, expenses, shares):
+    paid = {p: 0 for p in people}
+    owed = {p: 0 for p in people}
+    everyone = sorted(people)
+    for item_id, payer, cost in expenses:
+        sharers = sorted(p for p in shares.get(item_id, ()) if p in paid) or everyone
+        paid[payer] += cost
+        for pid, part in split_cents(cost, sharers, item_id % len(sharers)).items():
+            owed[pid] += part
+    return paid, owed
+
+
+def test_split_cents_rotates_the_leftover():
+    assert split_cents(100, [1, 2, 3]) == {1: 34, 2: 33, 3: 33}
+    assert split_cents(100, [1, 2, 3], offset=2) == {1: 33, 2: 33, 3: 34}
+    assert sum(split_cents(10_001, [1, 2, 3, 4, 5, 6, 7], offset=5).values()) == 10_001
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_compute_balances_matches_item_by_item_split(seed):
+    rng = random.Random(seed)
+    people = list(range(1, rng.randint(2, 12)))
+    expenses = [(item_id, rng.choice(people), rng.randint(1, 50_000)) for item_id in range(1, 300)]
+    shares = {
+        item_id: rng.sample(people, rng.randint(1, len(people)))
+        for item_id, _, _ in expenses
+        if rng.random() < 0.5
+    }
+    assert compute_balances(people, expenses, shares) == _naive_balances(people, expenses, shares)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_settle_up_zeroes_every_balance_with_at_most_n_minus_1_transfers(seed):
+    rng = random.Random(seed)
+    people = list(range(1, 15))
+    expenses = [(i, rng.choice(people), rng.randint(1, 90_000)) for i in range(200)]
+    _, _, balances, transfers = settle_expenses(people, expenses, {})
+
+    assert sum(balances.values()) == 0
+    left = dict(balances)
+    for t in transfers:
+        assert t.amount > 0
+        left[t.from_id] += t.amount
+        left[t.to_id] -= t.amount
+    assert all(v == 0 for v in left.values())
+    assert len(transfers) <= len(people) - 1
+
+
+def test_settle_up_pairs_exact_opposites_first():
+    transfers = settle_up({1: 500, 2: -500, 3: 300, 4: -200, 5: -100})
+    assert transfers[0].from_id == 2 and transfers[0].to_id == 1 and transfers[0].amount == 500
+    assert len(transfers) == 3
+
+
+def test_bulk_create_keeps_shared_with(db):
+    token = make_trip(participants=["Ana", "Bia", "Caio"])
+    trip_id = db.execute(select(Trip.id).where(Trip.token == token)).scalar_one()
+    ana, bia, caio = db.execute(
+        select(TripParticipant.id).where(TripParticipant.trip_id == trip_id).order_by(TripParticipant.id)
+    ).scalars()
+
+    trip = get_trip_ref(db, token)
+    create_items_bulk(db, trip, [
+        ItemCreate(category="restaurant", title="Jantar", cost=90, paid_by=ana, shared_with=[ana, bia]),
+        ItemCreate(category="activity", title="Museu", cost=30, paid_by=caio),
+    ])
+    db.commit()
+
+    shares = db.execute(select(TripItemShare.participant_id).where(TripItemShare.trip_id == trip_id)).scalars()
+    assert sorted(shares) == sorted([ana, bia])
+    view = get_trip_settlement(db, trip, revision=-1)
+    owed = {b.participant.id: b.owed for b in view.balances}
+    # jantar só entre Ana e Bia; museu entre os três
+    assert owed == {ana: 4500 + 1000, bia: 4500 + 1000, caio: 1000}
+
+
+def test_bulk_create_rejects_unknown_sharers(db):
+    token = make_trip(participants=["Ana"])
+    trip = get_trip_ref(db, token)
+    with pytest.raises(ValueError):
+        create_items_bulk(db, trip, [ItemCreate(category="activity", title="X", cost=1, shared_with=[999_999])])
+    db.rollback()
@@ -0,0 +1,33 @@
+import importlib
+import warnings
+
+import app.templating
+
+
+def test_templates_env_has_no_deprecated_options():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        module = importlib.reload(app.templating)
+    env = module.templates.env
+    assert env.autoescape is True
+    assert env.trim_blocks and env.lstrip_blocks
+    assert env.from_string("{{ x }}").render(x="<b>") == "&lt;b&gt;"
+
+
+def test_minify_keeps_pre_blocks():
+    html = "<div>\n    <p>a</p>\n\n<!-- x -->\n<pre>  keep\n    me</pre>\n</div>"
+    out = app.templating.minify_html(html)
+    assert "<pre>  keep\n    me</pre>" in out
+    assert "<!--" not in out and "\n    <p>" not in out
+
+
+def test_templates_fingerprint_covers_partials(tmp_path, monkeypatch):
+    (tmp_path / "partials").mkdir()
+    (tmp_path / "base.html").write_text("base")
+    partial = tmp_path / "partials" / "days_activity.html"
+    partial.write_text("v1")
+    monkeypatch.setattr(app.templating, "TEMPLATE_DIR", str(tmp_path))
+
+    before = app.templating.templates_fingerprint()
+    partial.write_text("v2")
+    assert app.templating.templates_fingerprint() != before
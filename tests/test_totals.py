@@ -0,0 +1,109 @@
+"""
+trip_totals (e trips.participant_count) são mantidos incrementalmente por
+cada escrita; check_trip_totals compara com o recálculo a partir dos itens.
+Depois de cada operação: nenhuma divergência.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.db import engine, unit_of_work
+from app.schemas import ItemCreate, ParticipantCreate
+from app.services import (
+    add_participant,
+    check_trip_totals,
+    create_item,
+    create_items_bulk,
+    delete_item,
+    get_trip_ref,
+    rebuild_trip_totals,
+    remove_participant,
+)
+
+from .conftest import make_trip
+
+
+def _drift(trip_id):
+    with engine.connect() as conn:
+        return [p for p in check_trip_totals(conn) if p["trip_id"] == trip_id]
+
+
+@pytest.fixture
+def trip(db):
+    return get_trip_ref(db, make_trip())
+
+
+def test_totals_stay_in_sync_after_every_write(trip):
+    assert _drift(trip.id) == []
+
+    with unit_of_work() as db:
+        create_item(db, trip, ItemCreate(category="hotel", title="Hotel", cost=300))
+        create_item(db, trip, ItemCreate(category="hotel", title="Sem valor"))
+        create_item(db, trip, ItemCreate(category="hotel", title="Hostel", cost=40, currency="EUR"))
+    assert _drift(trip.id) == []
+
+    with unit_of_work() as db:
+        create_items_bulk(
+            db,
+            trip,
+            [ItemCreate(category="activity", title=f"Passeio {i}", cost=10 * i, currency="USD" if i % 2 else None)
+             for i in range(7)],
+        )
+    assert _drift(trip.id) == []
+
+    with unit_of_work() as db:
+        ana = add_participant(db, trip, ParticipantCreate(name="Ana", email="ana@x.com"))
+        add_participant(db, trip, ParticipantCreate(name="Bia"))
+        add_participant(db, trip, ParticipantCreate(name="Ana Maria", email="ANA@x.com"))  # mesmo e-mail: atualiza
+        ana_id = ana.id
+    assert _drift(trip.id) == []
+
+    with unit_of_work() as db:
+        paid = create_item(db, trip, ItemCreate(category="flight", title="Voo", cost=900, paid_by=ana_id))
+        paid_id = paid.id
+    with unit_of_work() as db:
+        assert remove_participant(db, trip, ana_id)
+        assert not remove_participant(db, trip, ana_id)
+    assert _drift(trip.id) == []
+
+    with unit_of_work() as db:
+        item_ids = [r[0] for r in db.execute(text("SELECT id FROM trip_items WHERE trip_id = :t"), {"t": trip.id})]
+        for item_id in item_ids[::2]:
+            assert delete_item(db, trip, item_id)
+        assert not delete_item(db, trip, item_ids[0])
+    assert _drift(trip.id) == []
+
+    with unit_of_work() as db:
+        for item_id in item_ids[1::2]:
+            delete_item(db, trip, item_id)
+    assert paid_id in item_ids
+    assert _drift(trip.id) == []
+    with engine.connect() as conn:
+        left = conn.execute(
+            text("SELECT SUM(item_count), SUM(cost_cents) FROM trip_totals WHERE trip_id = :t"), {"t": trip.id}
+        ).one()
+    assert left == (0, 0)
+
+
+def test_rolled_back_write_leaves_totals_alone(trip):
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as db:
+            create_item(db, trip, ItemCreate(category="hotel", title="Hotel", cost=300))
+            raise RuntimeError("falhou depois de escrever")
+    assert _drift(trip.id) == []
+
+
+def test_check_reports_drift_and_rebuild_fixes_it(trip):
+    with unit_of_work() as db:
+        create_item(db, trip, ItemCreate(category="hotel", title="Hotel", cost=300))
+        add_participant(db, trip, ParticipantCreate(name="Ana"))
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE trip_totals SET cost_cents = cost_cents + 1 WHERE trip_id = :t"), {"t": trip.id})
+        conn.execute(text("UPDATE trips SET participant_count = 5 WHERE id = :t"), {"t": trip.id})
+
+    drift = _drift(trip.id)
+    assert {p["category"] for p in drift} == {"hotel", "participants"}
+    assert next(p for p in drift if p["category"] == "hotel")["expected"] == (1, 30000)
+
+    with engine.begin() as conn:
+        rebuild_trip_totals(conn, trip.id)
+    assert _drift(trip.id) == []
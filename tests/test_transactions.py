@@ -0,0 +1,54 @@
+"""
+Uma transação por requisição: escrita = um COMMIT (get_db, depois da rota),
+leitura = nenhum (get_read_db só devolve a conexão ao pool).
+"""
+import pytest
+
+from .conftest import count_commits, make_trip
+
+
+@pytest.fixture
+def token():
+    return make_trip(items=[{"category": "hotel", "title": "Hotel Centrale", "cost": 100}], participants=["Ana"])
+
+
+@pytest.mark.parametrize(
+    "method, path, kwargs",
+    [
+        ("post", "/api/t/{token}/items", {"json": {"category": "activity", "title": "Museu", "cost": 20}}),
+        ("post", "/api/t/{token}/participants", {"json": {"name": "Bia"}}),
+        ("post", "/t/{token}/items", {"data": {"category": "activity", "title": "Museu"}, "follow_redirects": False}),
+        ("post", "/api/t/{token}/items/bulk", {"json": [{"category": "hotel", "title": f"H{i}"} for i in range(5)]}),
+    ],
+)
+def test_write_request_commits_once(client, token, method, path, kwargs):
+    with count_commits() as commits:
+        r = getattr(client, method)(path.format(token=token), **kwargs)
+    assert r.status_code in (200, 201, 303)
+    assert len(commits) == 1
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/t/{token}",
+        "/api/t/{token}",
+        "/api/t/{token}/totals",
+        "/api/t/{token}/settlement",
+        "/t/{token}/search?q=hotel",
+        "/api/t/{token}/search?q=hotel",
+        "/t/{token}/calendar.ics",
+    ],
+)
+def test_read_request_does_not_commit(client, token, path):
+    with count_commits() as commits:
+        r = client.get(path.format(token=token))
+    assert r.status_code == 200
+    assert commits == []
+
+
+def test_failed_write_does_not_commit(client, token):
+    with count_commits() as commits:
+        r = client.post(f"/api/t/{token}/items", json={"category": "hotel", "title": "x", "paid_by": 999999})
+    assert r.status_code == 400
+    assert commits == []
@@ -0,0 +1,86 @@
+"""
+Cache token -> TripRef das rotas de escrita: TTL, invalidação só depois do
+commit do update_trip e nada de valores de transação desfeita no cache.
+"""
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import update
+
+from app import services
+from app.cache import LRUCache
+from app.db import SessionLocal, unit_of_work
+from app.models import Trip
+from app.services import get_trip_by_token, get_trip_ref, update_trip
+
+from .conftest import count_statements, make_trip
+
+
+def _edit(db, token, end_date, currency="BRL"):
+    trip = get_trip_by_token(db, token)
+    update_trip(db, trip, trip.title, trip.destination, trip.start_date, end_date, currency)
+
+
+def test_trip_ref_is_cached(db):
+    token = make_trip()
+    ref = get_trip_ref(db, token)
+    with count_statements() as statements:
+        assert get_trip_ref(db, token) is ref
+    assert statements == []
+
+
+def test_trip_ref_expires_after_ttl(db, monkeypatch):
+    monkeypatch.setattr(services, "_trip_ref_cache", LRUCache(max_entries=8, ttl_seconds=0.05))
+    token = make_trip()
+    get_trip_ref(db, token)
+
+    # outro worker editou a viagem (sem passar pela invalidação local)
+    with SessionLocal() as other:
+        other.execute(update(Trip).where(Trip.token == token).values(end_date=date(2025, 1, 20)))
+        other.commit()
+    assert get_trip_ref(db, token).end_date == date(2025, 1, 10)
+
+    time.sleep(0.06)
+    with count_statements() as statements:
+        assert get_trip_ref(db, token).end_date == date(2025, 1, 20)
+    assert len(statements) == 1
+
+
+def test_update_trip_invalidates_after_commit(db):
+    token = make_trip()
+    assert get_trip_ref(db, token).end_date == date(2025, 1, 10)
+
+    with unit_of_work() as w:
+        _edit(w, token, date(2025, 1, 15), "EUR")
+        # ainda não commitou: o cache continua com o valor antigo
+        assert services._trip_ref_cache.get(token).end_date == date(2025, 1, 10)
+
+    ref = get_trip_ref(db, token)
+    assert (ref.end_date, ref.currency) == (date(2025, 1, 15), "EUR")
+
+
+def test_rolled_back_update_does_not_poison_the_cache(db):
+    token = make_trip()
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as w:
+            _edit(w, token, date(2025, 1, 15), "EUR")
+            # a própria transação enxerga o valor novo, mas ele não pode ir para o cache
+            assert get_trip_ref(w, token).revision == 2
+            raise RuntimeError("desfaz")
+
+    ref = get_trip_ref(db, token)
+    assert (ref.end_date, ref.currency, ref.revision) == (date(2025, 1, 10), "BRL", 1)
+
+
+def test_rolled_back_update_keeps_the_cached_ref(db):
+    token = make_trip()
+    ref = get_trip_ref(db, token)
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as w:
+            _edit(w, token, date(2025, 1, 15))
+            raise RuntimeError("desfaz")
+
+    assert get_trip_ref(db, token) is ref